@@ -4,13 +4,26 @@ from rest_framework.response import Response
 from rest_framework import status
 from .models import *
 from .serializers import *
+from datetime import datetime, time
+from django.utils import timezone
+from django.utils.dateparse import parse_date, parse_datetime
+from .utils_cambios import LIMITE_DEFECTO, LIMITE_MAXIMO, pagina_cambios
+from .utils_condicional import get_condicional, poner_validadores, precondicion, validadores_objeto, validadores_qs
+from .utils_export import CHUNK_EXPORT, respuesta_ndjson_gz
+from .utils_reports import scope_evaluaciones_por_rol, scope_tareas_por_rol, scope_usuarios_por_rol
+from .utils_suscripcion import suscripcion_activa
 
 class MeAPI(APIView):
     permission_classes = [IsAuthenticated]
 
     def get(self, request):
         u = request.user
-        data = {
+        # request.user ya está cargado: los validadores no cuestan consultas
+        etag, modificado = validadores_objeto(u)
+        return get_condicional(request, etag, modificado, lambda: Response(self._datos(u), status=200))
+
+    def _datos(self, u):
+        return {
             "id": u.id,
             "username": u.username,
             "email": u.email or "",
@@ -21,7 +34,6 @@ class MeAPI(APIView):
             "segundo_apellido": getattr(u, "segundo_apellido", "") or "",
             "rut": getattr(u, "rut", "") or "",
         }
-        return Response(data, status=200)
 
     def patch(self, request):
         u = request.user
@@ -41,7 +53,9 @@ class MisTareasAPI(APIView):
     permission_classes = [IsAuthenticated]
     def get(self, request):
         qs = Tarea.objects.filter(asignado=request.user).order_by("-created_at")
-        return Response(TareaSerializer(qs, many=True).data)
+        etag, modificado = validadores_qs(qs)
+        return get_condicional(request, etag, modificado,
+                               lambda: Response(TareaSerializer(qs, many=True).data))
 
 class TareaEstadoAPI(APIView):
     permission_classes = [IsAuthenticated]
@@ -51,6 +65,13 @@ class TareaEstadoAPI(APIView):
         except Tarea.DoesNotExist:
             return Response({"detail":"No encontrada"}, status=status.HTTP_404_NOT_FOUND)
 
+        # PATCH condicional: If-Match (ETag de la respuesta anterior) o If-Unmodified-Since
+        # (updated_at de la tarea); si otro la cambió entretanto → 412
+        etag, modificado = validadores_objeto(tarea)
+        rechazo = precondicion(request, etag, modificado)
+        if rechazo is not None:
+            return rechazo
+
         ser = TareaSerializer(tarea, data=request.data, partial=True)
         if not ser.is_valid():
             return Response(ser.errors, status=400)
@@ -65,10 +86,154 @@ class TareaEstadoAPI(APIView):
                 contenido=str(comentario)[:1000],
             )
 
-        return Response({"ok": True})
+        return poner_validadores(Response({"ok": True}), *validadores_objeto(tarea))
 
 class MisEvaluacionesAPI(APIView):
     permission_classes = [IsAuthenticated]
     def get(self, request):
-        qs = Evaluacion.objects.filter(trabajador=request.user).order_by("-created_at")
-        return Response(EvaluacionSerializer(qs, many=True).data)
+        qs = (Evaluacion.objects.filter(evaluado=request.user)
+              .select_related("evaluador").order_by("-created_at"))
+        etag, modificado = validadores_qs(qs)
+        return get_condicional(request, etag, modificado,
+                               lambda: Response(EvaluacionSerializer(qs, many=True).data))
+
+
+def _tareas_visibles(user):
+    qs = scope_tareas_por_rol(Tarea.objects.filter(empresa_id=user.empresa_id), user)
+    if user.rol_codigo == "SUPERVISOR" and not user.is_superuser:
+        qs = qs.filter(asignado__rol_codigo="TRABAJADOR")  # igual que el CSV de tareas
+    return qs
+
+
+def _lapidas_visibles(user):
+    """Tareas borradas (HistorialTarea ELIMINADA) con el mismo alcance que _tareas_visibles."""
+    qs = HistorialTarea.objects.filter(empresa_id=user.empresa_id, accion="ELIMINADA")
+    if user.is_superuser or user.rol_codigo == "RRHH":
+        return qs
+    if not user.departamento_id:
+        return qs.none()
+    qs = qs.filter(departamento_ref=user.departamento_id)
+    if user.rol_codigo == "SUPERVISOR":
+        qs = qs.filter(asignado_rol="TRABAJADOR")
+    return qs
+
+
+def _de_tareas_visibles(model, user):
+    qs = model.objects.filter(empresa_id=user.empresa_id)
+    if user.is_superuser or user.rol_codigo == "RRHH":
+        return qs
+    return qs.filter(tarea__in=_tareas_visibles(user).values("pk"))
+
+
+# recurso -> (queryset con el alcance del usuario, columnas, campo para ?desde=)
+RECURSOS_EXPORT = {
+    "tareas": (
+        _tareas_visibles,
+        ("id", "titulo", "descripcion", "estado", "fecha_limite", "departamento_id", "asignado_id",
+         "creada_por_id", "created_at", "updated_at"),
+        "updated_at",
+    ),
+    "evaluaciones": (
+        lambda u: scope_evaluaciones_por_rol(Evaluacion.objects.filter(empresa_id=u.empresa_id), u),
+        ("id", "tipo", "puntaje", "comentarios", "evaluador_id", "evaluado_id", "created_at", "updated_at"),
+        "updated_at",
+    ),
+    "historial": (
+        lambda u: _de_tareas_visibles(HistorialTarea, u),
+        ("id", "tarea_id", "tarea_ref", "accion", "campo", "valor_anterior", "valor_nuevo", "realizado_por_id",
+         "created_at"),
+        "created_at",
+    ),
+    "comentarios": (
+        lambda u: _de_tareas_visibles(Comentario, u),
+        ("id", "tarea_id", "usuario_id", "contenido", "created_at"),
+        "created_at",
+    ),
+    # Sin rut, email ni teléfono: BI no necesita datos de contacto
+    "usuarios": (
+        lambda u: scope_usuarios_por_rol(User.objects.filter(empresa_id=u.empresa_id), u),
+        ("id", "username", "primer_nombre", "primer_apellido", "rol_codigo", "departamento_id", "is_active",
+         "created_at", "updated_at"),
+        "updated_at",
+    ),
+}
+
+
+def _rechazo_exportacion(u):
+    """Response 403 si el usuario no puede usar la exportación/feed para BI; None si puede."""
+    if not (u.is_superuser or u.rol_codigo in ("RRHH", "GERENTE", "SUPERVISOR")):
+        return Response({"detail": "No autorizado."}, status=status.HTTP_403_FORBIDDEN)
+    if not u.is_superuser and not suscripcion_activa(u.empresa_id):
+        return Response({"detail": "La empresa no tiene una suscripción activa."},
+                        status=status.HTTP_403_FORBIDDEN)
+    return None
+
+
+class ExportacionAPI(APIView):
+    """
+    Exportación masiva para BI: GET /api/export/<recurso>/[?desde=AAAA-MM-DD[THH:MM]]
+    con el token JWT de /api/token/. Devuelve NDJSON comprimido con gzip, generado
+    mientras se lee la BD (iterator con chunk_size; en PostgreSQL, cursor del lado
+    del servidor), con el mismo alcance por rol que los reportes.
+    """
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request, recurso):
+        if recurso not in RECURSOS_EXPORT:
+            return Response({"detail": "Recurso desconocido.", "recursos": sorted(RECURSOS_EXPORT)},
+                            status=status.HTTP_404_NOT_FOUND)
+        u = request.user
+        rechazo = _rechazo_exportacion(u)
+        if rechazo is not None:
+            return rechazo
+
+        armar_qs, campos, campo_fecha = RECURSOS_EXPORT[recurso]
+        qs = armar_qs(u)
+
+        desde = (request.query_params.get("desde") or "").strip()
+        if desde:
+            fecha = parse_datetime(desde) or parse_date(desde)
+            if fecha is None:
+                return Response({"detail": "Parámetro 'desde' inválido (ISO 8601)."}, status=400)
+            if not hasattr(fecha, "hour"):
+                fecha = timezone.make_aware(datetime.combine(fecha, time.min))
+            elif timezone.is_naive(fecha):
+                fecha = timezone.make_aware(fecha)
+            qs = qs.filter(**{f"{campo_fecha}__gte": fecha})
+
+        filas = qs.order_by("pk").values(*campos).iterator(chunk_size=CHUNK_EXPORT)
+        return respuesta_ndjson_gz(f"trackify_{recurso}_{timezone.localdate():%Y%m%d}.ndjson.gz", filas)
+
+
+class CambiosAPI(APIView):
+    """
+    Feed de cambios: GET /api/cambios/<recurso>/?cursor=<token>&limite=N
+    (recurso: tareas, evaluaciones, historial, usuarios). Sin cursor empieza desde el
+    principio; se repite con el 'cursor' devuelto mientras 'hay_mas'. En tareas,
+    'eliminados' trae las tareas borradas (lápidas). Mismo alcance que ExportacionAPI.
+    """
+    permission_classes = [IsAuthenticated]
+    recursos = ("tareas", "evaluaciones", "historial", "usuarios")
+
+    def get(self, request, recurso):
+        if recurso not in self.recursos:
+            return Response({"detail": "Recurso desconocido.", "recursos": list(self.recursos)},
+                            status=status.HTTP_404_NOT_FOUND)
+        u = request.user
+        rechazo = _rechazo_exportacion(u)
+        if rechazo is not None:
+            return rechazo
+
+        limite = request.query_params.get("limite", "")
+        limite = min(int(limite), LIMITE_MAXIMO) if limite.isdigit() and int(limite) > 0 else LIMITE_DEFECTO
+
+        armar_qs, campos, campo_fecha = RECURSOS_EXPORT[recurso]
+        lapidas = None
+        if recurso == "tareas":
+            lapidas = _lapidas_visibles(u)
+        try:
+            data = pagina_cambios(recurso, armar_qs(u).values(*campos), campo_fecha, lapidas,
+                                  token=request.query_params.get("cursor"), limite=limite)
+        except ValueError as exc:
+            return Response({"detail": str(exc)}, status=400)
+        return Response(data)
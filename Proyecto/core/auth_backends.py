@@ -0,0 +1,92 @@
+# core/auth_backends.py
+"""
+Backend de autenticación que carga request.user en UNA consulta (con rol,
+departamento y empresa) y guarda en la caché compartida solo una proyección
+mínima: ids, rol_codigo, nombres, flags de acceso y el hash de sesión (HMAC).
+Nunca la contraseña ni la suscripción (esa se consulta con utils_suscripcion).
+
+Con la proyección se arma un User con los demás campos diferidos: si una vista
+lee otro campo (rut, teléfono, ...) Django lo carga en ese momento, y un save()
+solo escribe los campos cargados. Los signals (core/signals.py) invalidan la
+entrada cuando cambia el usuario, su rol, su departamento, su empresa o la suscripción.
+"""
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.contrib.auth.backends import ModelBackend
+from django.core.cache import cache
+
+CAMPOS_USUARIO = ("id", "username", "email", "first_name", "last_name", "primer_nombre", "primer_apellido",
+                  "rol_id", "rol_codigo", "departamento_id", "empresa_id", "is_active", "is_staff", "is_superuser")
+# Relación -> campos copiados del objeto relacionado (sin datos sensibles)
+RELACIONES_USUARIO = {
+    "rol": ("id", "nombre", "empresa_id"),
+    "departamento": ("id", "nombre", "empresa_id"),
+    "empresa": ("id", "nombre"),
+}
+
+
+def clave_usuario(user_id):
+    # v2: proyección (dict); las entradas viejas guardaban el User completo
+    return f"core:usuario:v2:{user_id}"
+
+
+def invalidar_usuarios(ids):
+    """Borra de la caché los paquetes de los usuarios indicados."""
+    ids = list(ids)
+    if ids:
+        cache.delete_many([clave_usuario(pk) for pk in ids])
+
+
+def invalidar_usuarios_de(**filtro):
+    """Invalida a todos los usuarios que cumplan el filtro (p.ej. empresa_id=3, rol=rol)."""
+    invalidar_usuarios(get_user_model()._default_manager.filter(**filtro).values_list("pk", flat=True))
+
+
+def proyeccion_usuario(user_id):
+    """Dict serializable con lo que se cachea del usuario, o None si no existe."""
+    User = get_user_model()
+    relacionados = [f"{rel}__{campo}" for rel, campos in RELACIONES_USUARIO.items() for campo in campos]
+    fila = User._default_manager.filter(pk=user_id).values(*CAMPOS_USUARIO, *relacionados, "password").first()
+    if fila is None:
+        return None
+    paquete = {
+        "usuario": {c: fila[c] for c in CAMPOS_USUARIO},
+        # Mismo valor que User.get_session_auth_hash(): la sesión se valida sin leer la contraseña
+        "hash_sesion": User(password=fila["password"]).get_session_auth_hash(),
+    }
+    for rel, campos in RELACIONES_USUARIO.items():
+        datos = {c: fila[f"{rel}__{c}"] for c in campos}
+        paquete[rel] = datos if datos["id"] is not None else None
+    return paquete
+
+
+def _instancia(modelo, db, datos):
+    # from_db espera los valores en el orden de los campos del modelo; los que faltan quedan diferidos
+    campos = [f.attname for f in modelo._meta.concrete_fields if f.attname in datos]
+    return modelo.from_db(db, campos, [datos[c] for c in campos])
+
+
+def usuario_desde_proyeccion(paquete):
+    """User con los campos de la proyección cargados (el resto diferidos) y sus relaciones en caché."""
+    User = get_user_model()
+    db = User._default_manager.db
+    user = _instancia(User, db, paquete["usuario"])
+    for rel in RELACIONES_USUARIO:
+        campo = User._meta.get_field(rel)
+        datos = paquete[rel]
+        campo.set_cached_value(user, _instancia(campo.related_model, db, datos) if datos else None)
+    user._hash_sesion = paquete["hash_sesion"]
+    return user
+
+
+class CachedModelBackend(ModelBackend):
+    def get_user(self, user_id):
+        key = clave_usuario(user_id)
+        paquete = cache.get(key)
+        if paquete is None:
+            paquete = proyeccion_usuario(user_id)
+            if paquete is None:
+                return None
+            cache.set(key, paquete, getattr(settings, "USUARIO_CACHE_TTL", 900))
+        user = usuario_desde_proyeccion(paquete)
+        return user if self.user_can_authenticate(user) else None
@@ -1,7 +1,9 @@
-from .models import *
+from .utils_notif import contar_no_leidas
 
 def notifications_context(request):
-    if not request.user.is_authenticated:
-        return {"notif_unread_count": 0}
-    count = Notificacion.objects.filter(usuario=request.user, is_read=False).count()
-    return {"notif_unread_count": count}
\ No newline at end of file
+    # Perezoso: la plantilla llama a la función solo si usa la variable (la campana de
+    # base.html); el conteo sale de la caché y, si no está, de la BD.
+    def notif_unread_count():
+        user = request.user
+        return contar_no_leidas(user.pk) if user.is_authenticated else 0
+    return {"notif_unread_count": notif_unread_count}
@@ -2,6 +2,7 @@
 from functools import wraps
 from django.shortcuts import redirect
 from django.contrib import messages
+from .utils_suscripcion import suscripcion_activa
 
 def require_gs_and_sub(view_func):
     """
@@ -22,15 +23,12 @@ def require_gs_and_sub(view_func):
 
         # 2) Suscripción activa (superuser pasa igual)
         if not u.is_superuser:
-            empresa = getattr(u, "empresa", None)
-            sus = getattr(empresa, "suscripcion", None)
-            if not sus or not sus.is_active():
+            if not suscripcion_activa(getattr(u, "empresa_id", None)):
                 messages.info(request, "Tu empresa necesita una suscripción activa para usar reportes.")
                 return redirect("billing_overview")  # Ajusta si tu URL es otra
 
         # 3) Rol permitido (superuser pasa igual)
-        rol = getattr(getattr(u, "rol", None), "nombre", "")
-        if not u.is_superuser and rol not in ("Gerente", "Supervisor"):
+        if not u.is_superuser and u.rol_codigo not in ("GERENTE", "SUPERVISOR"):
             messages.error(request, "No tienes permisos para exportar reportes.")
             return redirect("home")
 
@@ -48,8 +46,7 @@ def require_billing_role(view_func):
         if not u.is_authenticated:
             messages.info(request, "Inicia sesión para continuar.")
             return redirect("web_login")
-        rol = getattr(getattr(u, "rol", None), "nombre", "")
-        if not (u.is_superuser or rol in ("Recursos humanos", "Gerente")):
+        if not (u.is_superuser or u.rol_codigo in ("RRHH", "GERENTE")):
             messages.error(request, "No tienes permisos para gestionar la suscripción.")
             return redirect("home")
         return view_func(request, *args, **kwargs)
@@ -7,6 +7,8 @@ from django.core.exceptions import ValidationError
 from django.contrib.auth.password_validation import password_validators_help_text_html
 from django.utils.translation import gettext_lazy as _
 from django.db import transaction, IntegrityError
+from .utils_referencia import (departamentos_empresa, etiqueta_nombre, etiqueta_persona, miembros,
+                               roles_empresa, usar_opciones)
 
 
 User = get_user_model()
@@ -138,6 +140,10 @@ class RegistroUsuarioRRHHForm(forms.ModelForm):
 
         self.fields['rol'].queryset = base_roles
         self.fields['departamento'].queryset = base_deptos
+        if self.empresa:
+            # Opciones desde la caché de referencia; el queryset queda para validar
+            usar_opciones(self.fields['rol'], roles_empresa(self.empresa.id), etiqueta_nombre)
+            usar_opciones(self.fields['departamento'], departamentos_empresa(self.empresa.id), etiqueta_nombre)
 
         # Por si viene sin empresa en instance (defensa)
         if self.empresa and not getattr(self.instance, "empresa_id", None):
@@ -160,11 +166,11 @@ class RegistroUsuarioRRHHForm(forms.ModelForm):
                 self.add_error('departamento', "El departamento no pertenece a tu empresa.")
 
         # Reglas por rol
-        if rol and rol.nombre in ('Trabajador', 'Supervisor') and not depto:
+        if rol and rol.codigo in ('TRABAJADOR', 'SUPERVISOR') and not depto:
             self.add_error('departamento', "Este campo es obligatorio para Trabajadores y Supervisores.")
 
         # Si es RRHH, forzamos sin departamento
-        if rol and rol.nombre == 'Recursos humanos':
+        if rol and rol.codigo == 'RRHH':
             cleaned['departamento'] = None
             self.instance.departamento = None
 
@@ -198,7 +204,7 @@ class RegistroUsuarioRRHHForm(forms.ModelForm):
         if self.empresa and not user.empresa_id:
             user.empresa = self.empresa
         # Si se crea un RRHH, garantizar depa None
-        if user.rol and user.rol.nombre == 'Recursos humanos':
+        if user.rol and user.rol.codigo == 'RRHH':
             user.departamento = None
         if commit:
             user.save()
@@ -244,6 +250,8 @@ class UserUpdateForm(forms.ModelForm):
         if self.empresa:
             self.fields['rol'].queryset = Rol.objects.filter(empresa=self.empresa).order_by('nombre')
             self.fields['departamento'].queryset = Departamento.objects.filter(empresa=self.empresa).order_by('nombre')
+            usar_opciones(self.fields['rol'], roles_empresa(self.empresa.id), etiqueta_nombre)
+            usar_opciones(self.fields['departamento'], departamentos_empresa(self.empresa.id), etiqueta_nombre)
 
         # Asegura empresa en la instance
         if self.empresa and not getattr(self.instance, "empresa_id", None):
@@ -271,11 +279,11 @@ class UserUpdateForm(forms.ModelForm):
                 self.add_error('departamento', "El departamento no pertenece a tu empresa.")
 
         # Regla: Supervisor/Trabajador deben tener departamento
-        if rol and rol.nombre in ('Trabajador', 'Supervisor') and not depto:
+        if rol and rol.codigo in ('TRABAJADOR', 'SUPERVISOR') and not depto:
             self.add_error('departamento', "Este campo es obligatorio para Trabajadores y Supervisores.")
 
         # Si es RRHH, forzamos sin departamento
-        if rol and rol.nombre == 'Recursos humanos':
+        if rol and rol.codigo == 'RRHH':
             cleaned['departamento'] = None
             self.instance.departamento = None
 
@@ -314,7 +322,7 @@ class UserUpdateForm(forms.ModelForm):
         if self.empresa and not user.empresa_id:
             user.empresa = self.empresa
         # Si el rol quedó en RRHH, asegurar departamento None
-        if user.rol and user.rol.nombre == 'Recursos humanos':
+        if user.rol and user.rol.codigo == 'RRHH':
             user.departamento = None
         if commit:
             user.save()
@@ -386,7 +394,7 @@ class TareaForm(forms.ModelForm):
         self.fields['departamento'].queryset = Departamento.objects.none()
         self.fields['asignado'].queryset = User.objects.none()
 
-        if not self.empresa or not u or not getattr(u, "rol", None):
+        if not self.empresa or not u or not getattr(u, "rol_id", None):
             return
 
         # QS limitados por empresa
@@ -394,32 +402,40 @@ class TareaForm(forms.ModelForm):
             empresa=self.empresa
         ).order_by('nombre')
 
-        if u.rol.nombre == 'Gerente':
+        if u.rol_codigo == 'GERENTE':
             if u.departamento_id:
                 self.fields['departamento'].initial = u.departamento
                 self.fields['departamento'].queryset = self.fields['departamento'].queryset.filter(pk=u.departamento_id)
                 self.fields['asignado'].queryset = User.objects.filter(
-                    empresa=self.empresa, rol__nombre='Supervisor', departamento=u.departamento
+                    empresa=self.empresa, rol_codigo='SUPERVISOR', departamento=u.departamento
                 ).order_by('primer_apellido','primer_nombre')
             else:
                 self.fields['asignado'].queryset = User.objects.filter(
-                    empresa=self.empresa, rol__nombre='Supervisor'
+                    empresa=self.empresa, rol_codigo='SUPERVISOR'
                 ).order_by('primer_apellido','primer_nombre')
 
-        elif u.rol.nombre == 'Supervisor':
+        elif u.rol_codigo == 'SUPERVISOR':
             if u.departamento_id:
                 self.fields['departamento'].initial = u.departamento
                 self.fields['departamento'].queryset = self.fields['departamento'].queryset.filter(pk=u.departamento_id)
                 self.fields['departamento'].disabled = True
                 self.fields['asignado'].queryset = User.objects.filter(
-                    empresa=self.empresa, rol__nombre='Trabajador', departamento=u.departamento
+                    empresa=self.empresa, rol_codigo='TRABAJADOR', departamento=u.departamento
                 ).order_by('primer_apellido','primer_nombre')
             else:
                 self.fields['asignado'].queryset = User.objects.filter(
-                    empresa=self.empresa, rol__nombre='Trabajador'
+                    empresa=self.empresa, rol_codigo='TRABAJADOR'
                 ).order_by('primer_apellido','primer_nombre')
         else:
             self.fields['asignado'].queryset = User.objects.none()
+            return
+
+        # Los <select> se arman con la caché de referencia (los querysets solo validan el POST)
+        rol_asignable = 'SUPERVISOR' if u.rol_codigo == 'GERENTE' else 'TRABAJADOR'
+        deptos = [u.departamento_id] if u.departamento_id else None
+        usar_opciones(self.fields['departamento'], departamentos_empresa(self.empresa.id, ids=deptos), etiqueta_nombre)
+        usar_opciones(self.fields['asignado'],
+                      miembros(self.empresa.id, u.departamento_id, roles=[rol_asignable]), etiqueta_persona)
 
     # 🛑 Candado del lado servidor: no permitir fechas pasadas
     def clean_fecha_limite(self):
@@ -438,7 +454,7 @@ class TareaForm(forms.ModelForm):
         depto = cleaned.get('departamento')
         asignado = cleaned.get('asignado')
 
-        if not u or not getattr(u, "rol", None):
+        if not u or not getattr(u, "rol_id", None):
             raise forms.ValidationError("Permisos insuficientes.")
 
         # Defensa en profundidad: empresa coherente
@@ -448,16 +464,16 @@ class TareaForm(forms.ModelForm):
             self.add_error('asignado', "El usuario asignado no pertenece a tu empresa.")
 
         # Reglas por rol
-        if u.rol.nombre == 'Gerente':
-            if not asignado or asignado.rol is None or asignado.rol.nombre != 'Supervisor':
+        if u.rol_codigo == 'GERENTE':
+            if not asignado or asignado.rol_codigo != 'SUPERVISOR':
                 self.add_error('asignado', "Debes asignar a un Supervisor.")
             if u.departamento_id and depto and depto.id != u.departamento_id:
                 self.add_error('departamento', "Debes usar tu propio departamento.")
             if asignado and asignado.departamento_id != getattr(depto, "id", None):
                 self.add_error('asignado', "El supervisor debe pertenecer a ese departamento.")
 
-        elif u.rol.nombre == 'Supervisor':
-            if not asignado or asignado.rol is None or asignado.rol.nombre != 'Trabajador':
+        elif u.rol_codigo == 'SUPERVISOR':
+            if not asignado or asignado.rol_codigo != 'TRABAJADOR':
                 self.add_error('asignado', "Debes asignar a un Trabajador.")
             if u.departamento_id and depto and depto.id != u.departamento_id:
                 self.add_error('departamento', "Debes usar tu propio departamento.")
@@ -504,25 +520,30 @@ class EvaluacionForm(forms.ModelForm):
         self.fields["puntaje"].label = "Puntaje (1–5)"
 
         user = getattr(self.request, "user", None)
-        rol = getattr(getattr(user, "rol", None), "nombre", "")
+        rol = getattr(user, "rol_codigo", "")
         depto_id = getattr(getattr(user, "departamento", None), "id", None)
 
         base_qs = User.objects.filter(empresa=self.empresa) if self.empresa else User.objects.none()
-        if rol == "Gerente":
-            qs = base_qs.filter(rol__nombre="Supervisor", departamento_id=depto_id)
-        elif rol == "Supervisor":
-            qs = base_qs.filter(rol__nombre="Trabajador", departamento_id=depto_id)
+        if rol == "GERENTE":
+            qs = base_qs.filter(rol_codigo="SUPERVISOR", departamento_id=depto_id)
+        elif rol == "SUPERVISOR":
+            qs = base_qs.filter(rol_codigo="TRABAJADOR", departamento_id=depto_id)
         else:
             qs = base_qs.none()
 
         self.fields["evaluado"].queryset = qs.order_by("primer_apellido", "primer_nombre")
+        if self.empresa and rol in ("GERENTE", "SUPERVISOR"):
+            rol_evaluado = "SUPERVISOR" if rol == "GERENTE" else "TRABAJADOR"
+            gente = [p for p in miembros(self.empresa.id, depto_id, roles=[rol_evaluado])
+                     if p["departamento_id"] == depto_id]
+            usar_opciones(self.fields["evaluado"], gente, etiqueta_persona)
 
     def clean(self):
         cleaned = super().clean()
         user = getattr(self.request, "user", None)
-        rol = getattr(getattr(user, "rol", None), "nombre", "")
+        rol = getattr(user, "rol_codigo", "")
         self.instance.evaluador = user
-        self.instance.tipo = "SUPERVISOR" if rol == "Gerente" else "TRABAJADOR" if rol == "Supervisor" else None
+        self.instance.tipo = "SUPERVISOR" if rol == "GERENTE" else "TRABAJADOR" if rol == "SUPERVISOR" else None
 
         if self.instance and hasattr(self.instance, "empresa_id") and not self.instance.empresa_id and self.empresa:
             self.instance.empresa = self.empresa
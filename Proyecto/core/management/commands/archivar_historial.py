@@ -0,0 +1,51 @@
+import time
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from core.models import Empresa
+from core.utils_historial import archivar_objetos, dias_archivado, objetos_pendientes
+
+
+class Command(BaseCommand):
+    help = (
+        "Mueve el historial de tareas/evaluaciones más antiguo que N días a HistorialArchivado "
+        "(segmentos comprimidos). Trabaja en lotes cortos: se puede interrumpir y volver a correr."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--dias", type=int, default=None,
+                            help="Antigüedad mínima en días (por defecto settings.HISTORIAL_ARCHIVAR_DIAS).")
+        parser.add_argument("--lote", type=int, default=200, help="Objetos (tareas/evaluaciones) por transacción.")
+        parser.add_argument("--empresa", type=int, help="Solo esta empresa (ID).")
+        parser.add_argument("--solo", choices=["tareas", "evaluaciones"], help="Archivar solo un tipo de historial.")
+        parser.add_argument("--pausa", type=float, default=0.0,
+                            help="Segundos de espera entre lotes (deja pasar otras escrituras).")
+
+    def handle(self, *args, **opts):
+        dias = opts["dias"] if opts["dias"] is not None else dias_archivado()
+        if dias < 1:
+            raise CommandError("--dias debe ser al menos 1.")
+        empresa = None
+        if opts["empresa"]:
+            empresa = Empresa.objects.filter(pk=opts["empresa"]).first()
+            if not empresa:
+                raise CommandError(f"No existe la empresa {opts['empresa']}.")
+
+        limite = timezone.now() - timedelta(days=dias)
+        lote = max(opts["lote"], 1)
+        self.stdout.write(f"Archivando eventos anteriores a {limite:%Y-%m-%d %H:%M} (UTC)")
+
+        for tipo in [opts["solo"]] if opts["solo"] else ["tareas", "evaluaciones"]:
+            total, ultimo = 0, 0
+            while True:
+                ids = objetos_pendientes(tipo, limite, despues_de=ultimo, cantidad=lote, empresa=empresa)
+                if not ids:
+                    break
+                total += archivar_objetos(tipo, ids, limite)
+                ultimo = ids[-1]
+                self.stdout.write(f"  {tipo}: {total} eventos archivados (hasta id {ultimo})")
+                if opts["pausa"]:
+                    time.sleep(opts["pausa"])
+            self.stdout.write(self.style.SUCCESS(f"Listo {tipo}: {total} eventos archivados."))
@@ -0,0 +1,114 @@
+import gc
+import tempfile
+import time
+import tracemalloc
+from datetime import date, timedelta
+from io import BytesIO
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from core.models import Empresa, Tarea
+from core.utils_export import ENCABEZADOS_TAREAS, escribir_xlsx, filas_tareas, lineas_csv
+from core.utils_pdf import generar_pdf, generar_pdf_por_bloques
+
+ESTADOS = [e for e, _ in Tarea.ESTADOS]
+
+
+def _filas_sinteticas(n):
+    base = date(2025, 1, 1)
+    for i in range(n):
+        yield [f"Tarea {i} de prueba", f"Depto {i % 12}", f"Nombre{i % 500} Apellido{i % 700}",
+               ESTADOS[i % 4], (base + timedelta(days=i % 365)).strftime("%Y-%m-%d")]
+
+
+def _xlsx_en_memoria(filas):
+    """El camino anterior: Workbook normal + BytesIO + getvalue()."""
+    from openpyxl import Workbook
+    wb = Workbook()
+    ws = wb.active
+    ws.append(ENCABEZADOS_TAREAS)
+    for f in filas:
+        ws.append(f)
+    bio = BytesIO()
+    wb.save(bio)
+    return len(bio.getvalue())
+
+
+def _xlsx_write_only(filas):
+    with tempfile.TemporaryFile(suffix=".xlsx") as tmp:
+        escribir_xlsx(tmp, "Tareas", ENCABEZADOS_TAREAS, filas)
+        return tmp.tell()
+
+
+def _csv(filas):
+    return sum(len(b.encode("utf-8")) for b in lineas_csv(ENCABEZADOS_TAREAS, filas))
+
+
+def _contexto_pdf():
+    return {"titulo": "Tareas", "now": timezone.now()}
+
+
+def _pdf_completo(filas):
+    """El camino anterior: una sola plantilla con todas las filas y un solo documento pisa."""
+    with tempfile.TemporaryFile(suffix=".pdf") as tmp:
+        generar_pdf("core/reportes/pdf_tareas.html", {**_contexto_pdf(), "filas": list(filas)}, tmp)
+        return tmp.tell()
+
+
+def _pdf_bloques(filas):
+    with tempfile.TemporaryFile(suffix=".pdf") as tmp:
+        generar_pdf_por_bloques("core/reportes/pdf_tareas.html", _contexto_pdf(), filas, tmp)
+        return tmp.tell()
+
+
+MODOS = {"xlsx-memoria": _xlsx_en_memoria, "xlsx-write-only": _xlsx_write_only, "csv": _csv,
+         "pdf-completo": _pdf_completo, "pdf-bloques": _pdf_bloques}
+
+
+class Command(BaseCommand):
+    help = (
+        "Mide tiempo y memoria pico (tracemalloc) de las exportaciones de tareas: XLSX en memoria "
+        "(camino anterior) vs XLSX write-only a archivo temporal vs CSV en streaming; y PDF en un "
+        "solo documento vs PDF por bloques."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--filas", type=int, action="append",
+                            help="Cantidad de filas sintéticas (repetible). Por defecto 100000 y 1000000.")
+        parser.add_argument("--modo", choices=sorted(MODOS), action="append",
+                            help="Modo a medir (repetible). Por defecto xlsx-memoria, xlsx-write-only y csv "
+                                 "(los PDF son lentos: pedirlos con pocas filas).")
+        parser.add_argument("--empresa", type=int,
+                            help="En vez de filas sintéticas, exporta las tareas reales de esta empresa.")
+
+    def handle(self, *args, **opts):
+        modos = opts["modo"] or ["xlsx-memoria", "xlsx-write-only", "csv"]
+        if opts["empresa"]:
+            empresa = Empresa.objects.filter(pk=opts["empresa"]).first()
+            if not empresa:
+                raise CommandError(f"No existe la empresa {opts['empresa']}.")
+            qs = Tarea.objects.filter(empresa=empresa).order_by("fecha_limite", "estado")
+            casos = [(f"empresa {empresa.pk} ({qs.count()} tareas)", lambda: filas_tareas(qs))]
+        else:
+            casos = [(f"{n} filas sintéticas", lambda n=n: _filas_sinteticas(n))
+                     for n in opts["filas"] or [100_000, 1_000_000]]
+
+        for titulo, fuente in casos:
+            self.stdout.write(self.style.MIGRATE_HEADING(f"\n== {titulo}"))
+            for modo in modos:
+                # Dos pasadas: tiempo sin tracemalloc (lo enlentece) y luego memoria pico
+                gc.collect()
+                t0 = time.perf_counter()
+                tamano = MODOS[modo](fuente())
+                segundos = time.perf_counter() - t0
+
+                gc.collect()
+                tracemalloc.start()
+                MODOS[modo](fuente())
+                _, pico = tracemalloc.get_traced_memory()
+                tracemalloc.stop()
+
+                self.stdout.write(self.style.SUCCESS(
+                    f"{modo:16s} tiempo: {segundos:7.2f} s | memoria pico: {pico / 1e6:8.1f} MB | "
+                    f"archivo: {tamano / 1e6:6.1f} MB"))
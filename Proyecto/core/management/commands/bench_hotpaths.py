@@ -0,0 +1,112 @@
+import random
+import time
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.utils import timezone
+
+from core.models import (
+    Comentario, Departamento, Empresa, Evaluacion, HistorialTarea,
+    Notificacion, Rol, Tarea, User,
+)
+from core.utils_busqueda import indexar_tareas
+from core.utils_contadores import reconstruir_contadores
+
+ESTADOS = [e for e, _ in Tarea.ESTADOS]
+
+
+class Command(BaseCommand):
+    help = (
+        "Muestra plan de ejecución y tiempos de las consultas más usadas "
+        "(listados, reportes, dashboard, campana, historial). "
+        "Córrelo antes y después de 'migrate core 0006' para comparar."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--empresa", type=int, help="ID de la empresa a medir.")
+        parser.add_argument("--seed", type=int, default=0,
+                            help="Crea una empresa sintética con N tareas antes de medir (¡no usar en producción!).")
+        parser.add_argument("--repeat", type=int, default=5, help="Repeticiones por consulta (se reporta la mediana).")
+
+    def handle(self, *args, **opts):
+        if opts["seed"]:
+            empresa = self._seed(opts["seed"])
+        elif opts["empresa"]:
+            empresa = Empresa.objects.filter(pk=opts["empresa"]).first()
+            if not empresa:
+                raise CommandError(f"No existe la empresa {opts['empresa']}.")
+        else:
+            raise CommandError("Indica --empresa <id> o --seed <n_tareas>.")
+
+        depto = Departamento.objects.filter(empresa=empresa).order_by("pk").first()
+        tarea = Tarea.objects.filter(empresa=empresa).order_by("pk").first()
+        usuario = User.objects.filter(empresa=empresa, tareas_asignadas__isnull=False).order_by("pk").first()
+        if not (depto and tarea and usuario):
+            raise CommandError("La empresa no tiene datos suficientes (depto, tarea y asignado).")
+
+        consultas = [
+            ("Tareas por depto/estado (ReporteTareasView)",
+             Tarea.objects.filter(empresa=empresa, departamento=depto, estado="Atrasada").order_by("fecha_limite")[:20]),
+            ("Conteo por estado (home/dashboard)",
+             Tarea.objects.filter(empresa=empresa, departamento=depto, estado="En progreso")),
+            ("Mis tareas por estado",
+             Tarea.objects.filter(asignado=usuario, estado="Pendiente")),
+            ("Evaluaciones del evaluado",
+             Evaluacion.objects.filter(empresa=empresa, evaluado=usuario).order_by("-created_at")[:20]),
+            ("Historial de tarea",
+             HistorialTarea.objects.filter(tarea=tarea).order_by("-created_at")),
+            ("Notificaciones no leídas",
+             Notificacion.objects.filter(usuario=usuario, is_read=False).order_by("-created_at")),
+            ("Comentarios de tarea",
+             Comentario.objects.filter(tarea=tarea).order_by("-created_at")),
+        ]
+
+        self.stdout.write(f"Motor: {connection.vendor} | empresa={empresa.pk} | "
+                          f"tareas={Tarea.objects.filter(empresa=empresa).count()}")
+        for titulo, qs in consultas:
+            self.stdout.write(self.style.MIGRATE_HEADING(f"\n== {titulo}"))
+            self.stdout.write(qs.explain())
+            tiempos = []
+            for _ in range(max(opts["repeat"], 1)):
+                t0 = time.perf_counter()
+                if qs.query.is_sliced:
+                    list(qs.all())
+                else:
+                    qs.count()
+                tiempos.append((time.perf_counter() - t0) * 1000)
+            tiempos.sort()
+            self.stdout.write(self.style.SUCCESS(f"mediana: {tiempos[len(tiempos) // 2]:.2f} ms"))
+
+    @transaction.atomic
+    def _seed(self, n):
+        empresa = Empresa.objects.create(nombre=f"Bench {timezone.now():%Y%m%d%H%M%S}")
+        roles = {r: Rol.objects.create(empresa=empresa, nombre=r) for r in ("Supervisor", "Trabajador")}
+        deptos = [Departamento.objects.create(empresa=empresa, nombre=f"Depto {i}") for i in range(10)]
+        usuarios = [
+            User(username=f"bench{empresa.pk}_{i}", primer_nombre=f"Nombre{i}", primer_apellido=f"Apellido{i}",
+                 rut=str(10_000_000 + i), empresa=empresa, departamento=deptos[i % 10],
+                 rol=roles["Supervisor" if i < 10 else "Trabajador"])  # un supervisor por depto
+            for i in range(200)
+        ]
+        for u in usuarios:  # bulk_create no pasa por User.save
+            u.rol_codigo = u.rol.codigo
+            u.busqueda = u.clave_busqueda()
+        usuarios = User.objects.bulk_create(usuarios)
+        hoy = timezone.localdate()
+        lote = []
+        for i in range(n):
+            u = usuarios[i % len(usuarios)]
+            lote.append(Tarea(
+                titulo=f"Tarea {i}", fecha_limite=hoy + timedelta(days=random.randint(-60, 60)),
+                estado=random.choice(ESTADOS), departamento_id=u.departamento_id, asignado=u, empresa=empresa,
+            ))
+            if len(lote) == 5000:
+                Tarea.objects.bulk_create(lote)
+                lote = []
+        Tarea.objects.bulk_create(lote)
+        # bulk_create tampoco dispara los signals: contadores e índice de búsqueda a mano
+        reconstruir_contadores(empresa=empresa.pk)
+        indexar_tareas(qs=Tarea.objects.filter(empresa=empresa))
+        self.stdout.write(f"Empresa sintética {empresa.pk} creada con {n} tareas.")
+        return empresa
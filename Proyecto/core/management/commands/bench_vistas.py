@@ -0,0 +1,53 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test import Client
+from django.test.utils import CaptureQueriesContext, override_settings
+from django.urls import reverse
+
+from core.models import User
+
+VISTAS = {
+    "equipo": "tarea_list_supervisor_equipo",
+    "dashboard": "dashboard",
+}
+
+
+class Command(BaseCommand):
+    help = (
+        "Mide cantidad de consultas y latencia de vistas completas (equipo del supervisor, dashboard) "
+        "para un usuario dado. Córrelo antes y después de 'migrate core 0011' para comparar."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("usuario", help="username con el que se hacen las peticiones.")
+        parser.add_argument("--vista", choices=sorted(VISTAS), action="append",
+                            help="Vista a medir (repetible). Por defecto todas.")
+        parser.add_argument("--repeat", type=int, default=10, help="Repeticiones por vista (se reporta la mediana).")
+
+    def handle(self, *args, **opts):
+        user = User.objects.filter(username=opts["usuario"]).first()
+        if not user:
+            raise CommandError(f"No existe el usuario {opts['usuario']}.")
+
+        client = Client()
+        client.force_login(user)
+        self.stdout.write(f"Motor: {connection.vendor} | usuario={user.username} | rol={user.rol_codigo or '-'}")
+
+        with override_settings(ALLOWED_HOSTS=["*"]):
+            for nombre in opts["vista"] or sorted(VISTAS):
+                url = reverse(VISTAS[nombre])
+                tiempos, consultas, status = [], 0, None
+                for _ in range(max(opts["repeat"], 1)):
+                    with CaptureQueriesContext(connection) as ctx:
+                        t0 = time.perf_counter()
+                        resp = client.get(url)
+                        tiempos.append((time.perf_counter() - t0) * 1000)
+                    consultas, status = len(ctx.captured_queries), resp.status_code
+                tiempos.sort()
+                self.stdout.write(self.style.MIGRATE_HEADING(f"\n== {nombre} ({url})"))
+                if status != 200:
+                    self.stdout.write(self.style.WARNING(f"HTTP {status} (¿el usuario tiene acceso a esta vista?)"))
+                self.stdout.write(self.style.SUCCESS(
+                    f"consultas: {consultas} | mediana: {tiempos[len(tiempos) // 2]:.2f} ms"))
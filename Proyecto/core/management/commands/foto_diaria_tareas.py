@@ -0,0 +1,39 @@
+import time
+from datetime import date, timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from core.models import Empresa
+from core.utils_tendencias import tomar_foto
+
+
+class Command(BaseCommand):
+    help = (
+        "Guarda la foto diaria de tareas (FotoDiariaTareas) por empresa, departamento, estado y rol "
+        "del asignado, de la que leen las tendencias del dashboard. Correr una vez al día (cron); "
+        "volver a correrlo el mismo día reemplaza la foto."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--ayer", action="store_true",
+                            help="Registra la foto como del día anterior (cron pasada la medianoche).")
+        parser.add_argument("--dia", help="Fecha de la foto (AAAA-MM-DD). Las tareas se leen tal como están ahora.")
+        parser.add_argument("--empresa", type=int, help="Solo esta empresa (ID).")
+
+    def handle(self, *args, **opts):
+        dia = timezone.localdate()
+        if opts["ayer"]:
+            dia -= timedelta(days=1)
+        if opts["dia"]:
+            try:
+                dia = date.fromisoformat(opts["dia"])
+            except ValueError:
+                raise CommandError("--dia debe tener el formato AAAA-MM-DD.")
+        if opts["empresa"] and not Empresa.objects.filter(pk=opts["empresa"]).exists():
+            raise CommandError(f"No existe la empresa {opts['empresa']}.")
+
+        t0 = time.perf_counter()
+        filas = tomar_foto(dia, empresa_id=opts["empresa"])
+        self.stdout.write(self.style.SUCCESS(
+            f"Foto del {dia:%Y-%m-%d}: {filas} filas en {time.perf_counter() - t0:.2f} s"))
@@ -0,0 +1,49 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+
+from core.utils_trabajos import limpiar_vencidos, procesar, tomar_siguiente
+
+
+class Command(BaseCommand):
+    help = (
+        "Worker de reportes en segundo plano (TrabajoReporte): genera los PDF/XLSX encolados "
+        "desde las pantallas de reportes. Se pueden correr varios en paralelo."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--una-vez", action="store_true",
+                            help="Procesa lo pendiente y termina (útil en cron).")
+        parser.add_argument("--intervalo", type=float, default=2.0,
+                            help="Segundos de espera cuando no hay trabajos.")
+        parser.add_argument("--max", type=int, default=0,
+                            help="Termina tras procesar N trabajos (0 = sin límite).")
+
+    def handle(self, *args, **opts):
+        hechos = 0
+        ultima_limpieza = 0.0
+        while True:
+            if time.monotonic() - ultima_limpieza > 600:
+                borrados = limpiar_vencidos()
+                if borrados:
+                    self.stdout.write(f"Limpieza: {borrados} reportes vencidos eliminados.")
+                ultima_limpieza = time.monotonic()
+
+            trabajo = tomar_siguiente()
+            if trabajo is None:
+                if opts["una_vez"]:
+                    break
+                close_old_connections()
+                time.sleep(opts["intervalo"])
+                continue
+
+            t0 = time.perf_counter()
+            ok = procesar(trabajo)
+            estilo = self.style.SUCCESS if ok else self.style.ERROR
+            self.stdout.write(estilo(
+                f"{trabajo.get_tipo_display()} #{trabajo.pk} empresa={trabajo.empresa_id} {'listo' if ok else 'error'} "
+                f"en {time.perf_counter() - t0:.1f} s"))
+            hechos += 1
+            if opts["max"] and hechos >= opts["max"]:
+                break
@@ -0,0 +1,13 @@
+from django.core.management.base import BaseCommand
+from django.db import connection
+from core.utils_busqueda import busqueda_disponible, reconstruir_indice
+
+class Command(BaseCommand):
+    help = "Reconstruye el índice de texto completo de tareas (FTS5 en SQLite, tsvector en PostgreSQL)"
+
+    def handle(self, *args, **kwargs):
+        if not busqueda_disponible():
+            self.stdout.write(self.style.WARNING(f"Motor '{connection.vendor}' sin índice de texto completo; nada que hacer."))
+            return
+        n = reconstruir_indice()
+        self.stdout.write(self.style.SUCCESS(f"Listo. Tareas indexadas: {n}"))
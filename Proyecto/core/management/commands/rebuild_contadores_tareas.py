@@ -0,0 +1,18 @@
+from django.core.management.base import BaseCommand, CommandError
+from core.models import Empresa
+from core.utils_contadores import reconstruir_contadores
+
+class Command(BaseCommand):
+    help = "Recalcula los contadores de tareas por (empresa, departamento, estado, rol) desde la tabla Tarea"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--empresa", type=int, help="Solo esta empresa (id). Por defecto, todas.")
+
+    def handle(self, *args, **opts):
+        empresa = None
+        if opts["empresa"]:
+            empresa = Empresa.objects.filter(pk=opts["empresa"]).first()
+            if not empresa:
+                raise CommandError(f"No existe la empresa {opts['empresa']}.")
+        filas = reconstruir_contadores(empresa=empresa)
+        self.stdout.write(self.style.SUCCESS(f"Listo. Contadores reconstruidos: {filas}"))
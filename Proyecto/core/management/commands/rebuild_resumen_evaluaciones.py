@@ -0,0 +1,18 @@
+from django.core.management.base import BaseCommand, CommandError
+from core.models import Empresa
+from core.utils_resumen_eval import reconstruir_resumenes
+
+class Command(BaseCommand):
+    help = "Recalcula el resumen materializado de evaluaciones (suma/cantidad/min/max por evaluado y tipo)"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--empresa", type=int, help="Solo esta empresa (id). Por defecto, todas.")
+
+    def handle(self, *args, **opts):
+        empresa = None
+        if opts["empresa"]:
+            empresa = Empresa.objects.filter(pk=opts["empresa"]).first()
+            if not empresa:
+                raise CommandError(f"No existe la empresa {opts['empresa']}.")
+        filas = reconstruir_resumenes(empresa=empresa)
+        self.stdout.write(self.style.SUCCESS(f"Listo. Resúmenes reconstruidos: {filas}"))
@@ -0,0 +1,37 @@
+# Generated by Django 5.2.18 on 2026-10-18 18:56
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0005_suscripcionempresa_mp_plan_id'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='comentario',
+            index=models.Index(fields=['tarea', 'created_at'], name='coment_tarea_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='evaluacion',
+            index=models.Index(fields=['empresa', 'evaluado', 'created_at'], name='eval_emp_evald_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='historialtarea',
+            index=models.Index(fields=['tarea', 'created_at'], name='histtarea_tarea_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='notificacion',
+            index=models.Index(fields=['usuario', 'is_read', 'created_at'], name='notif_user_read_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='tarea',
+            index=models.Index(fields=['empresa', 'departamento', 'estado', 'fecha_limite'], name='tarea_emp_dep_est_fl_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='tarea',
+            index=models.Index(fields=['asignado', 'estado'], name='tarea_asig_estado_idx'),
+        ),
+    ]
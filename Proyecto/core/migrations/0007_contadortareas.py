@@ -0,0 +1,97 @@
+# Generated by Django 5.2.18 on 2026-10-18 18:57
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import Count
+
+
+def poblar_contadores(apps, schema_editor):
+    Tarea = apps.get_model("core", "Tarea")
+    ContadorTareas = apps.get_model("core", "ContadorTareas")
+    filas = (
+        Tarea.objects.values(
+            "empresa_id", "departamento_id", "estado", "asignado__rol__nombre"
+        )
+        .annotate(n=Count("id"))
+        .order_by()
+    )
+    ContadorTareas.objects.bulk_create(
+        [
+            ContadorTareas(
+                empresa_id=f["empresa_id"],
+                departamento_id=f["departamento_id"],
+                estado=f["estado"],
+                rol_asignado=f["asignado__rol__nombre"] or "",
+                total=f["n"],
+            )
+            for f in filas
+        ],
+        batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("core", "0006_indices_compuestos_hot_paths"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="ContadorTareas",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "estado",
+                    models.CharField(
+                        choices=[
+                            ("Pendiente", "Pendiente"),
+                            ("En progreso", "En progreso"),
+                            ("Atrasada", "Atrasada"),
+                            ("Finalizada", "Finalizada"),
+                        ],
+                        max_length=20,
+                    ),
+                ),
+                (
+                    "rol_asignado",
+                    models.CharField(blank=True, default="", max_length=50),
+                ),
+                ("total", models.IntegerField(default=0)),
+                ("updated_at", models.DateTimeField(auto_now=True)),
+                (
+                    "departamento",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="contadores_tareas",
+                        to="core.departamento",
+                    ),
+                ),
+                (
+                    "empresa",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="contadores_tareas",
+                        to="core.empresa",
+                    ),
+                ),
+            ],
+            options={
+                "constraints": [
+                    models.UniqueConstraint(
+                        fields=("empresa", "departamento", "estado", "rol_asignado"),
+                        name="uniq_contador_tareas",
+                    )
+                ],
+            },
+        ),
+        migrations.RunPython(poblar_contadores, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,119 @@
+# Generated by Django 5.2.18 on 2026-10-18 19:00
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count, Max, Min, Sum
+
+
+def poblar_resumenes(apps, schema_editor):
+    Evaluacion = apps.get_model("core", "Evaluacion")
+    ResumenEvaluacion = apps.get_model("core", "ResumenEvaluacion")
+    filas = (
+        Evaluacion.objects.values(
+            "evaluado_id", "tipo", "evaluado__empresa_id", "evaluado__departamento_id"
+        )
+        .annotate(
+            suma=Sum("puntaje"),
+            cantidad=Count("id"),
+            minimo=Min("puntaje"),
+            maximo=Max("puntaje"),
+        )
+        .order_by()
+    )
+    ResumenEvaluacion.objects.bulk_create(
+        [
+            ResumenEvaluacion(
+                evaluado_id=f["evaluado_id"],
+                tipo=f["tipo"],
+                empresa_id=f["evaluado__empresa_id"],
+                departamento_id=f["evaluado__departamento_id"],
+                suma=f["suma"],
+                cantidad=f["cantidad"],
+                minimo=f["minimo"],
+                maximo=f["maximo"],
+            )
+            for f in filas
+        ],
+        batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("core", "0007_contadortareas"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="ResumenEvaluacion",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "tipo",
+                    models.CharField(
+                        choices=[
+                            ("SUPERVISOR", "Supervisor"),
+                            ("TRABAJADOR", "Trabajador"),
+                        ],
+                        max_length=20,
+                    ),
+                ),
+                ("suma", models.IntegerField(default=0)),
+                ("cantidad", models.IntegerField(default=0)),
+                ("minimo", models.IntegerField(blank=True, null=True)),
+                ("maximo", models.IntegerField(blank=True, null=True)),
+                ("updated_at", models.DateTimeField(auto_now=True)),
+                (
+                    "departamento",
+                    models.ForeignKey(
+                        blank=True,
+                        null=True,
+                        on_delete=django.db.models.deletion.SET_NULL,
+                        related_name="resumenes_evaluacion",
+                        to="core.departamento",
+                    ),
+                ),
+                (
+                    "empresa",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="resumenes_evaluacion",
+                        to="core.empresa",
+                    ),
+                ),
+                (
+                    "evaluado",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="resumenes_evaluacion",
+                        to=settings.AUTH_USER_MODEL,
+                    ),
+                ),
+            ],
+            options={
+                "indexes": [
+                    models.Index(
+                        fields=["empresa", "departamento", "tipo"],
+                        name="resumen_eval_emp_dep_tipo_idx",
+                    )
+                ],
+                "constraints": [
+                    models.UniqueConstraint(
+                        fields=("evaluado", "tipo"),
+                        name="uniq_resumen_eval_evaluado_tipo",
+                    )
+                ],
+            },
+        ),
+        migrations.RunPython(poblar_resumenes, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,89 @@
+# Generated by Django 5.2.18 on 2026-10-18 19:05
+
+import re
+import unicodedata
+
+from django.db import migrations
+
+# SQL y normalización congelados aquí (copia de core/utils_busqueda.py y core/utils._norm
+# al crear el índice): la migración no debe cambiar si el código de la app cambia.
+SQL_CREAR = {
+    "sqlite": [
+        "CREATE VIRTUAL TABLE IF NOT EXISTS core_tarea_busqueda USING fts5("
+        "titulo, descripcion, asignado, departamento, tokenize='unicode61 remove_diacritics 2')",
+    ],
+    "postgresql": [
+        "CREATE TABLE IF NOT EXISTS core_tarea_busqueda ("
+        "tarea_id bigint PRIMARY KEY REFERENCES core_tarea(id) ON DELETE CASCADE DEFERRABLE INITIALLY DEFERRED, "
+        "documento tsvector NOT NULL)",
+        "CREATE INDEX IF NOT EXISTS core_tarea_busqueda_gin ON core_tarea_busqueda USING GIN (documento)",
+    ],
+}
+SQL_BORRAR = "DROP TABLE IF EXISTS core_tarea_busqueda"
+
+SQL_INSERTAR = {
+    "sqlite": "INSERT INTO core_tarea_busqueda (rowid, titulo, descripcion, asignado, departamento) "
+    "VALUES (%s, %s, %s, %s, %s)",
+    "postgresql": "INSERT INTO core_tarea_busqueda (tarea_id, documento) VALUES (%s, "
+    "setweight(to_tsvector('simple', %s), 'A') || setweight(to_tsvector('simple', %s), 'D') || "
+    "setweight(to_tsvector('simple', %s), 'B') || setweight(to_tsvector('simple', %s), 'C')) "
+    "ON CONFLICT (tarea_id) DO UPDATE SET documento = EXCLUDED.documento",
+}
+
+
+def _norm(s):
+    s = unicodedata.normalize("NFKD", (s or "").strip().lower())
+    s = "".join(c for c in s if not unicodedata.combining(c))
+    return re.sub(r"\s+", " ", s)
+
+
+def crear_indice(apps, schema_editor):
+    conn = schema_editor.connection
+    if conn.vendor not in SQL_CREAR:
+        return
+    for sql in SQL_CREAR[conn.vendor]:
+        schema_editor.execute(sql)
+    Tarea = apps.get_model("core", "Tarea")
+    filas = Tarea.objects.using(conn.alias).values_list(
+        "id",
+        "titulo",
+        "descripcion",
+        "asignado__primer_nombre",
+        "asignado__primer_apellido",
+        "departamento__nombre",
+    )
+    lote = []
+    with conn.cursor() as cur:
+        for pk, titulo, descripcion, nombre, apellido, depto in filas.iterator(
+            chunk_size=2000
+        ):
+            lote.append(
+                (
+                    pk,
+                    _norm(titulo),
+                    _norm(descripcion),
+                    _norm(f"{nombre or ''} {apellido or ''}"),
+                    _norm(depto),
+                )
+            )
+            if len(lote) >= 500:
+                cur.executemany(SQL_INSERTAR[conn.vendor], lote)
+                lote = []
+        if lote:
+            cur.executemany(SQL_INSERTAR[conn.vendor], lote)
+
+
+def borrar_indice(apps, schema_editor):
+    if schema_editor.connection.vendor in SQL_CREAR:
+        schema_editor.execute(SQL_BORRAR)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("core", "0008_resumenevaluacion"),
+    ]
+
+    operations = [
+        migrations.RunPython(crear_indice, borrar_indice),
+    ]
@@ -0,0 +1,73 @@
+# Generated by Django 5.2.18 on 2026-10-18 19:40
+
+import re
+import unicodedata
+
+from django.db import migrations, models
+
+# Clave y SQL congelados aquí (copia de core/utils_busqueda.py al agregar el campo): la
+# migración no debe cambiar si el código de la app cambia.
+CAMPOS_PERSONA = (
+    "primer_nombre",
+    "segundo_nombre",
+    "primer_apellido",
+    "segundo_apellido",
+    "username",
+    "rut",
+    "email",
+)
+SQL_TRGM_PERSONAS = [
+    "CREATE EXTENSION IF NOT EXISTS pg_trgm",
+    "CREATE INDEX IF NOT EXISTS core_user_busqueda_trgm ON core_user USING GIN (busqueda gin_trgm_ops)",
+]
+SQL_TRGM_PERSONAS_BORRAR = ["DROP INDEX IF EXISTS core_user_busqueda_trgm"]
+
+
+def clave_persona(*partes):
+    texto = unicodedata.normalize("NFKD", " ".join(p for p in partes if p).lower())
+    texto = "".join(c for c in texto if not unicodedata.combining(c))
+    palabras = re.findall(r"\w+", texto)
+    return (" " + " ".join(palabras))[:255] if palabras else ""
+
+
+def poblar_claves(apps, schema_editor):
+    User = apps.get_model("core", "User")
+    db = schema_editor.connection.alias
+    cambios = []
+    for u in User.objects.using(db).select_related("rol").iterator(chunk_size=2000):
+        u.busqueda = clave_persona(
+            *(getattr(u, c) for c in CAMPOS_PERSONA), u.rol.nombre if u.rol_id else ""
+        )
+        cambios.append(u)
+    User.objects.using(db).bulk_update(cambios, ["busqueda"], batch_size=1000)
+
+
+def crear_trigramas(apps, schema_editor):
+    if schema_editor.connection.vendor == "postgresql":
+        for sql in SQL_TRGM_PERSONAS:
+            schema_editor.execute(sql)
+
+
+def borrar_trigramas(apps, schema_editor):
+    if schema_editor.connection.vendor == "postgresql":
+        for sql in SQL_TRGM_PERSONAS_BORRAR:
+            schema_editor.execute(sql)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("core", "0009_busqueda_tareas"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="user",
+            name="busqueda",
+            field=models.CharField(
+                blank=True, default="", editable=False, max_length=255
+            ),
+        ),
+        migrations.RunPython(poblar_claves, migrations.RunPython.noop),
+        migrations.RunPython(crear_trigramas, borrar_trigramas),
+    ]
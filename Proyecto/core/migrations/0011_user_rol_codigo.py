@@ -0,0 +1,62 @@
+# Generated by Django 5.2.18 on 2026-10-18 19:06
+
+import re
+import unicodedata
+
+from django.db import migrations, models
+
+# Copia congelada de core/utils.ROL_CODIGOS y core/utils._norm al crear el campo:
+# la migración no debe cambiar si el código de la app cambia.
+ROL_CODIGOS = {
+    "recursos humanos": "RRHH",
+    "rrhh": "RRHH",
+    "gerente": "GERENTE",
+    "supervisor": "SUPERVISOR",
+    "trabajador": "TRABAJADOR",
+}
+
+
+def _norm(s):
+    s = unicodedata.normalize("NFKD", (s or "").strip().lower())
+    s = "".join(c for c in s if not unicodedata.combining(c))
+    return re.sub(r"\s+", " ", s)
+
+
+def codigo_rol(nombre):
+    return ROL_CODIGOS.get(_norm(nombre), "")
+
+
+def poblar_codigos(apps, schema_editor):
+    Rol = apps.get_model("core", "Rol")
+    User = apps.get_model("core", "User")
+    db = schema_editor.connection.alias
+    for rol in Rol.objects.using(db).all():
+        User.objects.using(db).filter(rol=rol).update(rol_codigo=codigo_rol(rol.nombre))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("core", "0010_user_busqueda"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="user",
+            name="rol_codigo",
+            field=models.CharField(
+                blank=True,
+                choices=[
+                    ("RRHH", "Recursos humanos"),
+                    ("GERENTE", "Gerente"),
+                    ("SUPERVISOR", "Supervisor"),
+                    ("TRABAJADOR", "Trabajador"),
+                ],
+                db_index=True,
+                default="",
+                editable=False,
+                max_length=12,
+            ),
+        ),
+        migrations.RunPython(poblar_codigos, migrations.RunPython.noop),
+    ]
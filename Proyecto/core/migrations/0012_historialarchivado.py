@@ -0,0 +1,81 @@
+# Generated by Django 5.2.18 on 2026-10-18 19:11
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("core", "0011_user_rol_codigo"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="HistorialArchivado",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("desde", models.DateTimeField()),
+                ("hasta", models.DateTimeField()),
+                ("cantidad", models.PositiveIntegerField()),
+                ("datos", models.BinaryField()),
+                ("created_at", models.DateTimeField(auto_now_add=True)),
+                (
+                    "empresa",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="historial_archivado",
+                        to="core.empresa",
+                    ),
+                ),
+                (
+                    "evaluacion",
+                    models.ForeignKey(
+                        blank=True,
+                        null=True,
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="historial_archivado",
+                        to="core.evaluacion",
+                    ),
+                ),
+                (
+                    "tarea",
+                    models.ForeignKey(
+                        blank=True,
+                        null=True,
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="historial_archivado",
+                        to="core.tarea",
+                    ),
+                ),
+            ],
+            options={
+                "indexes": [
+                    models.Index(
+                        fields=["tarea", "hasta"], name="hist_arch_tarea_hasta_idx"
+                    ),
+                    models.Index(
+                        fields=["evaluacion", "hasta"], name="hist_arch_eval_hasta_idx"
+                    ),
+                ],
+                "constraints": [
+                    models.CheckConstraint(
+                        condition=models.Q(
+                            ("tarea__isnull", False),
+                            ("evaluacion__isnull", False),
+                            _connector="XOR",
+                        ),
+                        name="hist_arch_tarea_xor_evaluacion",
+                    )
+                ],
+            },
+        ),
+    ]
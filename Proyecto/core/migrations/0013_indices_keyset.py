@@ -0,0 +1,33 @@
+# Generated by Django 5.2.18 on 2026-10-18 19:14
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("auth", "0012_alter_user_first_name_max_length"),
+        ("core", "0012_historialarchivado"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="evaluacion",
+            index=models.Index(
+                fields=["empresa", "-created_at", "-id"], name="eval_emp_created_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="tarea",
+            index=models.Index(
+                fields=["empresa", "-created_at", "-id"], name="tarea_emp_created_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="user",
+            index=models.Index(
+                fields=["empresa", "primer_apellido", "primer_nombre", "id"],
+                name="user_emp_apellido_nombre_idx",
+            ),
+        ),
+    ]
@@ -0,0 +1,28 @@
+# Generated by Django 5.2.18 on 2026-10-18 19:25
+
+from django.db import migrations, models
+from django.db.models import F
+
+
+def copiar_created_at(apps, schema_editor):
+    # Las filas existentes no se han editado desde que se sabe: updated_at = created_at
+    Evaluacion = apps.get_model("core", "Evaluacion")
+    Evaluacion.objects.using(schema_editor.connection.alias).update(
+        updated_at=F("created_at")
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("core", "0013_indices_keyset"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="evaluacion",
+            name="updated_at",
+            field=models.DateTimeField(auto_now=True),
+        ),
+        migrations.RunPython(copiar_created_at, migrations.RunPython.noop),
+    ]
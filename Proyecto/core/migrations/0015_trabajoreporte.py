@@ -0,0 +1,87 @@
+# Generated by Django 5.2.18 on 2026-10-18 20:07
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("core", "0014_evaluacion_updated_at"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="TrabajoReporte",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "tipo",
+                    models.CharField(
+                        choices=[
+                            ("tareas_pdf", "Tareas (PDF)"),
+                            ("tareas_xlsx", "Tareas (XLSX)"),
+                            ("evals_pdf", "Evaluaciones (PDF)"),
+                            ("evals_xlsx", "Evaluaciones (XLSX)"),
+                        ],
+                        max_length=20,
+                    ),
+                ),
+                ("filtros", models.JSONField(blank=True, default=dict)),
+                ("alcance", models.CharField(max_length=100)),
+                ("clave", models.CharField(db_index=True, max_length=64)),
+                (
+                    "estado",
+                    models.CharField(
+                        choices=[
+                            ("PENDIENTE", "Pendiente"),
+                            ("PROCESANDO", "Procesando"),
+                            ("LISTO", "Listo"),
+                            ("ERROR", "Error"),
+                        ],
+                        default="PENDIENTE",
+                        max_length=12,
+                    ),
+                ),
+                ("archivo", models.CharField(blank=True, default="", max_length=255)),
+                ("error", models.TextField(blank=True, default="")),
+                ("intentos", models.PositiveSmallIntegerField(default=0)),
+                ("created_at", models.DateTimeField(auto_now_add=True)),
+                ("iniciado_at", models.DateTimeField(blank=True, null=True)),
+                ("terminado_at", models.DateTimeField(blank=True, null=True)),
+                (
+                    "empresa",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="trabajos_reporte",
+                        to="core.empresa",
+                    ),
+                ),
+                (
+                    "solicitado_por",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="trabajos_reporte",
+                        to=settings.AUTH_USER_MODEL,
+                    ),
+                ),
+            ],
+            options={
+                "indexes": [
+                    models.Index(
+                        fields=["estado", "created_at"],
+                        name="trab_rep_estado_created_idx",
+                    )
+                ],
+            },
+        ),
+    ]
@@ -0,0 +1,73 @@
+# Generated by Django 5.2.18 on 2026-10-18 20:41
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import F
+
+
+def copiar_tarea_id(apps, schema_editor):
+    HistorialTarea = apps.get_model("core", "HistorialTarea")
+    HistorialTarea.objects.using(schema_editor.connection.alias).update(
+        tarea_ref=F("tarea_id")
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("auth", "0012_alter_user_first_name_max_length"),
+        ("core", "0015_trabajoreporte"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="historialtarea",
+            name="tarea_ref",
+            field=models.BigIntegerField(
+                blank=True, db_index=True, editable=False, null=True
+            ),
+        ),
+        migrations.RunPython(copiar_tarea_id, migrations.RunPython.noop),
+        migrations.AlterField(
+            model_name="historialtarea",
+            name="tarea",
+            field=models.ForeignKey(
+                blank=True,
+                null=True,
+                on_delete=django.db.models.deletion.SET_NULL,
+                related_name="historial",
+                to="core.tarea",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="evaluacion",
+            index=models.Index(
+                fields=["empresa", "updated_at", "id"], name="eval_emp_updated_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="historialtarea",
+            index=models.Index(
+                fields=["empresa", "created_at", "id"], name="histtarea_emp_created_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="historialtarea",
+            index=models.Index(
+                fields=["empresa", "accion", "created_at", "id"],
+                name="histtarea_emp_acc_created_idx",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="tarea",
+            index=models.Index(
+                fields=["empresa", "updated_at", "id"], name="tarea_emp_updated_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="user",
+            index=models.Index(
+                fields=["empresa", "updated_at", "id"], name="user_emp_updated_idx"
+            ),
+        ),
+    ]
@@ -0,0 +1,87 @@
+# Generated by Django 5.2.18 on 2026-10-18 20:44
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("core", "0016_feed_cambios"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="FotoDiariaTareas",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "estado",
+                    models.CharField(
+                        choices=[
+                            ("Pendiente", "Pendiente"),
+                            ("En progreso", "En progreso"),
+                            ("Atrasada", "Atrasada"),
+                            ("Finalizada", "Finalizada"),
+                        ],
+                        max_length=20,
+                    ),
+                ),
+                (
+                    "rol_asignado",
+                    models.CharField(blank=True, default="", max_length=20),
+                ),
+                ("dia", models.DateField()),
+                ("total", models.IntegerField(default=0)),
+                ("vencidas", models.IntegerField(default=0)),
+                ("finalizadas_dia", models.IntegerField(default=0)),
+                ("updated_at", models.DateTimeField(auto_now=True)),
+                (
+                    "departamento",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="fotos_tareas",
+                        to="core.departamento",
+                    ),
+                ),
+                (
+                    "empresa",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="fotos_tareas",
+                        to="core.empresa",
+                    ),
+                ),
+            ],
+            options={
+                "indexes": [
+                    models.Index(
+                        fields=["empresa", "dia"], name="foto_tareas_emp_dia_idx"
+                    ),
+                    models.Index(
+                        fields=["departamento", "dia"], name="foto_tareas_dep_dia_idx"
+                    ),
+                ],
+                "constraints": [
+                    models.UniqueConstraint(
+                        fields=(
+                            "empresa",
+                            "departamento",
+                            "estado",
+                            "rol_asignado",
+                            "dia",
+                        ),
+                        name="uniq_foto_tareas_dia",
+                    )
+                ],
+            },
+        ),
+    ]
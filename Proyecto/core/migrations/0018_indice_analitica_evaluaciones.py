@@ -0,0 +1,27 @@
+# Generated by Django 5.2.18 on 2026-10-18 21:05
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("core", "0017_foto_diaria_tareas"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="evaluacion",
+            index=models.Index(
+                fields=[
+                    "empresa",
+                    "evaluado",
+                    "evaluador",
+                    "puntaje",
+                    "created_at",
+                    "tipo",
+                ],
+                name="eval_emp_analitica_idx",
+            ),
+        ),
+    ]
@@ -0,0 +1,49 @@
+# Generated by Django 5.2.18 on 2026-10-18 21:13
+
+from django.db import migrations, transaction
+from django.db.models import Count
+
+
+def _reconstruir(apps, schema_editor, campo_rol):
+    """Reemplaza los contadores agrupando Tarea por 'campo_rol' del asignado."""
+    Tarea = apps.get_model("core", "Tarea")
+    ContadorTareas = apps.get_model("core", "ContadorTareas")
+    db = schema_editor.connection.alias
+    filas = (
+        Tarea.objects.using(db)
+        .values("empresa_id", "departamento_id", "estado", campo_rol)
+        .annotate(n=Count("id"))
+        .order_by()
+    )
+    nuevos = [
+        ContadorTareas(
+            empresa_id=f["empresa_id"],
+            departamento_id=f["departamento_id"],
+            estado=f["estado"],
+            rol_asignado=f[campo_rol] or "",
+            total=f["n"],
+        )
+        for f in filas
+    ]
+    with transaction.atomic(using=db):
+        ContadorTareas.objects.using(db).all().delete()
+        ContadorTareas.objects.using(db).bulk_create(nuevos, batch_size=1000)
+
+
+def por_codigo(apps, schema_editor):
+    _reconstruir(apps, schema_editor, "asignado__rol_codigo")
+
+
+def por_nombre(apps, schema_editor):
+    _reconstruir(apps, schema_editor, "asignado__rol__nombre")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("core", "0018_indice_analitica_evaluaciones"),
+    ]
+
+    operations = [
+        migrations.RunPython(por_codigo, por_nombre),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 5.2.18 on 2026-10-18 21:32
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("core", "0019_contadores_por_rol_codigo"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="historialtarea",
+            name="asignado_rol",
+            field=models.CharField(blank=True, default="", max_length=12),
+        ),
+        migrations.AddField(
+            model_name="historialtarea",
+            name="departamento_ref",
+            field=models.BigIntegerField(blank=True, editable=False, null=True),
+        ),
+    ]
@@ -0,0 +1,64 @@
+# Generated by Django 5.2.18 on 2026-10-18 21:39
+
+from django.db import migrations, transaction
+from django.db.models import Count
+from django.db.models.functions import Now
+
+# Copia congelada de core/utils.ROL_CODIGOS: coincidencia exacta con Rol.nombre
+# (0011 normalizaba mayúsculas, tildes y aceptaba "rrhh").
+ROL_CODIGOS = {
+    "Recursos humanos": "RRHH",
+    "Gerente": "GERENTE",
+    "Supervisor": "SUPERVISOR",
+    "Trabajador": "TRABAJADOR",
+}
+
+
+def recalcular_codigos(apps, schema_editor):
+    Rol = apps.get_model("core", "Rol")
+    User = apps.get_model("core", "User")
+    Tarea = apps.get_model("core", "Tarea")
+    ContadorTareas = apps.get_model("core", "ContadorTareas")
+    db = schema_editor.connection.alias
+    cambiados = 0
+    for rol in Rol.objects.using(db).all():
+        codigo = ROL_CODIGOS.get(rol.nombre, "")
+        cambiados += (
+            User.objects.using(db)
+            .filter(rol=rol)
+            .exclude(rol_codigo=codigo)
+            .update(rol_codigo=codigo, updated_at=Now())
+        )
+    if not cambiados:
+        return
+    # Los contadores se agrupan por rol_codigo del asignado (como 0019)
+    filas = (
+        Tarea.objects.using(db)
+        .values("empresa_id", "departamento_id", "estado", "asignado__rol_codigo")
+        .annotate(n=Count("id"))
+        .order_by()
+    )
+    nuevos = [
+        ContadorTareas(
+            empresa_id=f["empresa_id"],
+            departamento_id=f["departamento_id"],
+            estado=f["estado"],
+            rol_asignado=f["asignado__rol_codigo"] or "",
+            total=f["n"],
+        )
+        for f in filas
+    ]
+    with transaction.atomic(using=db):
+        ContadorTareas.objects.using(db).all().delete()
+        ContadorTareas.objects.using(db).bulk_create(nuevos, batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("core", "0021_historial_alcance_lapidas"),
+    ]
+
+    operations = [
+        migrations.RunPython(recalcular_codigos, migrations.RunPython.noop),
+    ]
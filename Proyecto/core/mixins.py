@@ -4,13 +4,14 @@ from django.core.exceptions import PermissionDenied
 from django.shortcuts import redirect
 from django.db.models import Q
 from django.views.generic.list import MultipleObjectMixin
+from .utils_suscripcion import suscripcion_activa
 
 
 class SoloRRHHMixin(UserPassesTestMixin):
     def test_func(self):
         u = self.request.user
         try:
-            return u.is_authenticated and u.rol and u.rol.nombre == 'Recursos humanos'
+            return u.is_authenticated and u.rol_codigo == 'RRHH'
         except Exception:
             return False
 
@@ -29,25 +30,25 @@ class SoloRRHHOGerenteMixin(UserPassesTestMixin):
             return False
         
 class RolRequiredMixin(UserPassesTestMixin):
-    allowed = []  # p.ej. ['Gerente','Supervisor']
+    allowed = []  # códigos de User.rol_codigo, p.ej. ['GERENTE','SUPERVISOR']
     def test_func(self):
         u = self.request.user
         try:
-            return u.is_authenticated and u.rol and u.rol.nombre in self.allowed
+            return u.is_authenticated and u.rol_codigo in self.allowed
         except Exception:
             return False
 
 class SoloGerenteMixin(RolRequiredMixin):
-    allowed = ['Gerente']
+    allowed = ['GERENTE']
 
 class SoloSupervisorMixin(RolRequiredMixin):
-    allowed = ['Supervisor']
+    allowed = ['SUPERVISOR']
 
 class SoloTrabajadorMixin(RolRequiredMixin):
-    allowed = ['Trabajador']   
+    allowed = ['TRABAJADOR']   
 
 class SoloGerenteSupervisorMixin(RolRequiredMixin):
-    allowed = ['Gerente', 'Supervisor']
+    allowed = ['GERENTE', 'SUPERVISOR']
 
      
 class EmpresaContextMixin:
@@ -95,8 +96,48 @@ class EmpresaFormMixin:
 
 class SuscripcionActivaRequiredMixin:
     def dispatch(self, request, *args, **kwargs):
-        sub = getattr(request.user.empresa, "suscripcion", None)
-        if not sub or not sub.is_active():
+        if not suscripcion_activa(request.user.empresa_id):
             messages.info(request, "Tu empresa necesita una suscripción activa para usar esta sección.")
             return redirect("billing_overview")
         return super().dispatch(request, *args, **kwargs)
+
+
+class KeysetPaginationMixin:
+    """
+    Paginación por cursor (opt-in) para ListView, en lugar de page=N con OFFSET + COUNT(*).
+    Poner antes de ListView en las bases. Usa ?cursor=<token> y deja en el contexto:
+      - page_obj (PaginaKeyset: has_next/has_previous, next_cursor/previous_cursor, es_keyset)
+      - total_registros: texto del conteo según keyset_conteo ('57', '~12.300', '1000+') o None
+      - paginacion_qs: querystring actual sin page/cursor, para armar los links
+    Si llega alguno de keyset_sin_cursor_si (p.ej. ?q= ordenado por relevancia),
+    se usa el paginador normal de Django.
+    """
+    keyset_ordering = None          # p.ej. ["-created_at", "-id"]; por defecto get_ordering() + id
+    keyset_conteo = "estimado"      # "estimado" | "exacto" | None
+    keyset_sin_cursor_si = ("q",)
+    cursor_param = "cursor"
+
+    def usa_keyset(self):
+        return not any(self.request.GET.get(p) for p in self.keyset_sin_cursor_si)
+
+    def get_keyset_ordering(self):
+        from .utils_paginacion import normalizar_orden
+        return normalizar_orden(self.model, self.keyset_ordering or self.get_ordering() or ["-id"])
+
+    def paginate_queryset(self, queryset, page_size):
+        if not self.usa_keyset():
+            return super().paginate_queryset(queryset, page_size)
+        from .utils_paginacion import contar, paginar_keyset
+        page = paginar_keyset(queryset, self.get_keyset_ordering(), page_size,
+                              token=self.request.GET.get(self.cursor_param))
+        self.total_registros = contar(queryset, self.keyset_conteo) if self.keyset_conteo else None
+        return (None, page, page.object_list, page.has_other_pages())
+
+    def get_context_data(self, **kwargs):
+        ctx = super().get_context_data(**kwargs)
+        params = self.request.GET.copy()
+        for p in ("page", self.cursor_param):
+            params.pop(p, None)
+        ctx["paginacion_qs"] = f"{params.urlencode()}&" if params else ""
+        ctx["total_registros"] = getattr(self, "total_registros", None)
+        return ctx
@@ -1,4 +1,4 @@
-from django.db import models
+from django.db import models, transaction
 from django.conf import settings
 from django.contrib.auth.models import AbstractUser, UserManager as DjangoUserManager
 from .validators import *
@@ -69,6 +69,11 @@ class Rol(models.Model):
             models.UniqueConstraint(fields=["empresa", "nombre"], name="uniq_rol_nombre_por_empresa")
         ]
 
+    @property
+    def codigo(self):
+        """RRHH / GERENTE / SUPERVISOR / TRABAJADOR (ver User.rol_codigo)."""
+        return codigo_rol(self.nombre)
+
     def __str__(self):
         return self.nombre
 
@@ -80,6 +85,15 @@ class User(AbstractUser):
     segundo_apellido = models.CharField(max_length=50, blank=True, null=True)
     rut = models.CharField(max_length=12, validators=[rut_validator])
     rol = models.ForeignKey("Rol", on_delete=models.SET_NULL, null=True, related_name='users')
+    # Copia del rol como código fijo (se sincroniza en save y con signals de Rol),
+    # para filtrar permisos/alcances sin JOIN a Rol ni cargar el FK.
+    ROL_CODIGOS = [
+        ("RRHH", "Recursos humanos"),
+        ("GERENTE", "Gerente"),
+        ("SUPERVISOR", "Supervisor"),
+        ("TRABAJADOR", "Trabajador"),
+    ]
+    rol_codigo = models.CharField(max_length=12, choices=ROL_CODIGOS, blank=True, default="", editable=False, db_index=True)
     departamento = models.ForeignKey("Departamento", on_delete=models.SET_NULL, null=True, blank=True, related_name="miembros")
     telefono = models.CharField(
         max_length=16, blank=True, null=True,
@@ -87,6 +101,9 @@ class User(AbstractUser):
         help_text="Formato E.164 (ej: +56912345678)"
     )
     empresa = models.ForeignKey("Empresa", on_delete=models.CASCADE, related_name="usuarios", null=False, blank=False, db_index=True)
+    # Clave normalizada para buscar personas (ver utils_busqueda.filtrar_personas). Sin índice
+    # B-tree: el LIKE '% termino%' no lo usa; en PostgreSQL lo sirve el GIN de trigramas.
+    busqueda = models.CharField(max_length=255, blank=True, default="", editable=False)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
     objects = CustomUserManager()
@@ -98,6 +115,11 @@ class User(AbstractUser):
         constraints = [
             models.UniqueConstraint(fields=["empresa", "rut"], name="uniq_rut_por_empresa"),
         ]
+        indexes = [
+            models.Index(fields=["empresa", "primer_apellido", "primer_nombre", "id"], name="user_emp_apellido_nombre_idx"),
+            # Feed de cambios (api/cambios/usuarios/): (updated_at, id) > cursor
+            models.Index(fields=["empresa", "updated_at", "id"], name="user_emp_updated_idx"),
+        ]
 
     def clean(self):
         super().clean()
@@ -105,10 +127,38 @@ class User(AbstractUser):
         if self.departamento and self.departamento.empresa_id != self.empresa_id:
             raise ValidationError("El departamento seleccionado no pertenece a la empresa del usuario.")
         
+    def clave_busqueda(self):
+        from .utils_busqueda import CAMPOS_PERSONA, clave_persona
+        rol = self.rol.nombre if self.rol_id else ""
+        return clave_persona(*(getattr(self, c) for c in CAMPOS_PERSONA), rol)
+
     def save(self, *args, **kwargs):
+        from .utils_busqueda import CAMPOS_PERSONA
         self.rut = clean_rut(self.rut)
+        update_fields = kwargs.get("update_fields")
+        # Solo se recalculan los campos derivados si se guardan los que los forman (no en cada login)
+        if update_fields is None:
+            self.busqueda = self.clave_busqueda()
+            self.rol_codigo = self.rol.codigo if self.rol_id else ""
+        else:
+            extra = set()
+            if set(update_fields) & {*CAMPOS_PERSONA, "rol"}:
+                self.busqueda = self.clave_busqueda()
+                extra.add("busqueda")
+            if "rol" in update_fields:
+                self.rol_codigo = self.rol.codigo if self.rol_id else ""
+                extra.add("rol_codigo")
+            if extra:
+                kwargs["update_fields"] = {*update_fields, *extra}
         super().save(*args, **kwargs)
 
+    def get_session_auth_hash(self):
+        # El backend con caché (core/auth_backends.py) no guarda la contraseña sino este hash;
+        # si la contraseña está cargada (p.ej. tras set_password) se calcula de nuevo.
+        if "password" in self.get_deferred_fields() and getattr(self, "_hash_sesion", None):
+            return self._hash_sesion
+        return super().get_session_auth_hash()
+
     def rut_formateado(self):
         return format_rut(self.rut)
 
@@ -149,6 +199,17 @@ class Tarea(models.Model):
     updated_at = models.DateTimeField(auto_now=True)
     empresa = models.ForeignKey("Empresa", on_delete=models.CASCADE, related_name="tareas", db_index=True)
 
+    class Meta:
+        indexes = [
+            # Listados/reportes: empresa + depto + estado, ordenados por vencimiento
+            models.Index(fields=["empresa", "departamento", "estado", "fecha_limite"], name="tarea_emp_dep_est_fl_idx"),
+            # "Mis tareas" filtradas por estado
+            models.Index(fields=["asignado", "estado"], name="tarea_asig_estado_idx"),
+            models.Index(fields=["empresa", "-created_at", "-id"], name="tarea_emp_created_idx"),
+            # Feed de cambios (api/cambios/tareas/): (updated_at, id) > cursor
+            models.Index(fields=["empresa", "updated_at", "id"], name="tarea_emp_updated_idx"),
+        ]
+
     def clean(self):
         super().clean()
         errors = {}
@@ -172,7 +233,16 @@ class Tarea(models.Model):
         if errors:
             from django.core.exceptions import ValidationError
             raise ValidationError(errors)
-        
+
+    # Atómicos: los contadores (core/signals.py) se actualizan en la misma transacción
+    def save(self, *args, **kwargs):
+        with transaction.atomic():
+            super().save(*args, **kwargs)
+
+    def delete(self, *args, **kwargs):
+        with transaction.atomic():
+            return super().delete(*args, **kwargs)
+
     def __str__(self):
         return self.titulo
 
@@ -190,10 +260,19 @@ class Evaluacion(models.Model):
     )
     comentarios = models.TextField(blank=True, null=True)
     created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)  # validador ETag/Last-Modified de la API
     empresa = models.ForeignKey("Empresa", on_delete=models.CASCADE, related_name="evaluaciones", db_index=True)
 
     class Meta:
         ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=["empresa", "evaluado", "created_at"], name="eval_emp_evald_created_idx"),
+            models.Index(fields=["empresa", "-created_at", "-id"], name="eval_emp_created_idx"),
+            models.Index(fields=["empresa", "updated_at", "id"], name="eval_emp_updated_idx"),
+            # Analítica del reporte (core/utils_analitica_eval.py): las dos agregaciones leen solo el índice
+            models.Index(fields=["empresa", "evaluado", "evaluador", "puntaje", "created_at", "tipo"],
+                         name="eval_emp_analitica_idx"),
+        ]
 
     def clean(self):
         super().clean()
@@ -220,6 +299,15 @@ class Evaluacion(models.Model):
         if getattr(dept_eval, "id", None) != getattr(dept_evad, "id", None):
             raise ValidationError("Evaluador y evaluado deben pertenecer al mismo departamento.")
 
+    # Atómicos: el resumen materializado (core/signals.py) se actualiza en la misma transacción
+    def save(self, *args, **kwargs):
+        with transaction.atomic():
+            super().save(*args, **kwargs)
+
+    def delete(self, *args, **kwargs):
+        with transaction.atomic():
+            return super().delete(*args, **kwargs)
+
     def __str__(self):
         return f"{self.get_tipo_display()} - {self.evaluado} por {self.evaluador} ({self.puntaje})"
 
@@ -231,6 +319,12 @@ class Notificacion(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     empresa = models.ForeignKey("Empresa", on_delete=models.CASCADE, related_name="notificaciones")
 
+    class Meta:
+        indexes = [
+            # Campana: no leídas del usuario, más recientes primero
+            models.Index(fields=["usuario", "is_read", "created_at"], name="notif_user_read_created_idx"),
+        ]
+
     def clean(self):
         super().clean()
         if self.usuario and self.usuario.empresa_id != self.empresa_id:
@@ -248,6 +342,11 @@ class Comentario(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     empresa = models.ForeignKey("Empresa", on_delete=models.CASCADE, related_name="comentarios")
 
+    class Meta:
+        indexes = [
+            models.Index(fields=["tarea", "created_at"], name="coment_tarea_created_idx"),
+        ]
+
     def clean(self):
         super().clean()
         if self.tarea and self.tarea.empresa_id != self.empresa_id:
@@ -268,7 +367,10 @@ class HistorialTarea(models.Model):
         ("COMENTARIO", "Nuevo comentario"),
         ("ELIMINADA", "Eliminada"),
     ]
-    tarea = models.ForeignKey('Tarea', on_delete=models.CASCADE, related_name='historial')
+    # SET_NULL para que la entrada ELIMINADA (lápida del feed de cambios) sobreviva a la tarea;
+    # el resto del historial de una tarea borrada se elimina en signals.historial_tarea_borrada
+    tarea = models.ForeignKey('Tarea', on_delete=models.SET_NULL, null=True, blank=True, related_name='historial')
+    tarea_ref = models.BigIntegerField(null=True, blank=True, db_index=True, editable=False)  # id de la tarea, aun borrada
     accion = models.CharField(max_length=20, choices=ACCIONES)
     campo = models.CharField(max_length=50, blank=True, null=True)   
     valor_anterior = models.TextField(blank=True, null=True)
@@ -276,13 +378,29 @@ class HistorialTarea(models.Model):
     realizado_por = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.SET_NULL, null=True, blank=True)
     created_at = models.DateTimeField(auto_now_add=True)
     empresa = models.ForeignKey("Empresa", on_delete=models.CASCADE, related_name="historial_tareas")
+    # Solo en ELIMINADA: id del depto y rol_codigo del asignado al borrar, para dar a las lápidas
+    # el mismo alcance por rol que las tareas (api_views._lapidas_visibles). Entero y no FK, como
+    # tarea_ref: la lápida se escribe durante el borrado en cascada del propio departamento.
+    departamento_ref = models.BigIntegerField(null=True, blank=True, editable=False)
+    asignado_rol = models.CharField(max_length=12, blank=True, default="")
 
     class Meta:
         ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=["tarea", "created_at"], name="histtarea_tarea_created_idx"),
+            # Feed de cambios: historial y lápidas (accion=ELIMINADA) posteriores al cursor
+            models.Index(fields=["empresa", "created_at", "id"], name="histtarea_emp_created_idx"),
+            models.Index(fields=["empresa", "accion", "created_at", "id"], name="histtarea_emp_acc_created_idx"),
+        ]
 
     def save(self, *args, **kwargs):
         if self.tarea and self.tarea.empresa_id and not self.empresa_id:
             self.empresa_id = self.tarea.empresa_id
+        if self.tarea_id and not self.tarea_ref:
+            self.tarea_ref = self.tarea_id
+        if self.accion == "ELIMINADA" and self.tarea_id and not self.departamento_ref:
+            self.departamento_ref = self.tarea.departamento_id
+            self.asignado_rol = self.tarea.asignado.rol_codigo if self.tarea.asignado_id else ""
         super().save(*args, **kwargs)
 
     def __str__(self):
@@ -316,6 +434,149 @@ class HistorialEvaluacion(models.Model):
     def __str__(self):
         return f"[{self.get_accion_display()}] Eval {self.evaluacion_id} ({self.created_at:%Y-%m-%d %H:%M})"
     
+# Historial archivado (almacenamiento frío): eventos antiguos de HistorialTarea /
+# HistorialEvaluacion comprimidos en segmentos por objeto. Se llena con
+# manage.py archivar_historial y se lee con utils_historial.eventos_historial.
+class HistorialArchivado(models.Model):
+    empresa = models.ForeignKey("Empresa", on_delete=models.CASCADE, related_name="historial_archivado")
+    tarea = models.ForeignKey("Tarea", on_delete=models.CASCADE, null=True, blank=True, related_name="historial_archivado")
+    evaluacion = models.ForeignKey("Evaluacion", on_delete=models.CASCADE, null=True, blank=True, related_name="historial_archivado")
+    desde = models.DateTimeField()   # evento más antiguo del segmento
+    hasta = models.DateTimeField()   # evento más reciente del segmento
+    cantidad = models.PositiveIntegerField()
+    datos = models.BinaryField()     # JSON (lista de eventos) comprimido con zlib
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["tarea", "hasta"], name="hist_arch_tarea_hasta_idx"),
+            models.Index(fields=["evaluacion", "hasta"], name="hist_arch_eval_hasta_idx"),
+        ]
+        constraints = [
+            models.CheckConstraint(
+                condition=models.Q(tarea__isnull=False) ^ models.Q(evaluacion__isnull=False),
+                name="hist_arch_tarea_xor_evaluacion",
+            ),
+        ]
+
+    def __str__(self):
+        obj = f"Tarea {self.tarea_id}" if self.tarea_id else f"Eval {self.evaluacion_id}"
+        return f"{obj}: {self.cantidad} eventos ({self.desde:%Y-%m-%d} → {self.hasta:%Y-%m-%d})"
+
+# Exportaciones pesadas (PDF/XLSX) que se generan fuera del request.
+# Las procesa: manage.py procesar_reportes (ver core/utils_trabajos.py)
+class TrabajoReporte(models.Model):
+    TIPOS = [
+        ("tareas_pdf", "Tareas (PDF)"),
+        ("tareas_xlsx", "Tareas (XLSX)"),
+        ("evals_pdf", "Evaluaciones (PDF)"),
+        ("evals_xlsx", "Evaluaciones (XLSX)"),
+    ]
+    ESTADOS = [
+        ("PENDIENTE", "Pendiente"),
+        ("PROCESANDO", "Procesando"),
+        ("LISTO", "Listo"),
+        ("ERROR", "Error"),
+    ]
+    empresa = models.ForeignKey("Empresa", on_delete=models.CASCADE, related_name="trabajos_reporte")
+    solicitado_por = models.ForeignKey(User, on_delete=models.CASCADE, related_name="trabajos_reporte")
+    tipo = models.CharField(max_length=20, choices=TIPOS)
+    filtros = models.JSONField(default=dict, blank=True)
+    alcance = models.CharField(max_length=100)  # rol/depto que determina qué filas entran
+    clave = models.CharField(max_length=64, db_index=True)  # (empresa, tipo, filtros, alcance, versión de datos)
+    estado = models.CharField(max_length=12, choices=ESTADOS, default="PENDIENTE")
+    archivo = models.CharField(max_length=255, blank=True, default="")  # nombre dentro de REPORTES_DIR
+    error = models.TextField(blank=True, default="")
+    intentos = models.PositiveSmallIntegerField(default=0)
+    created_at = models.DateTimeField(auto_now_add=True)
+    iniciado_at = models.DateTimeField(null=True, blank=True)
+    terminado_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        indexes = [
+            # El worker toma el pendiente más antiguo
+            models.Index(fields=["estado", "created_at"], name="trab_rep_estado_created_idx"),
+        ]
+
+    def __str__(self):
+        return f"{self.get_tipo_display()} #{self.pk} ({self.estado})"
+
+# Contadores denormalizados de tareas (dashboard/KPIs).
+# Se mantienen desde core/signals.py; reparar con: manage.py rebuild_contadores_tareas
+class ContadorTareas(models.Model):
+    empresa = models.ForeignKey("Empresa", on_delete=models.CASCADE, related_name="contadores_tareas")
+    departamento = models.ForeignKey("Departamento", on_delete=models.CASCADE, related_name="contadores_tareas")
+    estado = models.CharField(max_length=20, choices=Tarea.ESTADOS)
+    rol_asignado = models.CharField(max_length=50, blank=True, default="")  # rol_codigo del asignado
+    total = models.IntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=["empresa", "departamento", "estado", "rol_asignado"],
+                name="uniq_contador_tareas",
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.departamento_id}/{self.estado}/{self.rol_asignado or '-'}: {self.total}"
+
+# Resumen materializado de evaluaciones por evaluado y tipo (leaderboards/KPIs).
+# Se mantiene desde core/signals.py; reparar con: manage.py rebuild_resumen_evaluaciones
+class ResumenEvaluacion(models.Model):
+    empresa = models.ForeignKey("Empresa", on_delete=models.CASCADE, related_name="resumenes_evaluacion")
+    evaluado = models.ForeignKey(User, on_delete=models.CASCADE, related_name="resumenes_evaluacion")
+    departamento = models.ForeignKey("Departamento", on_delete=models.SET_NULL, null=True, blank=True,
+                                     related_name="resumenes_evaluacion")  # depto actual del evaluado
+    tipo = models.CharField(max_length=20, choices=Evaluacion.TIPO)
+    suma = models.IntegerField(default=0)
+    cantidad = models.IntegerField(default=0)
+    minimo = models.IntegerField(null=True, blank=True)
+    maximo = models.IntegerField(null=True, blank=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["evaluado", "tipo"], name="uniq_resumen_eval_evaluado_tipo"),
+        ]
+        indexes = [
+            models.Index(fields=["empresa", "departamento", "tipo"], name="resumen_eval_emp_dep_tipo_idx"),
+        ]
+
+    @property
+    def promedio(self):
+        return (self.suma / self.cantidad) if self.cantidad else None
+
+    def __str__(self):
+        return f"{self.evaluado_id}/{self.tipo}: {self.cantidad} eval."
+
+# Foto diaria de tareas por (empresa, depto, estado, rol del asignado): la escribe
+# manage.py foto_diaria_tareas (cron nocturno) y las tendencias del dashboard solo leen esta tabla
+class FotoDiariaTareas(models.Model):
+    empresa = models.ForeignKey("Empresa", on_delete=models.CASCADE, related_name="fotos_tareas")
+    departamento = models.ForeignKey("Departamento", on_delete=models.CASCADE, related_name="fotos_tareas")
+    estado = models.CharField(max_length=20, choices=Tarea.ESTADOS)
+    rol_asignado = models.CharField(max_length=20, blank=True, default="")  # rol_codigo del asignado
+    dia = models.DateField()
+    total = models.IntegerField(default=0)
+    vencidas = models.IntegerField(default=0)  # fecha_limite < dia y sin finalizar
+    finalizadas_dia = models.IntegerField(default=0)  # solo estado Finalizada: terminadas ese día
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["empresa", "departamento", "estado", "rol_asignado", "dia"],
+                                    name="uniq_foto_tareas_dia"),
+        ]
+        indexes = [
+            models.Index(fields=["empresa", "dia"], name="foto_tareas_emp_dia_idx"),
+            models.Index(fields=["departamento", "dia"], name="foto_tareas_dep_dia_idx"),
+        ]
+
+    def __str__(self):
+        return f"{self.dia} {self.departamento_id}/{self.estado}/{self.rol_asignado or '-'}: {self.total}"
+
 class PasswordResetSMS(models.Model):
     user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name="resets_sms")
     telefono = models.CharField(max_length=20)
@@ -39,7 +39,7 @@ class EvaluacionSerializer(serializers.ModelSerializer):
         fields = ["id","puntaje","comentarios","created_at","created_at_fmt","supervisor_nombre"]
 
     def get_supervisor_nombre(self, obj):
-        s = obj.supervisor
+        s = obj.evaluador
         return f"{getattr(s,'primer_nombre','')} {getattr(s,'primer_apellido','')}".strip()
 
     def get_created_at_fmt(self, obj):
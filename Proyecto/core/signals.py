@@ -1,10 +1,287 @@
 # core/signals.py
-from django.db.models.signals import post_save
+from django.db.models.signals import post_save, pre_save, post_delete
+from django.db import transaction
+from django.db.models.functions import Now
 from django.dispatch import receiver
-from .models import Empresa, SuscripcionEmpresa
+from .models import (Empresa, SuscripcionEmpresa, Tarea, User, Evaluacion, ResumenEvaluacion, Departamento, Rol, Notificacion,
+                     HistorialTarea)
+from .utils_contadores import ajustar_contador, rol_de_usuario, reconstruir_contadores
+from .utils_resumen_eval import sumar_evaluacion, recalcular_resumen
+from .utils_busqueda import indexar_tareas, desindexar_tarea, reconstruir_claves_personas
+from .auth_backends import invalidar_usuarios, invalidar_usuarios_de
+from .utils_suscripcion import guardar_estado_suscripcion, olvidar_estado_suscripcion
+from .utils_notif import sumar_no_leidas, olvidar_no_leidas
+from .utils_dashboard import invalidar_dashboard, invalidar_dashboard_empresa
+from .utils_referencia import invalidar_referencia
+from .utils import codigo_rol
 
 @receiver(post_save, sender=Empresa)
 def crear_suscripcion_por_defecto(sender, instance, created, **kwargs):
     if created:
         # Evita duplicados si ya existe
         SuscripcionEmpresa.objects.get_or_create(empresa=instance)
+
+
+# --- Contadores de tareas (empresa, depto, estado, rol del asignado) ---
+def _clave_contador(empresa_id, departamento_id, estado, asignado_id):
+    return (empresa_id, departamento_id, estado, rol_de_usuario(asignado_id))
+
+@receiver(pre_save, sender=Tarea)
+def contador_tarea_pre_save(sender, instance, raw=False, **kwargs):
+    instance._contador_prev = None
+    if raw or not instance.pk:
+        return
+    prev = (Tarea.objects.filter(pk=instance.pk)
+            .values("empresa_id", "departamento_id", "estado", "asignado_id").first())
+    if prev:
+        instance._contador_prev = prev
+
+@receiver(post_save, sender=Tarea)
+def contador_tarea_post_save(sender, instance, created, raw=False, **kwargs):
+    if raw:
+        return
+    nueva = _clave_contador(instance.empresa_id, instance.departamento_id, instance.estado, instance.asignado_id)
+    prev = getattr(instance, "_contador_prev", None)
+    if prev:
+        anterior = _clave_contador(prev["empresa_id"], prev["departamento_id"], prev["estado"], prev["asignado_id"])
+        if anterior == nueva:
+            return
+        ajustar_contador(*anterior, delta=-1)
+    ajustar_contador(*nueva, delta=1)
+
+@receiver(post_delete, sender=Tarea)
+def contador_tarea_post_delete(sender, instance, **kwargs):
+    ajustar_contador(*_clave_contador(instance.empresa_id, instance.departamento_id,
+                                      instance.estado, instance.asignado_id), delta=-1)
+
+@receiver(pre_save, sender=User)
+def contador_user_pre_save(sender, instance, raw=False, update_fields=None, **kwargs):
+    instance._rol_prev = instance.rol_id
+    instance._depto_prev = instance.departamento_id
+    instance._nombre_prev = (instance.primer_nombre, instance.primer_apellido)
+    if raw or not instance.pk:
+        return
+    vigilados = {"rol", "departamento", "primer_nombre", "primer_apellido"}
+    if update_fields is not None and not vigilados & set(update_fields):
+        return
+    prev = (User.objects.filter(pk=instance.pk)
+            .values("rol_id", "departamento_id", "primer_nombre", "primer_apellido").first())
+    if prev:
+        instance._rol_prev = prev["rol_id"]
+        instance._depto_prev = prev["departamento_id"]
+        instance._nombre_prev = (prev["primer_nombre"], prev["primer_apellido"])
+
+@receiver(post_save, sender=User)
+def contador_user_post_save(sender, instance, created, raw=False, **kwargs):
+    if raw or created:
+        return
+    # Si cambia el rol de alguien con tareas, sus tareas cambian de "rol asignado"
+    if getattr(instance, "_rol_prev", instance.rol_id) != instance.rol_id:
+        if Tarea.objects.filter(asignado=instance).exists():
+            reconstruir_contadores(empresa=instance.empresa_id)
+    # El resumen de evaluaciones guarda el depto actual del evaluado
+    if getattr(instance, "_depto_prev", instance.departamento_id) != instance.departamento_id:
+        ResumenEvaluacion.objects.filter(evaluado=instance).update(departamento_id=instance.departamento_id)
+    # El índice de búsqueda de tareas incluye el nombre del asignado
+    if getattr(instance, "_nombre_prev", None) != (instance.primer_nombre, instance.primer_apellido):
+        indexar_tareas(qs=Tarea.objects.filter(asignado=instance))
+
+
+# --- Resumen de evaluaciones por (evaluado, tipo) ---
+@receiver(pre_save, sender=Evaluacion)
+def resumen_eval_pre_save(sender, instance, raw=False, **kwargs):
+    instance._resumen_prev = None
+    if raw or not instance.pk:
+        return
+    instance._resumen_prev = (Evaluacion.objects.filter(pk=instance.pk)
+                              .values_list("evaluado_id", "tipo").first())
+
+@receiver(post_save, sender=Evaluacion)
+def resumen_eval_post_save(sender, instance, created, raw=False, **kwargs):
+    if raw:
+        return
+    prev = getattr(instance, "_resumen_prev", None)
+    if created or not prev:
+        sumar_evaluacion(instance)
+        return
+    recalcular_resumen(instance.evaluado_id, instance.tipo)
+    if prev != (instance.evaluado_id, instance.tipo):
+        recalcular_resumen(*prev)
+
+@receiver(post_delete, sender=Evaluacion)
+def resumen_eval_post_delete(sender, instance, **kwargs):
+    recalcular_resumen(instance.evaluado_id, instance.tipo)
+
+
+# --- Índice de búsqueda de tareas (core/utils_busqueda.py) ---
+@receiver(post_save, sender=Tarea)
+def busqueda_tarea_post_save(sender, instance, raw=False, **kwargs):
+    if not raw:
+        indexar_tareas([instance.pk])
+
+@receiver(post_delete, sender=Tarea)
+def busqueda_tarea_post_delete(sender, instance, **kwargs):
+    desindexar_tarea(instance.pk)
+
+@receiver(pre_save, sender=Departamento)
+def busqueda_depto_pre_save(sender, instance, raw=False, **kwargs):
+    instance._nombre_prev = instance.nombre
+    if not raw and instance.pk:
+        instance._nombre_prev = Departamento.objects.filter(pk=instance.pk).values_list("nombre", flat=True).first()
+
+@receiver(post_save, sender=Departamento)
+def busqueda_depto_post_save(sender, instance, created, raw=False, **kwargs):
+    if not raw and not created and instance._nombre_prev != instance.nombre:
+        indexar_tareas(qs=Tarea.objects.filter(departamento=instance))
+
+
+# --- Datos del rol copiados en User (rol_codigo y la clave de búsqueda) ---
+@receiver(pre_save, sender=Rol)
+def rol_pre_save(sender, instance, raw=False, **kwargs):
+    instance._nombre_prev = instance.nombre
+    if not raw and instance.pk:
+        instance._nombre_prev = Rol.objects.filter(pk=instance.pk).values_list("nombre", flat=True).first()
+
+@receiver(post_save, sender=Rol)
+def rol_post_save(sender, instance, created, raw=False, **kwargs):
+    if raw or created or instance._nombre_prev == instance.nombre:
+        return
+    # update() no pasa por auto_now: se marca updated_at para que /api/cambios/usuarios/ lo entregue
+    User.objects.filter(rol=instance).exclude(rol_codigo=instance.codigo).update(
+        rol_codigo=instance.codigo, updated_at=Now())
+    reconstruir_claves_personas(User.objects.filter(rol=instance))
+    # Los contadores de tareas se agrupan por rol_codigo del asignado
+    if codigo_rol(instance._nombre_prev or "") != instance.codigo:
+        reconstruir_contadores(empresa=instance.empresa_id)
+
+@receiver(post_delete, sender=Rol)
+def rol_post_delete(sender, instance, **kwargs):
+    # on_delete=SET_NULL deja rol=NULL con un UPDATE masivo (sin save); limpiamos el código
+    limpiados = (User.objects.filter(empresa_id=instance.empresa_id, rol__isnull=True)
+                 .exclude(rol_codigo="").update(rol_codigo="", updated_at=Now()))
+    if limpiados:
+        reconstruir_contadores(empresa=instance.empresa_id)
+
+
+# --- Caché de request.user con rol/depto/empresa/suscripción (core/auth_backends.py) ---
+@receiver(post_save, sender=User)
+@receiver(post_delete, sender=User)
+def cache_usuario_user(sender, instance, **kwargs):
+    invalidar_usuarios([instance.pk])
+
+@receiver(post_save, sender=Rol)
+@receiver(post_save, sender=Departamento)
+@receiver(post_delete, sender=Rol)
+@receiver(post_delete, sender=Departamento)
+def cache_usuario_rol_depto(sender, instance, **kwargs):
+    # En borrados el FK ya quedó en NULL (SET_NULL): se invalida toda la empresa
+    invalidar_usuarios_de(empresa_id=instance.empresa_id)
+
+@receiver(post_save, sender=Empresa)
+def cache_usuario_empresa(sender, instance, created, **kwargs):
+    if not created:
+        invalidar_usuarios_de(empresa_id=instance.pk)
+
+@receiver(post_save, sender=SuscripcionEmpresa)
+@receiver(post_delete, sender=SuscripcionEmpresa)
+def cache_usuario_suscripcion(sender, instance, **kwargs):
+    invalidar_usuarios_de(empresa_id=instance.empresa_id)
+
+
+# --- Estado de suscripción por empresa (core/utils_suscripcion.py) ---
+@receiver(post_save, sender=SuscripcionEmpresa)
+def cache_estado_suscripcion(sender, instance, raw=False, **kwargs):
+    guardar_estado_suscripcion(instance)
+
+@receiver(post_delete, sender=SuscripcionEmpresa)
+def cache_estado_suscripcion_borrada(sender, instance, **kwargs):
+    olvidar_estado_suscripcion(instance.empresa_id)
+
+
+# --- Contador de notificaciones no leídas (core/utils_notif.py) ---
+@receiver(post_save, sender=Notificacion)
+def contador_notif_post_save(sender, instance, created, raw=False, **kwargs):
+    if raw:
+        return
+    if created and not instance.is_read:
+        # Tras el commit: si la transacción se revierte, el contador no queda inflado
+        transaction.on_commit(lambda: sumar_no_leidas(instance.usuario_id))
+    elif not created:
+        olvidar_no_leidas(instance.usuario_id)
+
+@receiver(post_delete, sender=Notificacion)
+def contador_notif_post_delete(sender, instance, **kwargs):
+    olvidar_no_leidas(instance.usuario_id)
+
+
+# --- Versión del dashboard cacheado por (empresa, depto, rol) (core/utils_dashboard.py) ---
+@receiver(post_save, sender=Tarea)
+@receiver(post_delete, sender=Tarea)
+def dashboard_tarea(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    prev = getattr(instance, "_contador_prev", None) or {}
+    invalidar_dashboard(instance.empresa_id, [instance.departamento_id, prev.get("departamento_id")])
+
+@receiver(post_save, sender=Evaluacion)
+@receiver(post_delete, sender=Evaluacion)
+def dashboard_evaluacion(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    # El dashboard agrupa evaluaciones por el depto del evaluado
+    evaluados = {instance.evaluado_id}
+    prev = getattr(instance, "_resumen_prev", None)
+    if prev:
+        evaluados.add(prev[0])
+    deptos = User.objects.filter(pk__in=evaluados).values_list("departamento_id", flat=True)
+    invalidar_dashboard(instance.empresa_id, list(deptos))
+
+@receiver(post_save, sender=User)
+@receiver(post_delete, sender=User)
+def dashboard_user(sender, instance, raw=False, update_fields=None, **kwargs):
+    # Guardados como el de last_login al iniciar sesión no cambian el dashboard
+    vigilados = {"rol", "rol_codigo", "departamento", "empresa", "primer_nombre", "primer_apellido"}
+    if raw or (update_fields is not None and not vigilados & set(update_fields)):
+        return
+    invalidar_dashboard(instance.empresa_id,
+                        [instance.departamento_id, getattr(instance, "_depto_prev", None)])
+
+@receiver(post_save, sender=Rol)
+@receiver(post_delete, sender=Rol)
+def dashboard_rol(sender, instance, raw=False, **kwargs):
+    # usuarios_por_rol y los top muestran el nombre del rol
+    if not raw:
+        invalidar_dashboard_empresa(instance.empresa_id)
+
+
+# --- Datos de referencia por empresa: roles, deptos, miembros (core/utils_referencia.py) ---
+@receiver(post_save, sender=User)
+@receiver(post_delete, sender=User)
+def referencia_user(sender, instance, raw=False, update_fields=None, **kwargs):
+    vigilados = {"rol", "rol_codigo", "departamento", "empresa", "username", "primer_nombre", "primer_apellido"}
+    if raw or (update_fields is not None and not vigilados & set(update_fields)):
+        return
+    invalidar_referencia(instance.empresa_id)
+
+@receiver(post_save, sender=Rol)
+@receiver(post_save, sender=Departamento)
+@receiver(post_delete, sender=Rol)
+@receiver(post_delete, sender=Departamento)
+def referencia_rol_depto(sender, instance, raw=False, **kwargs):
+    if not raw:
+        invalidar_referencia(instance.empresa_id)
+
+
+# --- Lápidas del feed de cambios (core/utils_cambios.py) ---
+@receiver(post_delete, sender=Tarea)
+def historial_tarea_borrada(sender, instance, origin=None, **kwargs):
+    # HistorialTarea.tarea es SET_NULL: de la tarea borrada se conserva solo la entrada
+    # ELIMINADA (la de TareaDeleteView, o una nueva si se borró por otra vía: admin, cascada...)
+    huerfanas = HistorialTarea.objects.filter(tarea_ref=instance.pk, tarea__isnull=True)
+    huerfanas.exclude(accion="ELIMINADA").delete()
+    if isinstance(origin, Empresa) or getattr(origin, "model", None) is Empresa:
+        return  # se borra la empresa completa: su historial también desaparece
+    if not huerfanas.filter(accion="ELIMINADA").exists():
+        HistorialTarea.objects.create(tarea_ref=instance.pk, accion="ELIMINADA", valor_anterior=instance.titulo,
+                                      empresa_id=instance.empresa_id, departamento_ref=instance.departamento_id,
+                                      asignado_rol=rol_de_usuario(instance.asignado_id))
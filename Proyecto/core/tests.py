@@ -1,3 +1,370 @@
-from django.test import TestCase
+import os
+import tempfile
+from datetime import timedelta
 
-# Create your tests here.
+from django.core.cache import cache
+from django.db.models import Count, Max, Min, Sum
+from django.test import RequestFactory, TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from . import utils_trabajos
+from .auth_backends import CachedModelBackend, clave_usuario
+from .mixins import SoloGerenteMixin, SoloRRHHMixin, SoloRRHHOGerenteMixin
+from .models import (ContadorTareas, Departamento, Empresa, EstadoSub, Evaluacion, HistorialTarea, ResumenEvaluacion, Rol,
+                     SuscripcionEmpresa, Tarea, TrabajoReporte, User)
+from .utils_busqueda import buscar_tareas, filtrar_personas
+from .utils_referencia import miembros
+
+
+class DatosEmpresaMixin:
+    """Empresa con los cuatro roles, dos departamentos y un usuario por rol."""
+
+    def setUp(self):
+        super().setUp()
+        cache.clear()  # las claves llevan ids, que se reutilizan entre tests
+        self.empresa = Empresa.objects.create(nombre="Empresa de prueba")
+        self.roles = {n: Rol.objects.create(empresa=self.empresa, nombre=n)
+                      for n in ("Recursos humanos", "Gerente", "Supervisor", "Trabajador")}
+        self.d1 = Departamento.objects.create(empresa=self.empresa, nombre="Ventas")
+        self.d2 = Departamento.objects.create(empresa=self.empresa, nombre="Operaciones")
+        self.rrhh = self.usuario("rrhh", "Recursos humanos", None)
+        self.gerente = self.usuario("gerente", "Gerente", self.d1)
+        self.supervisor = self.usuario("supervisor", "Supervisor", self.d1)
+        self.trabajador = self.usuario("trabajador", "Trabajador", self.d1)
+        self.trabajador2 = self.usuario("trabajador2", "Trabajador", self.d2)
+
+    def usuario(self, username, rol, depto, nombre="Juan", apellido="Pérez"):
+        self._rut = getattr(self, "_rut", 10000000) + 1
+        u = User(username=username, primer_nombre=nombre, primer_apellido=apellido, rut=str(self._rut),
+                 empresa=self.empresa, rol=self.roles[rol], departamento=depto)
+        u.set_password("clave")
+        u.save()
+        return u
+
+    def tarea(self, depto, asignado, estado="Pendiente", titulo="Informe mensual"):
+        return Tarea.objects.create(empresa=self.empresa, departamento=depto, asignado=asignado, estado=estado,
+                                    titulo=titulo, fecha_limite=timezone.localdate() + timedelta(days=3))
+
+
+class LapidasTareaTests(DatosEmpresaMixin, TestCase):
+    def test_borrar_departamento_con_tareas(self):
+        tarea_id = self.tarea(self.d2, self.trabajador2).pk
+        depto_id = self.d2.pk
+        self.d2.delete()  # la cascada borra la tarea y su post_delete escribe la lápida
+        lapida = HistorialTarea.objects.get(tarea_ref=tarea_id, accion="ELIMINADA")
+        self.assertEqual(lapida.departamento_ref, depto_id)
+        self.assertEqual(lapida.asignado_rol, "TRABAJADOR")
+
+    def test_lapidas_con_alcance_del_rol(self):
+        from .api_views import _lapidas_visibles
+        propia = self.tarea(self.d1, self.trabajador).pk
+        de_supervisor = self.tarea(self.d1, self.supervisor).pk
+        ajena = self.tarea(self.d2, self.trabajador2).pk
+        Tarea.objects.filter(pk__in=[propia, de_supervisor, ajena]).delete()
+
+        def visibles(user):
+            return set(_lapidas_visibles(user).values_list("tarea_ref", flat=True))
+
+        self.assertEqual(visibles(self.rrhh), {propia, de_supervisor, ajena})
+        self.assertEqual(visibles(self.gerente), {propia, de_supervisor})
+        self.assertEqual(visibles(self.supervisor), {propia})
+
+
+class TrabajosReporteTests(DatosEmpresaMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        directorio = tempfile.TemporaryDirectory()
+        self.addCleanup(directorio.cleanup)
+        ajuste = override_settings(REPORTES_DIR=directorio.name)
+        ajuste.enable()
+        self.addCleanup(ajuste.disable)
+        self.tarea(self.d1, self.trabajador)
+
+    def trabajo(self, **campos):
+        return TrabajoReporte.objects.create(empresa=self.empresa, solicitado_por=self.rrhh, tipo="tareas_xlsx",
+                                             alcance="RRHH:-", clave="x", **campos)
+
+    def test_agotado_pasa_a_error(self):
+        viejo = timezone.now() - timedelta(minutes=utils_trabajos.MINUTOS_ABANDONO + 1)
+        t = self.trabajo(estado="PROCESANDO", iniciado_at=viejo, intentos=utils_trabajos.MAX_INTENTOS)
+        self.assertIsNone(utils_trabajos.tomar_siguiente())
+        t.refresh_from_db()
+        self.assertEqual(t.estado, "ERROR")
+
+    def test_intento_reclamado_no_publica(self):
+        self.trabajo()
+        primero = utils_trabajos.tomar_siguiente()
+        # Otro worker lo reclama como abandonado mientras el primero sigue generando
+        TrabajoReporte.objects.filter(pk=primero.pk).update(intentos=primero.intentos + 1)
+        self.assertFalse(utils_trabajos.procesar(primero))
+        primero.refresh_from_db()
+        self.assertEqual(primero.estado, "PROCESANDO")
+        self.assertEqual(os.listdir(utils_trabajos.directorio_reportes()), [])
+
+    def test_procesar_deja_listo(self):
+        self.trabajo()
+        t = utils_trabajos.tomar_siguiente()
+        self.assertTrue(utils_trabajos.procesar(t))
+        t.refresh_from_db()
+        self.assertEqual(t.estado, "LISTO")
+        self.assertEqual(os.listdir(utils_trabajos.directorio_reportes()), [t.archivo])
+
+
+class CodigoRolEnFeedTests(DatosEmpresaMixin, TestCase):
+    """Los cambios de rol_codigo por UPDATE masivo deben mover updated_at (feed /api/cambios/usuarios/)."""
+
+    def setUp(self):
+        super().setUp()
+        self.antes = timezone.now() - timedelta(days=1)
+        User.objects.update(updated_at=self.antes)
+
+    def test_renombrar_rol(self):
+        rol = self.roles["Trabajador"]
+        rol.nombre = "Operario"
+        rol.save()
+        self.trabajador.refresh_from_db()
+        self.assertEqual(self.trabajador.rol_codigo, "")
+        self.assertGreater(self.trabajador.updated_at, self.antes)
+        self.gerente.refresh_from_db()
+        self.assertEqual(self.gerente.updated_at, self.antes)
+
+    def test_borrar_rol(self):
+        self.roles["Supervisor"].delete()
+        self.supervisor.refresh_from_db()
+        self.assertEqual(self.supervisor.rol_codigo, "")
+        self.assertGreater(self.supervisor.updated_at, self.antes)
+
+
+class PermisosPorNombreExactoTests(DatosEmpresaMixin, TestCase):
+    """Los permisos comparan el nombre exacto del rol, como antes de User.rol_codigo."""
+
+    def puede(self, vista, user):
+        request = RequestFactory().get("/")
+        request.user = user
+        v = vista()
+        v.request = request
+        return bool(v.test_func())
+
+    def test_nombres_exactos(self):
+        self.assertEqual(self.gerente.rol_codigo, "GERENTE")
+        self.assertTrue(self.puede(SoloGerenteMixin, self.gerente))
+        self.assertTrue(self.puede(SoloRRHHMixin, self.rrhh))
+        self.assertFalse(self.puede(SoloGerenteMixin, self.supervisor))
+
+    def test_variantes_del_nombre_no_pasan(self):
+        for nombre in ("gerente", "GERENTE ", "Gerente "):
+            rol = Rol.objects.create(empresa=self.empresa, nombre=nombre)
+            u = self.usuario(f"u_{rol.pk}", "Gerente", self.d1)
+            u.rol = rol
+            u.save()
+            self.assertEqual(u.rol_codigo, "")
+            self.assertFalse(self.puede(SoloGerenteMixin, u))
+        rrhh = Rol.objects.create(empresa=self.empresa, nombre="RRHH")
+        self.rrhh.rol = rrhh
+        self.rrhh.save()
+        self.assertFalse(self.puede(SoloRRHHMixin, self.rrhh))
+        self.assertTrue(self.puede(SoloRRHHOGerenteMixin, self.rrhh))
+
+    def test_renombrar_rol_a_variante(self):
+        rol = self.roles["Gerente"]
+        rol.nombre = "gerente"
+        rol.save()
+        self.gerente.refresh_from_db()
+        self.assertEqual(self.gerente.rol_codigo, "")
+
+
+class ReporteTareasKpiTests(DatosEmpresaMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        sub = SuscripcionEmpresa.objects.get(empresa=self.empresa)
+        sub.estado = EstadoSub.ACTIVA
+        sub.save()
+
+    def test_kpis_del_supervisor_coinciden_con_la_tabla(self):
+        self.tarea(self.d1, self.trabajador)
+        self.tarea(self.d1, self.trabajador, estado="Atrasada")
+        self.tarea(self.d1, self.trabajador2)  # tarea del depto asignada a un trabajador de otro depto
+        self.client.force_login(self.supervisor)
+        resp = self.client.get(reverse("reporte_tareas"))
+        self.assertEqual(resp.status_code, 200)
+        self.assertEqual(len(resp.context["tareas"]), 2)
+        self.assertEqual(resp.context["kpi_total"], 2)
+        self.assertEqual(resp.context["kpi_atras"], 1)
+
+
+class ContadoresTareasTests(DatosEmpresaMixin, TestCase):
+    """ContadorTareas (mantenido por signals) debe coincidir siempre con el GROUP BY de Tarea."""
+
+    def assertContadoresCuadran(self):
+        esperado = {(f["empresa_id"], f["departamento_id"], f["estado"], f["asignado__rol_codigo"] or ""): f["n"]
+                    for f in Tarea.objects.values("empresa_id", "departamento_id", "estado", "asignado__rol_codigo")
+                                          .annotate(n=Count("id")).order_by()}
+        actual = {(c.empresa_id, c.departamento_id, c.estado, c.rol_asignado): c.total
+                  for c in ContadorTareas.objects.exclude(total=0)}
+        self.assertEqual(actual, esperado)
+
+    def test_alta_edicion_y_reasignacion(self):
+        t = self.tarea(self.d1, self.trabajador)
+        self.tarea(self.d1, self.supervisor)
+        self.assertContadoresCuadran()
+        t.estado = "Finalizada"
+        t.save()
+        self.assertContadoresCuadran()
+        t.asignado = self.supervisor
+        t.save()
+        self.assertContadoresCuadran()
+        t.departamento, t.asignado = self.d2, self.trabajador2
+        t.save()
+        self.assertContadoresCuadran()
+        t.delete()
+        self.assertContadoresCuadran()
+
+    def test_cambio_de_rol_del_asignado(self):
+        self.tarea(self.d1, self.trabajador)
+        self.trabajador.rol = self.roles["Supervisor"]
+        self.trabajador.save()
+        self.assertContadoresCuadran()
+
+    def test_renombrar_y_borrar_rol(self):
+        self.tarea(self.d1, self.trabajador)
+        self.tarea(self.d2, self.trabajador2, estado="Atrasada")
+        rol = self.roles["Trabajador"]
+        rol.nombre = "Operario"
+        rol.save()
+        self.assertContadoresCuadran()
+        rol.nombre = "Trabajador"
+        rol.save()
+        self.assertContadoresCuadran()
+        rol.delete()
+        self.assertContadoresCuadran()
+
+    def test_borrar_departamento(self):
+        self.tarea(self.d1, self.trabajador)
+        self.tarea(self.d2, self.trabajador2)
+        self.d2.delete()
+        self.assertContadoresCuadran()
+
+
+class ResumenEvaluacionTests(DatosEmpresaMixin, TestCase):
+    def assertResumenesCuadran(self):
+        esperado = {(f["evaluado_id"], f["tipo"]): (f["suma"], f["cantidad"], f["minimo"], f["maximo"])
+                    for f in Evaluacion.objects.values("evaluado_id", "tipo")
+                    .annotate(suma=Sum("puntaje"), cantidad=Count("id"), minimo=Min("puntaje"), maximo=Max("puntaje"))
+                    .order_by()}
+        actual = {(r.evaluado_id, r.tipo): (r.suma, r.cantidad, r.minimo, r.maximo)
+                  for r in ResumenEvaluacion.objects.all()}
+        self.assertEqual(actual, esperado)
+
+    def evaluar(self, evaluado, puntaje, tipo="TRABAJADOR"):
+        return Evaluacion.objects.create(empresa=self.empresa, evaluado=evaluado, evaluador=self.supervisor,
+                                         tipo=tipo, puntaje=puntaje)
+
+    def test_alta_edicion_y_borrado(self):
+        e1 = self.evaluar(self.trabajador, 5)
+        self.evaluar(self.trabajador, 2)
+        self.assertResumenesCuadran()
+        e1.puntaje = 3
+        e1.save()
+        self.assertResumenesCuadran()
+        e1.evaluado = self.trabajador2
+        e1.save()
+        self.assertResumenesCuadran()
+        e1.delete()
+        self.assertResumenesCuadran()
+
+    def test_depto_del_evaluado(self):
+        self.evaluar(self.trabajador, 4)
+        self.trabajador.departamento = self.d2
+        self.trabajador.save()
+        self.assertEqual(ResumenEvaluacion.objects.get(evaluado=self.trabajador).departamento_id, self.d2.pk)
+
+
+class IndiceBusquedaTests(DatosEmpresaMixin, TestCase):
+    def encontradas(self, q):
+        return set(buscar_tareas(Tarea.objects.all(), q).values_list("pk", flat=True))
+
+    def test_tarea_creada_editada_y_borrada(self):
+        t = self.tarea(self.d1, self.trabajador, titulo="Inventario de bodega")
+        self.assertEqual(self.encontradas("invent"), {t.pk})
+        t.titulo = "Cierre contable"
+        t.save()
+        self.assertEqual(self.encontradas("invent"), set())
+        self.assertEqual(self.encontradas("contab"), {t.pk})
+        t.delete()
+        self.assertEqual(self.encontradas("contab"), set())
+
+    def test_renombrar_asignado_y_departamento(self):
+        t = self.tarea(self.d1, self.trabajador)
+        self.trabajador.primer_apellido = "Zúñiga"
+        self.trabajador.save()
+        self.assertEqual(self.encontradas("zuniga"), {t.pk})
+        self.d1.nombre = "Logística"
+        self.d1.save()
+        self.assertEqual(self.encontradas("logistica"), {t.pk})
+        self.assertEqual(self.encontradas("ventas"), set())
+
+
+class DatosCopiadosEnUsuarioTests(DatosEmpresaMixin, TestCase):
+    """User.busqueda y User.rol_codigo siguen a los datos de los que se derivan."""
+
+    def personas(self, q):
+        return set(filtrar_personas(User.objects.all(), q).values_list("username", flat=True))
+
+    def test_busqueda_por_nombre_y_rol(self):
+        self.assertIn("trabajador", self.personas("juan perez"))
+        self.trabajador.primer_nombre = "Ángela"
+        self.trabajador.save()
+        self.assertIn("trabajador", self.personas("angela"))
+        rol = self.roles["Trabajador"]
+        rol.nombre = "Operario"
+        rol.save()
+        self.assertEqual(self.personas("operario"), {"trabajador", "trabajador2"})
+
+    def test_rol_codigo(self):
+        self.assertEqual(self.supervisor.rol_codigo, "SUPERVISOR")
+        self.supervisor.rol = self.roles["Gerente"]
+        self.supervisor.save()
+        self.supervisor.refresh_from_db()
+        self.assertEqual(self.supervisor.rol_codigo, "GERENTE")
+        self.supervisor.rol = None
+        self.supervisor.save()
+        self.supervisor.refresh_from_db()
+        self.assertEqual(self.supervisor.rol_codigo, "")
+
+
+class InvalidacionCacheTests(DatosEmpresaMixin, TestCase):
+    def cacheado(self, user):
+        return cache.get(clave_usuario(user.pk))
+
+    def test_usuario_en_cache(self):
+        backend = CachedModelBackend()
+        self.assertEqual(backend.get_user(self.gerente.pk).primer_nombre, "Juan")
+        self.assertIsNotNone(self.cacheado(self.gerente))
+        self.gerente.primer_nombre = "Pedro"
+        self.gerente.save()
+        self.assertIsNone(self.cacheado(self.gerente))
+        self.assertEqual(backend.get_user(self.gerente.pk).primer_nombre, "Pedro")
+
+    def test_rol_y_departamento_invalidan(self):
+        backend = CachedModelBackend()
+        backend.get_user(self.gerente.pk)
+        rol = self.roles["Gerente"]
+        rol.nombre = "Jefe"
+        rol.save()
+        self.assertEqual(backend.get_user(self.gerente.pk).rol.nombre, "Jefe")
+        self.assertEqual(backend.get_user(self.gerente.pk).rol_codigo, "")
+        self.d1.nombre = "Comercial"
+        self.d1.save()
+        self.assertEqual(backend.get_user(self.gerente.pk).departamento.nombre, "Comercial")
+
+    def test_miembros_de_la_empresa(self):
+        # La versión de la caché de referencia se renueva al confirmar la transacción
+        antes = {p["username"] for p in miembros(self.empresa.pk)}
+        with self.captureOnCommitCallbacks(execute=True):
+            self.usuario("nuevo", "Trabajador", self.d1)
+        self.assertEqual({p["username"] for p in miembros(self.empresa.pk)}, antes | {"nuevo"})
+        with self.captureOnCommitCallbacks(execute=True):
+            self.roles["Supervisor"].delete()
+        fila = next(p for p in miembros(self.empresa.pk) if p["username"] == "supervisor")
+        self.assertEqual(fila["rol_codigo"], "")
@@ -55,14 +55,23 @@ urlpatterns = [
 
     #DASHBOARD/REPORTES:
     path("dashboard/", DashboardView.as_view(), name="dashboard"),
+    path("dashboard/tendencias/", DashboardTendenciasView.as_view(), name="dashboard_tendencias"),
     path("reportes/tareas/", ReporteTareasView.as_view(), name="reporte_tareas"),
+    path("reportes/tareas/tabla/", ReporteTareasTablaView.as_view(), name="reporte_tareas_tabla"),
+    path("reportes/tareas/tiempos/", ReporteTareasTiemposView.as_view(), name="reporte_tareas_tiempos"),
     path("reportes/tareas/pdf/", exportar_tareas_pdf, name="reporte_tareas_pdf"),
     path("reportes/tareas/xlsx/", exportar_tareas_xlsx, name="reporte_tareas_xlsx"),
+    path("reportes/tareas/csv/", exportar_tareas_csv, name="reporte_tareas_csv"),
 
     path("reportes/evaluaciones/", ReporteEvaluacionesView.as_view(), name="reporte_evaluaciones"),
+    path("reportes/evaluaciones/analitica/", ReporteEvaluacionesAnaliticaView.as_view(), name="reporte_evaluaciones_analitica"),
     path("reportes/evaluaciones/pdf/", exportar_evals_pdf, name="reporte_evals_pdf"),
     path("reportes/evaluaciones/xlsx/", exportar_evals_xlsx, name="reporte_evals_xlsx"),
+    path("reportes/evaluaciones/csv/", exportar_evals_csv, name="reporte_evals_csv"),
     path("reportes/pdf-base", pdfbase, name="reporte_pdf_base"),
+    path("reportes/trabajos/<int:pk>/", reporte_trabajo_estado, name="reporte_trabajo_estado"),
+    path("reportes/trabajos/<int:pk>/descargar/", reporte_trabajo_descargar, name="reporte_trabajo_descargar"),
+    path("reportes/trabajos/nuevo/<str:tipo>/", reporte_trabajo_crear, name="reporte_trabajo_crear"),
 
     #HISTORIAL DE TAREAS Y EVALUACIONES:
     path("tareas/<int:pk>/historial/", TareaHistorialView.as_view(), name="tarea_historial"),
@@ -86,6 +95,8 @@ urlpatterns = [
     path("api/tareas/<int:pk>/estado/", TareaEstadoAPI.as_view(), name="api_tarea_estado"),
     path("api/evaluaciones/mias/", MisEvaluacionesAPI.as_view(), name="api_mis_evaluaciones"),
     path("api/me/", MeAPI.as_view(), name="api_me"),
+    path("api/export/<str:recurso>/", ExportacionAPI.as_view(), name="api_export"),
+    path("api/cambios/<str:recurso>/", CambiosAPI.as_view(), name="api_cambios"),
 
     #Notifiaciones
     path("notificaciones/", notif_list_api, name="notif_list_api"),
@@ -15,6 +15,19 @@ def _norm(s: str) -> str:
     s = re.sub(r"\s+", " ", s)
     return s
 
+# Nombre de Rol -> código fijo guardado en User.rol_codigo. Coincidencia exacta, como
+# los chequeos por Rol.nombre a los que reemplaza: "gerente" o "RRHH" no son roles conocidos.
+ROL_CODIGOS = {
+    "Recursos humanos": "RRHH",
+    "Gerente": "GERENTE",
+    "Supervisor": "SUPERVISOR",
+    "Trabajador": "TRABAJADOR",
+}
+
+def codigo_rol(nombre: str) -> str:
+    """Código del rol a partir de su nombre ('' si no es uno de los roles conocidos)."""
+    return ROL_CODIGOS.get(nombre or "", "")
+
 def clean_rut(rut: str) -> str:
     """Deja solo dígitos + DV (0-9 o K)."""
     rut = (rut or "").upper().replace(".", "").replace("-", "").strip()
@@ -0,0 +1,222 @@
+# core/utils_analitica_eval.py
+"""
+Analítica de evaluaciones para los gráficos del reporte (JSON).
+
+Las evaluaciones del alcance se cargan como columnas NumPy desde DOS agregaciones en la BD,
+cubiertas por el índice eval_emp_analitica_idx (no se trae una fila por evaluación):
+
+- (evaluado, evaluador, puntaje) → cantidad: histograma y benevolencia, exactos
+- hora UTC de created_at → suma y cantidad: series diarias y mensuales en hora local
+
+Cada fila agrupada pesa su cantidad y el cálculo es vectorizado:
+
+- histograma de puntajes (1..5)
+- promedio diario y promedio móvil de 'ventana' días (diferencia de sumas acumuladas)
+- benevolencia por evaluador: z = (promedio del evaluador − promedio global) / desvío global
+- promedio normalizado por evaluado: media de (puntaje − media del evaluador) / desvío del
+  evaluador, para comparar personas calificadas por evaluadores más o menos exigentes
+- promedio y cantidad por mes con la variación respecto del mes anterior
+
+Si NumPy no está instalado, calcular_analitica devuelve None.
+"""
+from datetime import date, datetime, time, timedelta
+from datetime import timezone as dt_timezone
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+from django.db import connections
+from django.db.models import Count, Sum
+from django.db.models.expressions import RawSQL
+from django.db.models.functions import TruncHour
+from django.utils import timezone
+
+VENTANA_DIAS = 30
+MAX_VENTANA_DIAS = 180
+LIMITE_PERSONAS = 100  # evaluados en la respuesta (los de más evaluaciones)
+SEGUNDOS_HORA = 3600
+
+# Hora UTC de created_at calculada en la BD sin funciones Python por fila (TruncHour en
+# SQLite llama a una). Otros motores usan TruncHour.
+SQL_HORA = {
+    "sqlite": "substr({col}, 1, 13)",  # texto 'AAAA-MM-DD HH' (se guarda en UTC)
+    "postgresql": "FLOOR(EXTRACT(EPOCH FROM {col}) / 3600)",  # horas desde 1970
+}
+
+
+def ventana_pedida(valor):
+    try:
+        dias = int(valor)
+    except (TypeError, ValueError):
+        return VENTANA_DIAS
+    return min(max(dias, 1), MAX_VENTANA_DIAS)
+
+
+def _expresion_hora(qs):
+    conn = connections[qs.db]
+    plantilla = SQL_HORA.get(conn.vendor)
+    if plantilla is None:
+        return TruncHour("created_at", tzinfo=dt_timezone.utc)
+    col = f"{conn.ops.quote_name(qs.model._meta.db_table)}.{conn.ops.quote_name('created_at')}"
+    return RawSQL(plantilla.format(col=col), [])
+
+
+def _horas(valores):
+    """Horas UTC desde 1970 (int64) desde texto ISO, datetime o número, según el motor."""
+    if isinstance(valores[0], str):
+        return np.array(valores, dtype="datetime64[h]").astype(np.int64)
+    if isinstance(valores[0], datetime):
+        return np.fromiter((v.timestamp() // SEGUNDOS_HORA for v in valores), dtype=np.int64, count=len(valores))
+    return np.array(valores, dtype=np.float64).astype(np.int64)
+
+
+def _dias_locales(horas):
+    """Día local (días desde 1970-01-01) de cada hora UTC; el desfase se calcula por día distinto."""
+    dias_utc = horas // 24
+    unicos, cual = np.unique(dias_utc, return_inverse=True)
+    zona = timezone.get_current_timezone()
+    desfase = np.array([
+        datetime.combine(date(1970, 1, 1) + timedelta(days=int(d)), time(12), tzinfo=zona).utcoffset()
+        // timedelta(hours=1)
+        for d in unicos
+    ], dtype=np.int64)
+    return (horas + desfase[cual]) // 24
+
+
+def cargar_columnas(qs):
+    """Columnas de las dos agregaciones de 'qs', o None si no hay evaluaciones."""
+    base = qs.order_by()
+    pares = list(base.values_list("evaluado_id", "evaluador_id", "puntaje").annotate(cantidad=Count("id")))
+    if not pares:
+        return None
+    horas = list(base.annotate(hora=_expresion_hora(qs)).values_list("hora")
+                 .annotate(suma=Sum("puntaje"), cantidad=Count("id")))
+    evaluados, evaluadores, puntajes, cantidades = zip(*pares)
+    hora, sumas, cant_hora = zip(*horas)
+    return {
+        "evaluado": np.array(evaluados, dtype=np.int64),
+        "evaluador": np.array(evaluadores, dtype=np.int64),
+        "puntaje": np.array(puntajes, dtype=np.float64),
+        "cantidad": np.array(cantidades, dtype=np.float64),
+        "dia": _dias_locales(_horas(hora)),
+        "suma_dia": np.array(sumas, dtype=np.float64),
+        "cantidad_dia": np.array(cant_hora, dtype=np.float64),
+    }
+
+
+def _redondear(arr, decimales=2):
+    """Lista JSON: NaN → None (y sin -0.0)."""
+    return [None if np.isnan(x) else round(float(x), decimales) + 0.0 for x in arr]
+
+
+def _histograma(col):
+    cant = np.bincount(col["puntaje"].astype(np.int64), weights=col["cantidad"], minlength=6)[1:6]
+    return {"puntajes": [1, 2, 3, 4, 5], "cantidades": cant.astype(np.int64).tolist()}
+
+
+def _serie_diaria(col, ventana):
+    """Promedio por día y promedio móvil de 'ventana' días (incluye días sin evaluaciones)."""
+    primero = int(col["dia"].min())
+    pos = col["dia"] - primero
+    n = int(pos.max()) + 1
+    cant = np.bincount(pos, weights=col["cantidad_dia"], minlength=n)
+    suma = np.bincount(pos, weights=col["suma_dia"], minlength=n)
+    # Sumas móviles con la diferencia de acumulados: O(n) sin importar la ventana
+    acum_s, acum_c = np.concatenate(([0.0], np.cumsum(suma))), np.concatenate(([0.0], np.cumsum(cant)))
+    desde = np.maximum(np.arange(n) + 1 - ventana, 0)
+    movil_s = acum_s[1:] - acum_s[desde]
+    movil_c = acum_c[1:] - acum_c[desde]
+    dias = np.datetime64("1970-01-01") + np.arange(primero, primero + n).astype("timedelta64[D]")
+    return {
+        "ventana": ventana,
+        "dias": dias.astype(str).tolist(),
+        "cantidad": cant.astype(np.int64).tolist(),
+        "promedio": _redondear(np.divide(suma, cant, out=np.full(n, np.nan), where=cant > 0)),
+        "promedio_movil": _redondear(np.divide(movil_s, movil_c, out=np.full(n, np.nan), where=movil_c > 0)),
+    }
+
+
+def _mensual(col):
+    """Promedio y cantidad por mes, con la variación respecto del mes anterior."""
+    mes = (np.datetime64("1970-01-01") + col["dia"].astype("timedelta64[D]")).astype("datetime64[M]")
+    meses, g = np.unique(mes, return_inverse=True)
+    cant = np.bincount(g, weights=col["cantidad_dia"])
+    prom = np.bincount(g, weights=col["suma_dia"]) / cant
+    delta = np.full(len(meses), np.nan)
+    delta[1:] = np.diff(prom)
+    delta_cant = np.full(len(meses), np.nan)
+    delta_cant[1:] = np.diff(cant) / cant[:-1] * 100.0
+    return {
+        "meses": meses.astype(str).tolist(),
+        "cantidad": cant.astype(np.int64).tolist(),
+        "promedio": _redondear(prom),
+        "delta_promedio": _redondear(delta),
+        "delta_cantidad_pct": _redondear(delta_cant, 1),
+    }
+
+
+def _por_persona(claves, puntaje, peso):
+    """(ids, inversa, cantidad, media, desvío) ponderados por valor distinto de 'claves'."""
+    ids, g = np.unique(claves, return_inverse=True)
+    cant = np.bincount(g, weights=peso)
+    media = np.bincount(g, weights=peso * puntaje) / cant
+    var = np.bincount(g, weights=peso * puntaje * puntaje) / cant - media * media
+    return ids, g, cant, media, np.sqrt(np.maximum(var, 0))
+
+
+def _benevolencia(col):
+    puntaje, peso = col["puntaje"], col["cantidad"]
+    total = peso.sum()
+    mu = (peso * puntaje).sum() / total
+    sigma = np.sqrt(max((peso * puntaje * puntaje).sum() / total - mu * mu, 0.0))
+    ids, g, cant, media, desvio = _por_persona(col["evaluador"], puntaje, peso)
+    z = (media - mu) / sigma if sigma > 0 else np.zeros(len(ids))
+
+    # Puntaje normalizado por el evaluador que lo puso (evaluador sin varianza → 0)
+    normal = np.divide(puntaje - media[g], desvio[g], out=np.zeros(len(puntaje)), where=desvio[g] > 1e-9)
+    ids_e, g_e, cant_e, media_e, _ = _por_persona(col["evaluado"], puntaje, peso)
+    normal_e = np.bincount(g_e, weights=peso * normal) / cant_e
+    top = np.argsort(-cant_e, kind="stable")[:LIMITE_PERSONAS]
+    top = top[np.argsort(-normal_e[top], kind="stable")]
+
+    evaluadores = [{"id": int(i), "cantidad": int(c), "promedio": round(float(m), 2), "desvio": round(float(d), 2),
+                    "benevolencia_z": round(float(zz), 2) + 0.0}
+                   for i, c, m, d, zz in zip(ids, cant, media, desvio, z)]
+    evaluadores.sort(key=lambda f: -f["benevolencia_z"])
+    evaluados = [{"id": int(ids_e[i]), "cantidad": int(cant_e[i]), "promedio": round(float(media_e[i]), 2),
+                  "promedio_normalizado": round(float(normal_e[i]), 2) + 0.0} for i in top]
+    return {"promedio": round(float(mu), 2), "desvio": round(float(sigma), 2)}, evaluadores, evaluados
+
+
+def _con_nombres(filas):
+    from .models import User
+    nombres = {pk: f"{nom or ''} {ape or ''}".strip() for pk, nom, ape in
+               User.objects.filter(pk__in=[f["id"] for f in filas])
+               .values_list("id", "primer_nombre", "primer_apellido")}
+    for f in filas:
+        f["nombre"] = nombres.get(f["id"], "—")
+    return filas
+
+
+def calcular_analitica(qs, ventana=VENTANA_DIAS):
+    """
+    Dict JSON con histograma, serie diaria, mensual y benevolencia de las evaluaciones
+    de 'qs' (ya filtrado por alcance). None si no hay NumPy.
+    """
+    if np is None:
+        return None
+    col = cargar_columnas(qs)
+    if col is None:
+        return {"total": 0}
+    global_, evaluadores, evaluados = _benevolencia(col)
+    return {
+        "total": int(col["cantidad"].sum()),
+        "global": global_,
+        "histograma": _histograma(col),
+        "diario": _serie_diaria(col, ventana),
+        "mensual": _mensual(col),
+        "evaluadores": _con_nombres(evaluadores),
+        "evaluados": _con_nombres(evaluados),
+    }
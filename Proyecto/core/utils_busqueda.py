@@ -0,0 +1,220 @@
+# core/utils_busqueda.py
+"""
+Búsquedas indexadas.
+
+Tareas: índice de texto completo (título, descripción, asignado, departamento).
+
+- SQLite: tabla virtual FTS5 (rowid = id de la tarea), ranking bm25.
+- PostgreSQL: tabla con tsvector + índice GIN, ranking ts_rank.
+- Otros motores: se mantiene el filtro icontains de siempre.
+
+Los textos se guardan y consultan normalizados con utils._norm, así "Nuñez" y
+"nunez" coinciden en ambos motores sin depender de extensiones (unaccent).
+
+Personas: User.busqueda guarda una clave normalizada (nombres, apellidos, username,
+rut, email, rol) que se consulta por prefijo de palabra (LIKE '% termino%'). En PostgreSQL
+la columna lleva un índice GIN de trigramas (pg_trgm) que sirve ese LIKE; en SQLite se
+recorre dentro del alcance ya filtrado (empresa/depto), sin índice propio.
+"""
+import re
+
+from django.db import connection
+from django.db.models import FloatField, Q
+from django.db.models.expressions import RawSQL
+
+from .utils import _norm
+
+TABLA = "core_tarea_busqueda"
+
+SQL_CREAR = {
+    "sqlite": [
+        f"CREATE VIRTUAL TABLE IF NOT EXISTS {TABLA} USING fts5("
+        "titulo, descripcion, asignado, departamento, tokenize='unicode61 remove_diacritics 2')",
+    ],
+    "postgresql": [
+        f"CREATE TABLE IF NOT EXISTS {TABLA} ("
+        "tarea_id bigint PRIMARY KEY REFERENCES core_tarea(id) ON DELETE CASCADE DEFERRABLE INITIALLY DEFERRED, "
+        "documento tsvector NOT NULL)",
+        f"CREATE INDEX IF NOT EXISTS {TABLA}_gin ON {TABLA} USING GIN (documento)",
+    ],
+}
+SQL_BORRAR = {
+    "sqlite": [f"DROP TABLE IF EXISTS {TABLA}"],
+    "postgresql": [f"DROP TABLE IF EXISTS {TABLA}"],
+}
+
+# Pesos por columna: título > asignado > departamento > descripción
+_BM25 = f"bm25({TABLA}, 10.0, 2.0, 5.0, 3.0)"
+_PG_DOC = ("setweight(to_tsvector('simple', %s), 'A') || setweight(to_tsvector('simple', %s), 'D') || "
+           "setweight(to_tsvector('simple', %s), 'B') || setweight(to_tsvector('simple', %s), 'C')")
+
+
+def busqueda_disponible(conn=None):
+    return (conn or connection).vendor in SQL_CREAR
+
+
+def _documento(titulo, descripcion, nombre, apellido, depto):
+    return (_norm(titulo), _norm(descripcion), _norm(f"{nombre or ''} {apellido or ''}"), _norm(depto))
+
+
+def _filas(tarea_ids=None, qs=None):
+    """Genera (id, titulo, descripcion, asignado, departamento) normalizados, en lotes."""
+    from .models import Tarea
+    if qs is None:
+        qs = Tarea.objects.all()
+    if tarea_ids is not None:
+        qs = qs.filter(pk__in=tarea_ids)
+    rows = qs.values_list("id", "titulo", "descripcion", "asignado__primer_nombre",
+                          "asignado__primer_apellido", "departamento__nombre")
+    for pk, *campos in rows.iterator(chunk_size=2000):
+        yield (pk, *_documento(*campos))
+
+
+def indexar_tareas(tarea_ids=None, qs=None, conn=None):
+    """(Re)indexa las tareas indicadas (ids o queryset)."""
+    conn = conn or connection
+    if not busqueda_disponible(conn):
+        return 0
+    n = 0
+    lote = []
+    for fila in _filas(tarea_ids, qs):
+        lote.append(fila)
+        if len(lote) >= 500:
+            n += _escribir(conn, lote)
+            lote = []
+    if lote:
+        n += _escribir(conn, lote)
+    return n
+
+
+def _escribir(conn, filas):
+    with conn.cursor() as cur:
+        if conn.vendor == "sqlite":
+            cur.executemany(f"DELETE FROM {TABLA} WHERE rowid = %s", [(f[0],) for f in filas])
+            cur.executemany(
+                f"INSERT INTO {TABLA} (rowid, titulo, descripcion, asignado, departamento) VALUES (%s, %s, %s, %s, %s)",
+                filas,
+            )
+        else:
+            cur.executemany(
+                f"INSERT INTO {TABLA} (tarea_id, documento) VALUES (%s, {_PG_DOC}) "
+                "ON CONFLICT (tarea_id) DO UPDATE SET documento = EXCLUDED.documento",
+                filas,
+            )
+    return len(filas)
+
+
+def desindexar_tarea(tarea_id, conn=None):
+    conn = conn or connection
+    if not busqueda_disponible(conn):
+        return
+    col = "rowid" if conn.vendor == "sqlite" else "tarea_id"
+    with conn.cursor() as cur:
+        cur.execute(f"DELETE FROM {TABLA} WHERE {col} = %s", [tarea_id])
+
+
+def reconstruir_indice(conn=None):
+    """Vacía y reconstruye el índice completo. Devuelve el número de tareas indexadas."""
+    conn = conn or connection
+    if not busqueda_disponible(conn):
+        return 0
+    with conn.cursor() as cur:
+        cur.execute(f"DELETE FROM {TABLA}")
+    return indexar_tareas(conn=conn)
+
+
+def _terminos(q):
+    return re.findall(r"\w+", _norm(q))
+
+
+def buscar_tareas(qs, q):
+    """
+    Filtra 'qs' (Tarea) por el texto 'q' y lo ordena por relevancia.
+    Cada palabra se busca como prefijo (búsqueda mientras se escribe).
+    """
+    terminos = _terminos(q)
+    if not terminos:
+        return qs
+    if not busqueda_disponible():
+        cond = Q()
+        for campo in ("titulo", "descripcion", "asignado__primer_nombre",
+                      "asignado__primer_apellido", "departamento__nombre"):
+            cond |= Q(**{f"{campo}__icontains": q})
+        return qs.filter(cond)
+
+    # Filtro: id IN (subconsulta al índice). Ranking: subconsulta correlacionada por id de la
+    # tarea (solo se evalúa sobre las filas que pasaron el filtro).
+    tarea = f"{qs.model._meta.db_table}.id"
+    if connection.vendor == "sqlite":
+        match = " ".join(f'"{t}"*' for t in terminos)
+        ids = RawSQL(f"SELECT rowid FROM {TABLA} WHERE {TABLA} MATCH %s", [match])
+        rank = RawSQL(f"SELECT {_BM25} FROM {TABLA} WHERE {TABLA} MATCH %s AND rowid = {tarea}",
+                      [match], output_field=FloatField())
+        return qs.filter(id__in=ids).annotate(rank=rank).order_by("rank")
+
+    tsq = " & ".join(f"{t}:*" for t in terminos)
+    ids = RawSQL(f"SELECT tarea_id FROM {TABLA} WHERE documento @@ to_tsquery('simple', %s)", [tsq])
+    rank = RawSQL(f"SELECT ts_rank(documento, to_tsquery('simple', %s)) FROM {TABLA} WHERE tarea_id = {tarea}",
+                  [tsq], output_field=FloatField())
+    return qs.filter(id__in=ids).annotate(rank=rank).order_by("-rank")
+
+
+# --- Personas (User.busqueda) ---
+SQL_TRGM_PERSONAS = [
+    "CREATE EXTENSION IF NOT EXISTS pg_trgm",
+    "CREATE INDEX IF NOT EXISTS core_user_busqueda_trgm ON core_user USING GIN (busqueda gin_trgm_ops)",
+]
+SQL_TRGM_PERSONAS_BORRAR = ["DROP INDEX IF EXISTS core_user_busqueda_trgm"]
+
+# Campos de User que forman la clave (rol se agrega por nombre)
+CAMPOS_PERSONA = ("primer_nombre", "segundo_nombre", "primer_apellido", "segundo_apellido",
+                  "username", "rut", "email")
+
+
+def clave_persona(*partes):
+    """
+    Clave de búsqueda: palabras normalizadas separadas por espacio, con un espacio
+    inicial para poder buscar "inicio de palabra" con LIKE '% termino%'.
+    """
+    palabras = re.findall(r"\w+", _norm(" ".join(p for p in partes if p)))
+    return (" " + " ".join(palabras))[:255] if palabras else ""
+
+
+def _terminos_persona(q):
+    # "12.345.678-9" -> "123456789" (el rut se guarda limpio)
+    q = re.sub(r"(?<=\d)[.\-](?=[\dkK])", "", q or "")
+    return _terminos(q)
+
+
+def filtrar_personas(qs, q, *rutas):
+    """
+    Filtra 'qs' por personas cuyo nombre/usuario/rut/email/rol empiece por cada
+    palabra de 'q'. 'rutas' son los caminos al usuario ("" = el propio User,
+    "evaluado", "evaluador", ...); basta con que una de las personas coincida.
+    """
+    terminos = _terminos_persona(q)
+    if not terminos:
+        return qs
+    cond = Q()
+    for ruta in rutas or ("",):
+        campo = f"{ruta}__busqueda__contains" if ruta else "busqueda__contains"
+        parcial = Q()
+        for t in terminos:
+            parcial &= Q(**{campo: f" {t}"})
+        cond |= parcial
+    return qs.filter(cond)
+
+
+def reconstruir_claves_personas(qs=None):
+    """Recalcula User.busqueda (p.ej. tras renombrar un rol). Devuelve filas actualizadas."""
+    from .models import User
+    if qs is None:
+        qs = User.objects.all()
+    cambios = []
+    for u in qs.select_related("rol").only(*CAMPOS_PERSONA, "busqueda", "rol__nombre").iterator(chunk_size=2000):
+        clave = u.clave_busqueda()
+        if clave != u.busqueda:
+            u.busqueda = clave
+            cambios.append(u)
+    User.objects.bulk_update(cambios, ["busqueda"], batch_size=1000)
+    return len(cambios)
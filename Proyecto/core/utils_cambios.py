@@ -0,0 +1,97 @@
+# core/utils_cambios.py
+"""
+Feed de cambios incremental (api/cambios/<recurso>/): filas cambiadas desde un cursor.
+
+- Cada recurso se recorre en orden (fecha, id): updated_at para tareas/evaluaciones/
+  usuarios, created_at para el historial. Con los índices (empresa, fecha, id) cada
+  consulta lee solo las filas posteriores al cursor (filtro_despues_de de utils_paginacion).
+- En tareas, las lápidas (HistorialTarea con accion=ELIMINADA) avanzan con su propio
+  (created_at, id); el cursor firmado guarda ambas posiciones.
+- No se entregan filas más recientes que FEED_RETRASO_SEGUNDOS: una transacción que
+  tomó su updated_at antes pero confirma después quedaría detrás del cursor.
+"""
+from datetime import timedelta
+
+from django.conf import settings
+from django.core import signing
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from .utils_paginacion import filtro_despues_de
+
+SALT_CURSOR = "core.cambios"
+LIMITE_DEFECTO = 500
+LIMITE_MAXIMO = 5000
+
+
+def retraso():
+    return timedelta(seconds=getattr(settings, "FEED_RETRASO_SEGUNDOS", 5))
+
+
+def codificar_cursor(recurso, posiciones):
+    """posiciones: {"c": (fecha, id) de la última fila, "e": (fecha, id) de la última lápida}."""
+    data = {"r": recurso}
+    for k, pos in posiciones.items():
+        if pos:
+            data[k] = [pos[0].isoformat(), pos[1]]
+    return signing.dumps(data, salt=SALT_CURSOR, compress=True)
+
+
+def decodificar_cursor(recurso, token):
+    """Devuelve {"c": (fecha, id) | None, "e": ...}; ValueError si el token no sirve para 'recurso'."""
+    if not token:
+        return {"c": None, "e": None}
+    try:
+        data = signing.loads(token, salt=SALT_CURSOR)
+    except signing.BadSignature:
+        raise ValueError("Cursor inválido.")
+    if data.get("r") != recurso:
+        raise ValueError("El cursor es de otro recurso.")
+    posiciones = {}
+    for k in ("c", "e"):
+        pos = data.get(k)
+        fecha = parse_datetime(pos[0]) if pos else None
+        if pos and (fecha is None or not isinstance(pos[1], int)):
+            raise ValueError("Cursor inválido.")
+        posiciones[k] = (fecha, pos[1]) if pos else None
+    return posiciones
+
+
+def _siguientes(qs, campo_fecha, pos, hasta, limite):
+    orden = [campo_fecha, "id"]
+    qs = qs.filter(**{f"{campo_fecha}__lte": hasta})
+    if pos:
+        # El >= redundante deja el rango [cursor, hasta] explícito para el índice (empresa, fecha, id)
+        qs = qs.filter(filtro_despues_de(orden, pos), **{f"{campo_fecha}__gte": pos[0]})
+    filas = list(qs.order_by(*orden)[:limite + 1])
+    return filas[:limite], len(filas) > limite
+
+
+def pagina_cambios(recurso, filas_qs, campo_fecha, lapidas_qs=None, token=None, limite=LIMITE_DEFECTO):
+    """
+    filas_qs: queryset .values(...) del recurso (con 'id' y campo_fecha).
+    lapidas_qs: HistorialTarea ELIMINADA del alcance (solo para tareas) o None.
+    Devuelve el dict de la respuesta: cambios, eliminados, cursor y hay_mas.
+    """
+    posiciones = decodificar_cursor(recurso, token)
+    hasta = timezone.now() - retraso()
+
+    cambios, mas_cambios = _siguientes(filas_qs, campo_fecha, posiciones["c"], hasta, limite)
+    if cambios:
+        posiciones["c"] = (cambios[-1][campo_fecha], cambios[-1]["id"])
+
+    eliminados, mas_eliminados = [], False
+    if lapidas_qs is not None:
+        lapidas, mas_eliminados = _siguientes(lapidas_qs.values("id", "tarea_ref", "created_at"), "created_at",
+                                              posiciones["e"], hasta, limite)
+        if lapidas:
+            posiciones["e"] = (lapidas[-1]["created_at"], lapidas[-1]["id"])
+        eliminados = [{"id": l["tarea_ref"], "eliminada_at": l["created_at"]} for l in lapidas]
+
+    return {
+        "recurso": recurso,
+        "cambios": cambios,
+        "eliminados": eliminados,
+        "cursor": codificar_cursor(recurso, posiciones),
+        "hay_mas": mas_cambios or mas_eliminados,
+    }
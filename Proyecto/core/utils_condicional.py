@@ -0,0 +1,70 @@
+# core/utils_condicional.py
+"""
+GET/PATCH condicionales (ETag / Last-Modified) para los endpoints JSON que las apps
+consultan seguido (campana de notificaciones, app del trabajador).
+
+Los validadores salen de UN aggregate (max de la fecha + conteo) sobre el queryset,
+sin traer filas: si el cliente ya tiene esa versión se responde 304 sin serializar.
+"""
+import hashlib
+from calendar import timegm
+
+from django.db.models import Count, Max
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.http import http_date, quote_etag
+
+# Cambiarlo si cambia el formato del JSON, para que los clientes no reusen cuerpos viejos
+VERSION_FORMATO = "1"
+
+
+def _etag(*partes):
+    crudo = "|".join(str(p) for p in (VERSION_FORMATO,) + partes)
+    return quote_etag(hashlib.sha1(crudo.encode("utf-8")).hexdigest())
+
+
+def validadores_qs(qs, campo="updated_at", **extra):
+    """
+    (etag, last_modified) de un queryset: max(campo), cantidad de filas y los
+    agregados extra (p.ej. no_leidas=Count(...)) en una sola consulta.
+    """
+    agg = qs.order_by().aggregate(ultimo=Max(campo), total=Count("pk"), **extra)
+    ultimo = agg.pop("ultimo")
+    marca = ultimo.isoformat() if ultimo else "-"
+    return _etag(qs.model._meta.label, marca, *(f"{k}={agg[k]}" for k in sorted(agg))), ultimo
+
+
+def validadores_objeto(obj, campo="updated_at"):
+    ultimo = getattr(obj, campo)
+    return _etag(obj._meta.label, obj.pk, ultimo.isoformat() if ultimo else "-"), ultimo
+
+
+def _segundos(fecha):
+    return timegm(fecha.utctimetuple()) if fecha else None
+
+
+def precondicion(request, etag, last_modified):
+    """
+    Evalúa If-Match / If-None-Match / If-(Un)Modified-Since. Devuelve la respuesta
+    304/412 que corresponda o None si la petición debe seguir.
+    """
+    resp = get_conditional_response(request, etag=etag, last_modified=_segundos(last_modified))
+    if resp is not None:
+        poner_validadores(resp, etag, last_modified)
+    return resp
+
+
+def poner_validadores(response, etag, last_modified):
+    response["ETag"] = etag
+    if last_modified:
+        response["Last-Modified"] = http_date(_segundos(last_modified))
+    # Datos del usuario: el navegador puede guardarlos pero debe revalidar siempre
+    patch_cache_control(response, private=True, no_cache=True)
+    return response
+
+
+def get_condicional(request, etag, last_modified, construir):
+    """304 si el cliente ya tiene la versión; si no, construir() con ETag/Last-Modified."""
+    resp = precondicion(request, etag, last_modified)
+    if resp is None:
+        resp = poner_validadores(construir(), etag, last_modified)
+    return resp
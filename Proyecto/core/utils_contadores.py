@@ -0,0 +1,83 @@
+# core/utils_contadores.py
+from django.db import transaction
+from django.db.models import Count, F, Sum
+
+ESTADOS_TAREA = ["Pendiente", "En progreso", "Atrasada", "Finalizada"]
+
+
+def rol_de_usuario(user_id):
+    """rol_codigo de un usuario ('' si no tiene), sin cargar el objeto completo."""
+    from .models import User
+    if not user_id:
+        return ""
+    return User.objects.filter(pk=user_id).values_list("rol_codigo", flat=True).first() or ""
+
+
+def ajustar_contador(empresa_id, departamento_id, estado, rol_asignado, delta):
+    """
+    Suma 'delta' al contador (empresa, depto, estado, rol). Solo crea filas al sumar:
+    un decremento sobre una fila inexistente se ignora (p.ej. durante borrados en cascada).
+    """
+    from .models import ContadorTareas
+    if not (empresa_id and departamento_id and estado and delta):
+        return
+    key = dict(empresa_id=empresa_id, departamento_id=departamento_id,
+               estado=estado, rol_asignado=rol_asignado or "")
+    with transaction.atomic():
+        if delta > 0:
+            ContadorTareas.objects.get_or_create(**key)
+        ContadorTareas.objects.filter(**key).update(total=F("total") + delta)
+
+
+def reconstruir_contadores(empresa=None):
+    """
+    Recalcula los contadores desde Tarea (un GROUP BY) y reemplaza los existentes.
+    Si 'empresa' es None, reconstruye todas las empresas. Devuelve el número de filas escritas.
+    """
+    from .models import ContadorTareas, Tarea
+    tareas = Tarea.objects.all()
+    contadores = ContadorTareas.objects.all()
+    if empresa is not None:
+        tareas = tareas.filter(empresa=empresa)
+        contadores = contadores.filter(empresa=empresa)
+
+    filas = (tareas.values("empresa_id", "departamento_id", "estado", "asignado__rol_codigo")
+                   .annotate(n=Count("id"))
+                   .order_by())
+    nuevos = [
+        ContadorTareas(empresa_id=f["empresa_id"], departamento_id=f["departamento_id"], estado=f["estado"],
+                       rol_asignado=f["asignado__rol_codigo"] or "", total=f["n"])
+        for f in filas
+    ]
+    with transaction.atomic():
+        contadores.delete()
+        ContadorTareas.objects.bulk_create(nuevos, batch_size=1000)
+    return len(nuevos)
+
+
+def contadores_por_estado(empresa=None, departamento=None, roles=None):
+    """
+    Lee los contadores y devuelve {estado: {rol: total}} para los 4 estados.
+    - empresa=None: todas las empresas (superuser).
+    - departamento: limita al depto (instancia o id).
+    - roles: lista de rol_codigo del asignado a incluir (None = todos).
+    """
+    from .models import ContadorTareas
+    qs = ContadorTareas.objects.all()
+    if empresa is not None:
+        qs = qs.filter(empresa=empresa)
+    if departamento is not None:
+        qs = qs.filter(departamento=departamento)
+    if roles is not None:
+        qs = qs.filter(rol_asignado__in=roles)
+
+    data = {e: {} for e in ESTADOS_TAREA}
+    for row in qs.values("estado", "rol_asignado").annotate(n=Sum("total")).order_by():
+        if row["estado"] in data:
+            data[row["estado"]][row["rol_asignado"]] = row["n"] or 0
+    return data
+
+
+def total_estado(por_estado, estado):
+    """Total de un estado sumando todos los roles."""
+    return sum(por_estado.get(estado, {}).values())
@@ -0,0 +1,124 @@
+# core/utils_dashboard.py
+"""
+Caché del contexto calculado del dashboard por alcance (empresa, departamento, rol).
+
+Cada alcance lee una "versión": la de su departamento (Gerente/Supervisor con depto)
+o la de la empresa (superusuario / sin depto). Los signals de Tarea, Evaluacion, User
+y Rol (core/signals.py) cambian esas versiones al confirmar la transacción, así la
+clave vieja deja de usarse sin tener que buscarla ni borrarla.
+
+Con DASHBOARD_CACHE_SWR (stale-while-revalidate), cuando la versión cambió solo UN
+request recalcula (candado con cache.add); los demás reciben la última foto guardada.
+"""
+import hashlib
+import json
+import uuid
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+
+# Vida de la "última foto" que se sirve mientras otro request recalcula
+TTL_ULTIMA_FOTO = 24 * 60 * 60
+# Si el request que recalcula muere, otro puede intentarlo pasado este tiempo
+TTL_CANDADO = 30
+
+
+def _ttl():
+    return getattr(settings, "DASHBOARD_CACHE_TTL", 10 * 60)
+
+
+def _swr():
+    return getattr(settings, "DASHBOARD_CACHE_SWR", True)
+
+
+def clave_version(empresa_id, departamento_id=None):
+    return f"core:dash_ver:{empresa_id}:{departamento_id or 0}"
+
+
+def version_dashboard(empresa_id, departamento_id=None):
+    key = clave_version(empresa_id, departamento_id)
+    ver = cache.get(key)
+    if ver is None:
+        # Versión aleatoria: si la clave se pierde (reinicio, eviction) no se reusa una foto vieja
+        cache.add(key, uuid.uuid4().hex, None)
+        ver = cache.get(key)
+    return ver
+
+
+def invalidar_dashboard(empresa_id, departamentos=()):
+    """Cambia la versión de la empresa y de los departamentos indicados (tras el commit)."""
+    if not empresa_id:
+        return
+    claves = {clave_version(empresa_id)} | {clave_version(empresa_id, d) for d in departamentos if d}
+
+    def _bump():
+        cache.set_many({k: uuid.uuid4().hex for k in claves}, None)
+    transaction.on_commit(_bump)
+
+
+def invalidar_dashboard_empresa(empresa_id):
+    """Invalida la empresa y todos sus departamentos (p.ej. al renombrar un rol)."""
+    from .models import Departamento
+    deptos = Departamento.objects.filter(empresa_id=empresa_id).values_list("pk", flat=True)
+    invalidar_dashboard(empresa_id, list(deptos))
+
+
+def alcance_dashboard(user):
+    """(empresa_id, departamento_id, rol) que determina lo que ve el usuario en el dashboard."""
+    rol = "SU" if user.is_superuser else (user.rol_codigo or "")
+    depto = user.departamento_id if rol in ("GERENTE", "SUPERVISOR") else None
+    return user.empresa_id, depto, rol
+
+
+def contexto_dashboard(user, calcular):
+    """
+    Devuelve el dict del dashboard para el alcance de 'user' desde la caché, o lo
+    obtiene con calcular() (debe devolver solo datos serializables: listas/dicts).
+    """
+    empresa_id, depto, rol = alcance_dashboard(user)
+    base = f"core:dash:{empresa_id}:{depto or 0}:{rol}"
+    ver = version_dashboard(empresa_id, depto)
+    key = f"{base}:v{ver}"
+
+    datos = cache.get(key)
+    if datos is not None:
+        return datos
+
+    candado = f"{base}:recalculando"
+    tengo_candado = False
+    if _swr():
+        tengo_candado = cache.add(candado, 1, TTL_CANDADO)
+        if not tengo_candado:
+            ultima = cache.get(f"{base}:ultima")
+            if ultima is not None:
+                return ultima  # otro request ya está recalculando
+
+    try:
+        datos = calcular()
+        cache.set(key, datos, _ttl())
+        if _swr():
+            cache.set(f"{base}:ultima", datos, TTL_ULTIMA_FOTO)
+    finally:
+        if tengo_candado:
+            cache.delete(candado)
+    return datos
+
+
+def cacheado_por_version(user, prefijo, filtros, calcular, ttl=None):
+    """
+    Resultado de calcular() cacheado por (alcance del usuario, filtros, versión del dashboard
+    de su empresa/depto): cualquier escritura que invalide el dashboard lo deja viejo.
+    Lo usan los reportes (resumen de evaluaciones, tiempos de ciclo de tareas).
+    """
+    from .utils_trabajos import alcance_de
+
+    empresa_id, depto, _ = alcance_dashboard(user)
+    crudo = json.dumps([alcance_de(user), filtros], sort_keys=True)
+    key = (f"core:{prefijo}:{empresa_id}:{hashlib.sha1(crudo.encode()).hexdigest()}"
+           f":v{version_dashboard(empresa_id, depto)}")
+    data = cache.get(key)
+    if data is None:
+        data = calcular()
+        cache.set(key, data, ttl if ttl is not None else getattr(settings, "REPORTES_CACHE_TTL", 10 * 60))
+    return data
@@ -0,0 +1,137 @@
+# core/utils_export.py
+"""
+Exportaciones en memoria constante: las filas salen de la BD como tuplas
+(values_list + iterator(chunk_size)), sin instanciar modelos ni cachear el queryset,
+y se escriben a medida que se leen.
+
+- filas_tareas / filas_evaluaciones: proyecciones compartidas por CSV, XLSX, etc.
+- respuesta_csv: StreamingHttpResponse que empieza a enviar bytes de inmediato.
+- respuesta_xlsx: libro openpyxl write-only volcado a un archivo temporal y
+  enviado con FileResponse (sin copiar el libro completo en memoria).
+- respuesta_ndjson_gz: una línea JSON por fila, comprimida con gzip al vuelo
+  (exportación para BI, ver api_views.ExportacionAPI).
+"""
+import csv
+import tempfile
+import zlib
+
+from django.core.serializers.json import DjangoJSONEncoder
+from django.http import FileResponse, StreamingHttpResponse
+from django.utils.timezone import localtime
+
+# Filas por viaje a la BD (en PostgreSQL, cursor del lado del servidor)
+CHUNK_EXPORT = 2000
+
+ENCABEZADOS_TAREAS = ["Título", "Departamento", "Asignado", "Estado", "Vence"]
+ENCABEZADOS_EVALUACIONES = ["Evaluado", "Tipo", "Evaluador", "Puntaje", "Fecha", "Comentarios"]
+
+TIPOS_EVALUACION = {"SUPERVISOR": "Supervisor", "TRABAJADOR": "Trabajador"}
+
+
+def _nombre(nombre, apellido):
+    return f"{nombre or ''} {apellido or ''}".strip()
+
+
+def filas_tareas(qs):
+    """Filas (listas) del reporte de tareas, en el orden de ENCABEZADOS_TAREAS."""
+    campos = ("titulo", "departamento__nombre", "asignado__primer_nombre", "asignado__primer_apellido",
+              "estado", "fecha_limite")
+    for titulo, depto, nombre, apellido, estado, vence in qs.values_list(*campos).iterator(chunk_size=CHUNK_EXPORT):
+        yield [titulo, depto or "", _nombre(nombre, apellido), estado,
+               vence.strftime("%Y-%m-%d") if vence else ""]
+
+
+def filas_evaluaciones(qs, comentarios_en_una_linea=True):
+    """Filas (listas) del reporte de evaluaciones, en el orden de ENCABEZADOS_EVALUACIONES."""
+    campos = ("evaluado__primer_nombre", "evaluado__primer_apellido", "tipo",
+              "evaluador__primer_nombre", "evaluador__primer_apellido", "puntaje", "created_at", "comentarios")
+    for ev_n, ev_a, tipo, er_n, er_a, puntaje, creada, coment in (
+            qs.values_list(*campos).iterator(chunk_size=CHUNK_EXPORT)):
+        coment = coment or ""
+        if comentarios_en_una_linea:
+            coment = coment.replace("\n", " ").strip()
+        yield [_nombre(ev_n, ev_a), TIPOS_EVALUACION.get(tipo, tipo), _nombre(er_n, er_a), puntaje,
+               localtime(creada).strftime("%Y-%m-%d %H:%M"), coment]
+
+
+class _Eco:
+    """Pseudo-archivo para csv.writer: devuelve la línea en vez de guardarla."""
+    def write(self, valor):
+        return valor
+
+
+def lineas_csv(encabezados, filas, por_bloque=500):
+    """Genera el CSV en bloques de 'por_bloque' líneas (menos escrituras al socket)."""
+    writer = csv.writer(_Eco())
+    bloque = [writer.writerow(encabezados)]
+    for fila in filas:
+        bloque.append(writer.writerow(fila))
+        if len(bloque) >= por_bloque:
+            yield "".join(bloque)
+            bloque = []
+    if bloque:
+        yield "".join(bloque)
+
+
+def respuesta_csv(nombre_archivo, encabezados, filas):
+    resp = StreamingHttpResponse(lineas_csv(encabezados, filas), content_type="text/csv; charset=utf-8")
+    resp["Content-Disposition"] = f'attachment; filename="{nombre_archivo}"'
+    return resp
+
+
+CONTENT_TYPE_XLSX = "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+
+
+def escribir_xlsx(destino, hoja, encabezados, filas):
+    """
+    Escribe un libro write-only: cada fila se serializa al XML de la hoja al
+    agregarla y no queda en memoria. 'destino' es una ruta o un archivo binario.
+    """
+    from openpyxl import Workbook
+    wb = Workbook(write_only=True)
+    ws = wb.create_sheet(hoja)
+    ws.append(encabezados)
+    for fila in filas:
+        ws.append(fila)
+    wb.save(destino)
+
+
+def respuesta_xlsx(nombre_archivo, hoja, encabezados, filas):
+    # TemporaryFile se borra solo al cerrarse; FileResponse lo cierra al terminar de enviarlo
+    tmp = tempfile.TemporaryFile(suffix=".xlsx")
+    try:
+        escribir_xlsx(tmp, hoja, encabezados, filas)
+        tmp.seek(0)
+    except Exception:
+        tmp.close()
+        raise
+    return FileResponse(tmp, as_attachment=True, filename=nombre_archivo, content_type=CONTENT_TYPE_XLSX)
+
+
+def lineas_ndjson(filas):
+    """Una línea JSON por fila (dict); fechas, Decimal y UUID con DjangoJSONEncoder."""
+    encoder = DjangoJSONEncoder(ensure_ascii=False, separators=(",", ":"))
+    for fila in filas:
+        yield encoder.encode(fila) + "\n"
+
+
+def gzip_en_bloques(lineas, tamano_bloque=64 * 1024):
+    """Comprime las líneas como un único stream gzip, entregando bytes cada ~tamano_bloque de entrada."""
+    comp = zlib.compressobj(6, zlib.DEFLATED, 16 + zlib.MAX_WBITS)  # 16+: cabecera gzip
+    bloque, tamano = [], 0
+    for linea in lineas:
+        datos = linea.encode("utf-8")
+        bloque.append(datos)
+        tamano += len(datos)
+        if tamano >= tamano_bloque:
+            salida = comp.compress(b"".join(bloque))
+            bloque, tamano = [], 0
+            if salida:
+                yield salida
+    yield comp.compress(b"".join(bloque)) + comp.flush()
+
+
+def respuesta_ndjson_gz(nombre_archivo, filas):
+    resp = StreamingHttpResponse(gzip_en_bloques(lineas_ndjson(filas)), content_type="application/gzip")
+    resp["Content-Disposition"] = f'attachment; filename="{nombre_archivo}"'
+    return resp
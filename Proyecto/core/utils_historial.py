@@ -0,0 +1,144 @@
+# core/utils_historial.py
+"""
+Historial en dos niveles:
+- "caliente": HistorialTarea / HistorialEvaluacion (filas normales, escrituras diarias).
+- "frío": HistorialArchivado, un segmento comprimido (JSON + zlib) por objeto con los
+  eventos más antiguos que settings.HISTORIAL_ARCHIVAR_DIAS.
+
+Las vistas leen ambos niveles con eventos_historial(); el archivado lo hace
+manage.py archivar_historial en lotes cortos y reanudables.
+"""
+import json
+import zlib
+from datetime import datetime
+
+from django.conf import settings
+from django.db import transaction
+
+# Máximo de eventos por segmento; los segmentos chicos se compactan al archivar de nuevo
+EVENTOS_POR_SEGMENTO = 1000
+
+CAMPOS_EVENTO = ("accion", "campo", "valor_anterior", "valor_nuevo", "realizado_por_id")
+
+
+def dias_archivado():
+    return getattr(settings, "HISTORIAL_ARCHIVAR_DIAS", 180)
+
+
+def _modelos(tipo):
+    """(modelo de historial, nombre del FK al objeto) para 'tareas' o 'evaluaciones'."""
+    from .models import HistorialEvaluacion, HistorialTarea
+    if tipo == "tareas":
+        return HistorialTarea, "tarea"
+    if tipo == "evaluaciones":
+        return HistorialEvaluacion, "evaluacion"
+    raise ValueError(f"Tipo de historial desconocido: {tipo}")
+
+
+def empaquetar(eventos):
+    filas = [dict({c: e[c] for c in CAMPOS_EVENTO}, created_at=e["created_at"].isoformat()) for e in eventos]
+    return zlib.compress(json.dumps(filas, ensure_ascii=False, separators=(",", ":")).encode("utf-8"), 9)
+
+
+def desempaquetar(datos):
+    filas = json.loads(zlib.decompress(bytes(datos)).decode("utf-8"))
+    for f in filas:
+        f["created_at"] = datetime.fromisoformat(f["created_at"])
+    return filas
+
+
+def eventos_historial(obj):
+    """
+    Eventos de una Tarea o Evaluacion (vivos + archivados), del más reciente al más
+    antiguo. Los archivados se devuelven como instancias no guardadas del modelo de
+    historial (con .archivado = True) para que las plantillas no cambien.
+    """
+    from .models import HistorialArchivado, Tarea, User
+    tipo = "tareas" if isinstance(obj, Tarea) else "evaluaciones"
+    Modelo, fk = _modelos(tipo)
+
+    eventos = list(obj.historial.select_related("realizado_por"))
+    archivados = []
+    for datos in HistorialArchivado.objects.filter(**{fk: obj}).values_list("datos", flat=True):
+        for f in desempaquetar(datos):
+            ev = Modelo(**{fk: obj}, empresa_id=obj.empresa_id, **f)
+            ev.archivado = True
+            archivados.append(ev)
+    if archivados:
+        usuarios = User.objects.in_bulk({e.realizado_por_id for e in archivados if e.realizado_por_id})
+        for ev in archivados:
+            ev.realizado_por = usuarios.get(ev.realizado_por_id)
+        eventos.extend(archivados)
+        eventos.sort(key=lambda e: e.created_at, reverse=True)
+    return eventos
+
+
+def eventos_archivados(tipo, ids):
+    """
+    (id del objeto, evento) de los segmentos archivados de 'ids' (lista o subconsulta), en lotes:
+    la versión masiva de la parte fría de eventos_historial para reportes sobre muchos objetos.
+    Los eventos son dicts con CAMPOS_EVENTO y created_at.
+    """
+    from .models import HistorialArchivado
+    _, fk = _modelos(tipo)
+    segmentos = HistorialArchivado.objects.filter(**{f"{fk}_id__in": ids}).values_list(f"{fk}_id", "datos")
+    for obj_id, datos in segmentos.iterator(chunk_size=100):
+        for evento in desempaquetar(datos):
+            yield obj_id, evento
+
+
+def objetos_pendientes(tipo, limite, despues_de=0, cantidad=200, empresa=None):
+    """Ids (ascendentes, > despues_de) de objetos con eventos anteriores a 'limite'."""
+    Modelo, fk = _modelos(tipo)
+    qs = Modelo.objects.filter(created_at__lt=limite, **{f"{fk}_id__gt": despues_de})
+    if empresa is not None:
+        qs = qs.filter(empresa=empresa)
+    return list(qs.order_by(f"{fk}_id").values_list(f"{fk}_id", flat=True).distinct()[:cantidad])
+
+
+def archivar_objetos(tipo, ids, limite):
+    """
+    Mueve al archivo los eventos anteriores a 'limite' de los objetos 'ids'.
+    Todo en una transacción corta: o quedan archivados y borrados, o nada (reanudable).
+    Devuelve el número de eventos archivados.
+    """
+    from .models import HistorialArchivado
+    Modelo, fk = _modelos(tipo)
+    with transaction.atomic():
+        filas = list(Modelo.objects
+                     .filter(created_at__lt=limite, **{f"{fk}_id__in": ids})
+                     .order_by(f"{fk}_id", "created_at", "id")
+                     .values("id", f"{fk}_id", "empresa_id", "created_at", *CAMPOS_EVENTO))
+        if not filas:
+            return 0
+        por_objeto = {}
+        for f in filas:
+            por_objeto.setdefault(f[f"{fk}_id"], []).append(f)
+
+        # Compactación: el último segmento del objeto se reescribe si aún tiene espacio
+        ultimos = {}
+        for seg in (HistorialArchivado.objects.select_for_update()
+                    .filter(**{f"{fk}_id__in": list(por_objeto)}).order_by("hasta")):
+            ultimos[getattr(seg, f"{fk}_id")] = seg
+
+        nuevos = []
+        for obj_id, eventos in por_objeto.items():
+            seg = ultimos.get(obj_id)
+            if seg and seg.cantidad + len(eventos) <= EVENTOS_POR_SEGMENTO:
+                previos = desempaquetar(seg.datos)
+                todos = sorted(previos + eventos, key=lambda e: e["created_at"])
+                seg.datos = empaquetar(todos)
+                seg.cantidad = len(todos)
+                seg.desde, seg.hasta = todos[0]["created_at"], todos[-1]["created_at"]
+                seg.save(update_fields=["datos", "cantidad", "desde", "hasta"])
+                continue
+            for i in range(0, len(eventos), EVENTOS_POR_SEGMENTO):
+                trozo = eventos[i:i + EVENTOS_POR_SEGMENTO]
+                nuevos.append(HistorialArchivado(
+                    **{f"{fk}_id": obj_id}, empresa_id=trozo[0]["empresa_id"],
+                    desde=trozo[0]["created_at"], hasta=trozo[-1]["created_at"],
+                    cantidad=len(trozo), datos=empaquetar(trozo),
+                ))
+        HistorialArchivado.objects.bulk_create(nuevos)
+        Modelo.objects.filter(pk__in=[f["id"] for f in filas]).delete()
+    return len(filas)
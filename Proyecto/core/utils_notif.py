@@ -0,0 +1,45 @@
+# core/utils_notif.py
+"""
+Contador de notificaciones no leídas por usuario en la caché compartida, para que
+la campana de base.html no haga COUNT(*) en cada render. Si la clave no está
+(reinicio, expiró, otro proceso) se cuenta en la BD y se vuelve a guardar.
+Se mantiene desde core/signals.py (altas/cambios/bajas de Notificacion) y desde
+las APIs notif_clear_api / notif_delete_all_api.
+"""
+from django.conf import settings
+from django.core.cache import cache
+
+
+def clave_no_leidas(user_id):
+    return f"core:notif_unread:{user_id}"
+
+
+def _ttl():
+    # TTL acotado: si el contador se desviara (escrituras por fuera del ORM), se corrige solo
+    return getattr(settings, "NOTIF_CACHE_TTL", 60 * 60)
+
+
+def contar_no_leidas(user_id) -> int:
+    key = clave_no_leidas(user_id)
+    n = cache.get(key)
+    if n is None:
+        from .models import Notificacion
+        n = Notificacion.objects.filter(usuario_id=user_id, is_read=False).count()
+        cache.set(key, n, _ttl())
+    return n
+
+
+def sumar_no_leidas(user_id, n=1):
+    """Incrementa el contador solo si ya está en caché (si no, lo recalculará la próxima lectura)."""
+    try:
+        cache.incr(clave_no_leidas(user_id), n)
+    except ValueError:
+        pass
+
+
+def reiniciar_no_leidas(user_id):
+    cache.set(clave_no_leidas(user_id), 0, _ttl())
+
+
+def olvidar_no_leidas(user_id):
+    cache.delete(clave_no_leidas(user_id))
@@ -0,0 +1,168 @@
+# core/utils_paginacion.py
+"""
+Paginación por cursor (keyset): en vez de OFFSET, cada página pide las filas
+"después de" la última fila vista según el orden del listado, así la página 500
+cuesta lo mismo que la primera. El cursor es un token firmado (opaco) con los
+valores de orden de la fila frontera; ver mixins.KeysetPaginationMixin.
+"""
+import json
+from functools import reduce
+
+from django.core import signing
+from django.db import connections
+from django.db.models import Q
+
+SALT_CURSOR = "core.keyset"
+
+# Sin estimador del motor (SQLite), el conteo "estimado" cuenta hasta este tope
+TOPE_CONTEO = 1000
+
+
+class PaginaKeyset:
+    """Página compatible con lo que usan las plantillas (object_list, has_next, has_previous...)."""
+    es_keyset = True
+
+    def __init__(self, object_list, has_next, has_previous, next_cursor=None, previous_cursor=None):
+        self.object_list = object_list
+        self.has_next_page = has_next
+        self.has_previous_page = has_previous
+        self.next_cursor = next_cursor
+        self.previous_cursor = previous_cursor
+
+    def has_next(self):
+        return self.has_next_page
+
+    def has_previous(self):
+        return self.has_previous_page
+
+    def has_other_pages(self):
+        return self.has_next_page or self.has_previous_page
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __len__(self):
+        return len(self.object_list)
+
+
+def normalizar_orden(model, campos):
+    """Agrega 'id' como desempate (mismo sentido que el último campo) si no está."""
+    campos = list(campos)
+    if not any(c.lstrip("-") in ("id", "pk") for c in campos):
+        campos.append("-id" if campos and campos[-1].startswith("-") else "id")
+    return [c.replace("pk", model._meta.pk.name) if c.lstrip("-") == "pk" else c for c in campos]
+
+
+def _valor_de(obj, campo):
+    # Acepta rutas con "__" (p.ej. "asignado__primer_apellido")
+    return reduce(lambda o, attr: getattr(o, attr, None), campo.split("__"), obj)
+
+
+def _campo_modelo(model, ruta):
+    partes = ruta.split("__")
+    for p in partes[:-1]:
+        model = model._meta.get_field(p).related_model
+    return model._meta.get_field(partes[-1])
+
+
+def _serializable(v):
+    if hasattr(v, "isoformat"):  # date / datetime / time
+        return v.isoformat()
+    if isinstance(v, (int, float, str, bool)) or v is None:
+        return v
+    return str(v)  # Decimal, UUID...
+
+
+def codificar_cursor(orden, obj, direccion):
+    valores = [_serializable(_valor_de(obj, c.lstrip("-"))) for c in orden]
+    return signing.dumps({"o": orden, "v": valores, "d": direccion}, salt=SALT_CURSOR, compress=True)
+
+
+def decodificar_cursor(model, orden, token):
+    """Devuelve (valores, dirección) o None si el cursor no es válido o es de otro orden."""
+    try:
+        data = signing.loads(token, salt=SALT_CURSOR)
+    except signing.BadSignature:
+        return None
+    if data.get("o") != orden or data.get("d") not in ("n", "p") or len(data.get("v", [])) != len(orden):
+        return None
+    try:
+        valores = [None if v is None else _campo_modelo(model, c.lstrip("-")).to_python(v)
+                   for c, v in zip(orden, data["v"])]
+    except Exception:
+        return None
+    return valores, data["d"]
+
+
+def filtro_despues_de(orden, valores, hacia_atras=False):
+    """
+    Q de comparación lexicográfica: filas estrictamente posteriores a 'valores' según 'orden'
+    (o anteriores si hacia_atras). (a, b) > (x, y)  ==  a > x OR (a = x AND b > y).
+    """
+    opciones = []
+    iguales = Q()
+    for campo, valor in zip(orden, valores):
+        nombre = campo.lstrip("-")
+        desc = campo.startswith("-") != hacia_atras
+        opciones.append(iguales & Q(**{f"{nombre}__{'lt' if desc else 'gt'}": valor}))
+        iguales &= Q(**{nombre: valor})
+    return reduce(lambda a, b: a | b, opciones)
+
+
+def invertir_orden(orden):
+    return [c[1:] if c.startswith("-") else f"-{c}" for c in orden]
+
+
+def paginar_keyset(queryset, orden, tamano, token=None):
+    """Aplica el cursor 'token' a 'queryset' y devuelve una PaginaKeyset."""
+    model = queryset.model
+    cursor = decodificar_cursor(model, orden, token) if token else None
+
+    if cursor is None:
+        filas = list(queryset.order_by(*orden)[:tamano + 1])
+        hay_mas = len(filas) > tamano
+        filas = filas[:tamano]
+        anterior = False
+    else:
+        valores, direccion = cursor
+        atras = direccion == "p"
+        qs = queryset.filter(filtro_despues_de(orden, valores, hacia_atras=atras))
+        filas = list(qs.order_by(*(invertir_orden(orden) if atras else orden))[:tamano + 1])
+        hay_mas = len(filas) > tamano
+        filas = filas[:tamano]
+        if atras:
+            filas.reverse()
+            anterior, hay_mas = hay_mas, True
+        else:
+            anterior = True
+
+    return PaginaKeyset(
+        filas,
+        has_next=hay_mas and bool(filas),
+        has_previous=anterior and bool(filas),
+        next_cursor=codificar_cursor(orden, filas[-1], "n") if filas else None,
+        previous_cursor=codificar_cursor(orden, filas[0], "p") if filas else None,
+    )
+
+
+def contar(queryset, modo="estimado"):
+    """
+    Total para mostrar junto al listado, como texto ('57', '~12.300', '1000+').
+    - exacto: COUNT(*).
+    - estimado: filas estimadas por el planificador (PostgreSQL); en otros motores
+      cuenta hasta TOPE_CONTEO.
+    """
+    qs = queryset.order_by()
+    if modo == "exacto":
+        return str(qs.count())
+    conn = connections[qs.db]
+    if conn.vendor == "postgresql":
+        sql, params = qs.query.sql_with_params()
+        with conn.cursor() as cur:
+            cur.execute("EXPLAIN (FORMAT JSON) " + sql, params)
+            plan = cur.fetchone()[0]
+        if isinstance(plan, str):
+            plan = json.loads(plan)
+        return f"~{int(plan[0]['Plan']['Plan Rows']):,}".replace(",", ".")
+    n = qs[:TOPE_CONTEO + 1].count()
+    return f"{TOPE_CONTEO}+" if n > TOPE_CONTEO else str(n)
@@ -1,18 +1,45 @@
 # core/utils_pdf.py
+import logging
 import os
+import tempfile
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from functools import lru_cache
 from io import BytesIO
+from itertools import islice
 from urllib.parse import urlparse
 from django.conf import settings
-from django.http import HttpResponse
+from django.http import FileResponse, HttpResponse
 from django.template.loader import get_template
+from django.utils.safestring import mark_safe
 from xhtml2pdf import pisa
 from django.contrib.staticfiles import finders  # 👈 clave
 
+logger = logging.getLogger(__name__)
+
+# Filas por bloque en generar_pdf_por_bloques (~10 páginas A4 del reporte de tareas)
+FILAS_POR_BLOQUE = 300
+
+
+@lru_cache(maxsize=None)
+def estilos_pdf():
+    """CSS de los reportes (static/core/css/pdf_reportes.css), leído una vez por proceso."""
+    ruta = finders.find("core/css/pdf_reportes.css")
+    with open(ruta, encoding="utf-8") as f:
+        return mark_safe(f.read())
+
+
 def link_callback(uri, rel):
     """
     Convierte /static/... y /media/... en paths absolutos que xhtml2pdf pueda abrir.
     Funciona en dev (STATICFILES_DIRS) y en prod (STATIC_ROOT).
     """
+    return _resolver_uri(uri)
+
+
+@lru_cache(maxsize=256)
+def _resolver_uri(uri):
+    # Cacheado: el logo se resuelve una vez por proceso y no en cada bloque/página
     parsed = urlparse(uri)
     if parsed.scheme in ('http', 'https'):
         # Idealmente evita http(s) en xhtml2pdf; si necesitas, deja tal cual.
@@ -58,19 +85,107 @@ def link_callback(uri, rel):
     return uri  # puede fallar, pero no explota con join(None, ...)
     
 
-def render_to_pdf(template_src, context_dict=None, filename="reporte.pdf"):
-    context_dict = context_dict or {}
+def generar_pdf(template_src, context_dict, destino):
+    """Renderiza la plantilla a PDF en 'destino' (archivo binario). Devuelve True si salió bien."""
     template = get_template(template_src)
-    html = template.render(context_dict)
-    result = BytesIO()
+    html = template.render({"estilos_pdf": estilos_pdf(), **(context_dict or {})})
     pdf = pisa.CreatePDF(
         src=BytesIO(html.encode("utf-8")),
-        dest=result,
+        dest=destino,
         encoding='utf-8',
         link_callback=link_callback,  # 👈 importante
     )
-    if not pdf.err:
+    return not pdf.err
+
+
+def render_to_pdf(template_src, context_dict=None, filename="reporte.pdf"):
+    result = BytesIO()
+    if generar_pdf(template_src, context_dict, result):
         resp = HttpResponse(result.getvalue(), content_type='application/pdf')
         resp['Content-Disposition'] = f'attachment; filename="{filename}"'
         return resp
     return HttpResponse("Error generando el PDF", status=500)
+
+
+def _iniciar_proceso():
+    # Con 'spawn'/'forkserver' el proceso hijo arranca sin Django configurado
+    import django
+    from django.apps import apps
+    if not apps.ready:
+        django.setup()
+
+
+def _generar_bloque(template_src, contexto, ruta):
+    """Un bloque del reporte a un PDF en disco. Corre en el proceso actual o en el pool."""
+    with open(ruta, "wb") as f:
+        if not generar_pdf(template_src, contexto, f):
+            raise RuntimeError(f"Error generando el PDF ({os.path.basename(ruta)})")
+    return ruta
+
+
+def _bloques(filas, tamano):
+    filas = iter(filas)
+    bloque = list(islice(filas, tamano))
+    yield bloque  # siempre al menos uno, para el "Sin resultados."
+    while bloque:
+        bloque = list(islice(filas, tamano))
+        if bloque:
+            yield bloque
+
+
+def generar_pdf_por_bloques(template_src, context_dict, filas, destino, filas_por_bloque=None, procesos=1):
+    """
+    Reporte PDF en bloques de 'filas_por_bloque' filas: cada bloque se renderiza
+    (plantilla + pisa) a un PDF temporal y al final se unen con pypdf. La memoria
+    de xhtml2pdf queda acotada a un bloque, no al reporte completo.
+
+    La unión sí arma el documento completo en memoria (PdfWriter): medido con
+    100.000 filas del reporte de tareas (334 bloques, PDF de 23 MB) el pico sube
+    unos 170 MB, ~7 veces el tamaño del PDF final. Unir con qpdf (pikepdf) no lo
+    mejora: también carga la estructura de todas las páginas (~140 MB en la misma prueba).
+
+    'filas' es un iterable de listas (utils_export.filas_*); la plantilla las
+    recibe en 'filas' y 'continuacion' es True desde el segundo bloque (sin encabezado).
+    Con procesos > 1 los bloques se reparten en un ProcessPoolExecutor, con a lo
+    sumo 2 bloques por proceso en vuelo. 'destino' es una ruta o un archivo binario.
+    """
+    from pypdf import PdfWriter  # dependencia de xhtml2pdf
+
+    tamano = filas_por_bloque or getattr(settings, "PDF_FILAS_POR_BLOQUE", FILAS_POR_BLOQUE)
+    with tempfile.TemporaryDirectory(prefix="pdf_bloques_") as tmp:
+        partes = []
+        pool = ProcessPoolExecutor(procesos, initializer=_iniciar_proceso) if procesos > 1 else None
+        try:
+            en_vuelo = deque()
+            for i, bloque in enumerate(_bloques(filas, tamano)):
+                contexto = {**(context_dict or {}), "filas": bloque, "continuacion": i > 0}
+                ruta = os.path.join(tmp, f"{i:06d}.pdf")
+                if pool is None:
+                    partes.append(_generar_bloque(template_src, contexto, ruta))
+                    continue
+                en_vuelo.append(pool.submit(_generar_bloque, template_src, contexto, ruta))
+                if len(en_vuelo) >= procesos * 2:
+                    partes.append(en_vuelo.popleft().result())
+            while en_vuelo:
+                partes.append(en_vuelo.popleft().result())
+        finally:
+            if pool is not None:
+                pool.shutdown(cancel_futures=True)
+
+        writer = PdfWriter()
+        for ruta in partes:
+            writer.append(ruta)
+        writer.write(destino)
+
+
+def respuesta_pdf(filename, template_src, context_dict, filas, **opciones):
+    """generar_pdf_por_bloques a un archivo temporal, enviado con FileResponse."""
+    tmp = tempfile.TemporaryFile(suffix=".pdf")
+    try:
+        generar_pdf_por_bloques(template_src, context_dict, filas, tmp, **opciones)
+        tmp.seek(0)
+    except Exception:
+        tmp.close()
+        logger.exception("Error generando %s", filename)
+        return HttpResponse("Error generando el PDF", status=500)
+    return FileResponse(tmp, as_attachment=True, filename=filename, content_type="application/pdf")
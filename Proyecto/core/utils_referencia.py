@@ -0,0 +1,108 @@
+# core/utils_referencia.py
+"""
+Datos de referencia por empresa en caché: roles, departamentos y miembros por
+departamento (id, nombre, rol). Son las listas de los <select> de TareaForm,
+EvaluacionForm, formularios de usuario y paneles de filtros de listados/reportes,
+que antes se consultaban en cada GET.
+
+Las claves llevan una versión por empresa; los signals de User, Rol y Departamento
+(core/signals.py) la cambian al confirmar la transacción.
+"""
+import uuid
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+
+
+def _ttl():
+    return getattr(settings, "REFERENCIA_CACHE_TTL", 60 * 60)
+
+
+def clave_version(empresa_id):
+    return f"core:ref_ver:{empresa_id}"
+
+
+def _version(empresa_id):
+    key = clave_version(empresa_id)
+    ver = cache.get(key)
+    if ver is None:
+        cache.add(key, uuid.uuid4().hex, None)
+        ver = cache.get(key)
+    return ver
+
+
+def invalidar_referencia(empresa_id):
+    if empresa_id:
+        transaction.on_commit(lambda: cache.set(clave_version(empresa_id), uuid.uuid4().hex, None))
+
+
+def _cacheado(empresa_id, nombre, calcular):
+    key = f"core:ref:{empresa_id}:{_version(empresa_id)}:{nombre}"
+    datos = cache.get(key)
+    if datos is None:
+        datos = calcular()
+        cache.set(key, datos, _ttl())
+    return datos
+
+
+def roles_empresa(empresa_id):
+    """[{id, nombre}] ordenados por nombre."""
+    from .models import Rol
+    return _cacheado(empresa_id, "roles", lambda: list(
+        Rol.objects.filter(empresa_id=empresa_id).order_by("nombre").values("id", "nombre")))
+
+
+def departamentos_empresa(empresa_id, ids=None):
+    """[{id, nombre}] ordenados por nombre; 'ids' limita a esos departamentos."""
+    from .models import Departamento
+    deptos = _cacheado(empresa_id, "deptos", lambda: list(
+        Departamento.objects.filter(empresa_id=empresa_id).order_by("nombre").values("id", "nombre")))
+    if ids is not None:
+        ids = set(ids)
+        deptos = [d for d in deptos if d["id"] in ids]
+    return deptos
+
+
+def miembros(empresa_id, departamento_id=None, roles=None, excluir_roles=()):
+    """
+    Usuarios de la empresa (o solo de 'departamento_id') como dicts
+    {id, username, primer_nombre, primer_apellido, rol_codigo, rol_nombre, departamento_id},
+    ordenados por apellido y nombre. 'roles' / 'excluir_roles' son códigos de rol.
+    """
+    from .models import User
+
+    def calcular():
+        qs = User.objects.filter(empresa_id=empresa_id)
+        if departamento_id:
+            qs = qs.filter(departamento_id=departamento_id)
+        filas = qs.order_by("primer_apellido", "primer_nombre").values(
+            "id", "username", "primer_nombre", "primer_apellido", "rol_codigo", "rol__nombre", "departamento_id")
+        return [dict(f, rol_nombre=f.pop("rol__nombre")) for f in filas]
+
+    gente = _cacheado(empresa_id, f"miembros:{departamento_id or 'todos'}", calcular)
+    if roles is not None:
+        gente = [p for p in gente if p["rol_codigo"] in roles]
+    if excluir_roles:
+        gente = [p for p in gente if p["rol_codigo"] not in excluir_roles]
+    return gente
+
+
+def usar_opciones(field, filas, etiqueta):
+    """
+    Deja el <select> de un ModelChoiceField con opciones sacadas de la caché. El queryset
+    del campo se mantiene (sin evaluarse al renderizar) para validar lo que llega por POST.
+    """
+    opciones = [(f["id"], etiqueta(f)) for f in filas]
+    if field.empty_label is not None:
+        opciones.insert(0, ("", field.empty_label))
+    field.widget.choices = opciones
+
+
+def etiqueta_persona(p):
+    # Igual que User.__str__
+    return f"{p['primer_nombre']} {p['primer_apellido']} ({p['username']})"
+
+
+def etiqueta_nombre(f):
+    return f["nombre"]
@@ -4,7 +4,7 @@ def scope_tareas_por_rol(qs, user):
     """RRHH/Superuser: todo. Gerente/Supervisor: solo su departamento."""
     if not user.is_authenticated:
         return qs.none()
-    if user.is_superuser or (getattr(user.rol, "nombre", "") == "Recursos humanos"):
+    if user.is_superuser or user.rol_codigo == "RRHH":
         return qs
     depto = getattr(user, "departamento", None)
     if depto:
@@ -21,15 +21,27 @@ def scope_evaluaciones_por_rol(qs, user):
     """
     if not user.is_authenticated:
         return qs.none()
-    rol = getattr(user.rol, "nombre", "")
-    if user.is_superuser or rol == "Recursos humanos":
+    rol = user.rol_codigo
+    if user.is_superuser or rol == "RRHH":
         return qs
     depto = getattr(user, "departamento", None)
     if not depto:
         return qs.none()
-    if rol == "Gerente":
+    if rol == "GERENTE":
         return qs.filter(evaluado__departamento=depto)
-    if rol == "Supervisor":
+    if rol == "SUPERVISOR":
         return qs.filter(tipo="TRABAJADOR", evaluado__departamento=depto)
     # Otros roles no deberían acceder a reportes globales
     return qs.none()
+
+def scope_usuarios_por_rol(qs, user):
+    """RRHH/Superuser: todos. Gerente/Supervisor: su departamento. Otros: nada."""
+    if not user.is_authenticated:
+        return qs.none()
+    rol = user.rol_codigo
+    if user.is_superuser or rol == "RRHH":
+        return qs
+    depto = getattr(user, "departamento", None)
+    if depto and rol in ("GERENTE", "SUPERVISOR"):
+        return qs.filter(departamento=depto)
+    return qs.none()
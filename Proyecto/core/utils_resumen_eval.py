@@ -0,0 +1,134 @@
+# core/utils_resumen_eval.py
+from django.db import transaction
+from django.db.models import Count, F, FloatField, Max, Min, Sum
+from django.db.models.functions import Cast, Greatest, Least
+
+
+def sumar_evaluacion(evaluacion):
+    """Alta incremental: suma el puntaje de una evaluación nueva a su resumen."""
+    from .models import ResumenEvaluacion, User
+    p = evaluacion.puntaje
+    with transaction.atomic():
+        obj, created = ResumenEvaluacion.objects.get_or_create(
+            evaluado_id=evaluacion.evaluado_id,
+            tipo=evaluacion.tipo,
+            defaults={
+                "empresa_id": evaluacion.empresa_id,
+                "departamento_id": User.objects.filter(pk=evaluacion.evaluado_id)
+                                               .values_list("departamento_id", flat=True).first(),
+                "suma": p, "cantidad": 1, "minimo": p, "maximo": p,
+            },
+        )
+        if not created:
+            ResumenEvaluacion.objects.filter(pk=obj.pk).update(
+                suma=F("suma") + p,
+                cantidad=F("cantidad") + 1,
+                minimo=Least(F("minimo"), p),
+                maximo=Greatest(F("maximo"), p),
+            )
+
+
+def recalcular_resumen(evaluado_id, tipo):
+    """
+    Recalcula el resumen de (evaluado, tipo) desde Evaluacion.
+    Se usa en ediciones/borrados, donde min/max no se pueden "restar".
+    """
+    from .models import Evaluacion, ResumenEvaluacion, User
+    if not evaluado_id or not tipo:
+        return
+    agg = (Evaluacion.objects.filter(evaluado_id=evaluado_id, tipo=tipo)
+           .aggregate(suma=Sum("puntaje"), cantidad=Count("id"), minimo=Min("puntaje"),
+                      maximo=Max("puntaje")))
+    with transaction.atomic():
+        if not agg["cantidad"]:
+            ResumenEvaluacion.objects.filter(evaluado_id=evaluado_id, tipo=tipo).delete()
+            return
+        u = User.objects.filter(pk=evaluado_id).values("empresa_id", "departamento_id").first()
+        if not u:
+            return
+        ResumenEvaluacion.objects.update_or_create(
+            evaluado_id=evaluado_id, tipo=tipo,
+            defaults=dict(empresa_id=u["empresa_id"], departamento_id=u["departamento_id"], **agg),
+        )
+
+
+def reconstruir_resumenes(empresa=None):
+    """Recalcula todos los resúmenes (de una empresa o de todas). Devuelve filas escritas."""
+    from .models import Evaluacion, ResumenEvaluacion
+    evals = Evaluacion.objects.all()
+    resumenes = ResumenEvaluacion.objects.all()
+    if empresa is not None:
+        evals = evals.filter(empresa=empresa)
+        resumenes = resumenes.filter(empresa=empresa)
+
+    filas = (evals.values("evaluado_id", "tipo", "evaluado__empresa_id", "evaluado__departamento_id")
+                  .annotate(suma=Sum("puntaje"), cantidad=Count("id"), minimo=Min("puntaje"),
+                            maximo=Max("puntaje"))
+                  .order_by())
+    nuevos = [
+        ResumenEvaluacion(evaluado_id=f["evaluado_id"], tipo=f["tipo"], empresa_id=f["evaluado__empresa_id"],
+                          departamento_id=f["evaluado__departamento_id"], suma=f["suma"],
+                          cantidad=f["cantidad"], minimo=f["minimo"], maximo=f["maximo"])
+        for f in filas
+    ]
+    with transaction.atomic():
+        resumenes.delete()
+        ResumenEvaluacion.objects.bulk_create(nuevos, batch_size=1000)
+    return len(nuevos)
+
+
+def resumen_por_evaluado(qs):
+    """
+    Agrupa un queryset de ResumenEvaluacion por evaluado con las mismas claves que
+    usaban los GROUP BY sobre Evaluacion (evaluado__primer_nombre, ..., prom, total).
+    """
+    return (qs.values("evaluado_id", "evaluado__primer_nombre", "evaluado__primer_apellido", "evaluado__rol__nombre")
+              .annotate(total=Sum("cantidad"),
+                        prom=Cast(Sum("suma"), FloatField()) / Cast(Sum("cantidad"), FloatField()))
+              .order_by("-prom", "-total"))
+
+
+def kpis_resumen(qs):
+    """Promedio y total global de un queryset de ResumenEvaluacion (None si no hay datos)."""
+    agg = qs.aggregate(suma=Sum("suma"), total=Sum("cantidad"))
+    total = agg["total"] or 0
+    return {"promedio": (agg["suma"] / total) if total else None, "total": total}
+
+
+CAMPOS_EVALUADO = ("evaluado_id", "evaluado__primer_nombre", "evaluado__primer_apellido", "evaluado__rol__nombre")
+
+
+def grupos_evaluaciones(qs):
+    """GROUP BY evaluado sobre Evaluacion: suma y cantidad de puntajes (para resumen_con_totales)."""
+    return qs.order_by().values(*CAMPOS_EVALUADO).annotate(suma=Sum("puntaje"), total=Count("id"))
+
+
+def grupos_resumen(qs):
+    """Lo mismo que grupos_evaluaciones, leyendo el ResumenEvaluacion materializado."""
+    return qs.order_by().values(*CAMPOS_EVALUADO).annotate(suma=Sum("suma"), total=Sum("cantidad"))
+
+
+def resumen_con_totales(grupos):
+    """
+    Recorre una sola vez las filas agrupadas y devuelve (resumen, kpis): el resumen por
+    evaluado (con 'prom', orden -prom/-total) y la fila total (ROLLUP) para los KPIs.
+    """
+    resumen, suma, total = [], 0, 0
+    for g in grupos:
+        g = dict(g)
+        g["prom"] = (g["suma"] / g["total"]) if g["total"] else None
+        suma += g["suma"] or 0
+        total += g["total"] or 0
+        resumen.append(g)
+    resumen.sort(key=lambda g: (-(g["prom"] or 0), -g["total"]))
+    return resumen, {"promedio": (suma / total) if total else None, "total": total}
+
+
+def resumen_reporte_cacheado(user, filtros, calcular):
+    """
+    (resumen, kpis) del reporte de evaluaciones desde la caché. La clave incluye el
+    alcance del usuario y los filtros, y la versión del dashboard de su empresa/depto
+    (los signals de Evaluacion y User la cambian), así que no hay que invalidarla aparte.
+    """
+    from .utils_dashboard import cacheado_por_version
+    return cacheado_por_version(user, "rep_evals", filtros, calcular)
@@ -0,0 +1,40 @@
+# core/utils_suscripcion.py
+"""
+Estado de suscripción por empresa en caché (TTL), para que los mixins/decoradores
+no consulten SuscripcionEmpresa en cada request. Se actualiza al guardar la
+suscripción (webhook de MercadoPago, billing_refresh, admin) desde core/signals.py.
+"""
+from django.conf import settings
+from django.core.cache import cache
+
+
+def clave_suscripcion(empresa_id):
+    return f"core:sub_activa:{empresa_id}"
+
+
+def _ttl():
+    return getattr(settings, "SUSCRIPCION_CACHE_TTL", 300)
+
+
+def suscripcion_activa(empresa_id) -> bool:
+    """True si la empresa tiene la suscripción activa (lee caché; si no está, la BD)."""
+    from .models import SuscripcionEmpresa
+    if not empresa_id:
+        return False
+    key = clave_suscripcion(empresa_id)
+    activa = cache.get(key)
+    if activa is None:
+        estado = (SuscripcionEmpresa.objects.filter(empresa_id=empresa_id)
+                  .values_list("estado", flat=True).first())
+        activa = estado is not None and SuscripcionEmpresa(estado=estado).is_active()
+        cache.set(key, activa, _ttl())
+    return activa
+
+
+def guardar_estado_suscripcion(sub):
+    """Write-through: deja en caché el estado recién guardado."""
+    cache.set(clave_suscripcion(sub.empresa_id), sub.is_active(), _ttl())
+
+
+def olvidar_estado_suscripcion(empresa_id):
+    cache.delete(clave_suscripcion(empresa_id))
@@ -0,0 +1,96 @@
+# core/utils_tendencias.py
+"""
+Tendencias del dashboard (backlog, vencidas y finalizadas por día) desde FotoDiariaTareas.
+
+- tomar_foto: UNA agregación sobre Tarea agrupada por (empresa, depto, estado, rol del
+  asignado) y reemplazo de las filas de ese día en una transacción (re-ejecutar es idempotente).
+- serie_tendencias: lee solo la tabla de fotos, con el mismo alcance que el dashboard.
+
+La foto refleja las tareas al momento de correr: programar manage.py foto_diaria_tareas
+al cierre del día (p. ej. 23:55) o pasada la medianoche con --ayer.
+"""
+from datetime import datetime, time, timedelta
+
+from django.db import transaction
+from django.db.models import Count, Q, Sum
+from django.utils import timezone
+
+from .utils_dashboard import alcance_dashboard
+
+DIAS_TENDENCIA = 30
+MAX_DIAS_TENDENCIA = 365
+
+
+def rango_dia(dia):
+    """(inicio, fin) del día local como datetimes aware, para filtrar sin __date."""
+    inicio = timezone.make_aware(datetime.combine(dia, time.min))
+    return inicio, timezone.make_aware(datetime.combine(dia + timedelta(days=1), time.min))
+
+
+def tomar_foto(dia=None, empresa_id=None):
+    """Escribe la foto de 'dia' (hoy por defecto). Devuelve cuántas filas quedaron."""
+    from .models import FotoDiariaTareas, Tarea
+    dia = dia or timezone.localdate()
+    inicio, fin = rango_dia(dia)
+
+    qs = Tarea.objects.order_by()
+    if empresa_id:
+        qs = qs.filter(empresa_id=empresa_id)
+    grupos = (qs.values("empresa_id", "departamento_id", "estado", "asignado__rol_codigo")
+              .annotate(total=Count("id"),
+                        vencidas=Count("id", filter=Q(fecha_limite__lt=dia) & ~Q(estado="Finalizada")),
+                        # Aproximación: finalizadas cuya última modificación cayó en el día
+                        finalizadas_dia=Count("id", filter=Q(estado="Finalizada", updated_at__gte=inicio,
+                                                             updated_at__lt=fin))))
+    filas = [FotoDiariaTareas(empresa_id=g["empresa_id"], departamento_id=g["departamento_id"], estado=g["estado"],
+                              rol_asignado=g["asignado__rol_codigo"] or "", dia=dia, total=g["total"],
+                              vencidas=g["vencidas"], finalizadas_dia=g["finalizadas_dia"])
+             for g in grupos]
+
+    # Borrar y reinsertar: una combinación que quedó en 0 no debe conservar la fila de antes
+    with transaction.atomic():
+        anteriores = FotoDiariaTareas.objects.filter(dia=dia)
+        if empresa_id:
+            anteriores = anteriores.filter(empresa_id=empresa_id)
+        anteriores.delete()
+        FotoDiariaTareas.objects.bulk_create(filas, batch_size=1000)
+    return len(filas)
+
+
+def fotos_visibles(user):
+    """Fotos dentro del alcance del dashboard de 'user' (mismas reglas que DashboardView)."""
+    from .models import FotoDiariaTareas
+    empresa_id, depto, rol = alcance_dashboard(user)
+    qs = FotoDiariaTareas.objects.filter(empresa_id=empresa_id)
+    if depto:
+        qs = qs.filter(departamento_id=depto)
+        if rol == "SUPERVISOR":
+            qs = qs.filter(rol_asignado="TRABAJADOR")
+    return qs
+
+
+def dias_pedidos(valor):
+    try:
+        dias = int(valor)
+    except (TypeError, ValueError):
+        return DIAS_TENDENCIA
+    return min(max(dias, 1), MAX_DIAS_TENDENCIA)
+
+
+def serie_tendencias(qs, desde, hasta):
+    """
+    Series diarias entre 'desde' y 'hasta' (inclusive) en una consulta agrupada por día.
+    Los días sin foto (el job no corrió) quedan en None para que el gráfico muestre el hueco.
+    """
+    por_dia = {
+        f["dia"]: f for f in (qs.filter(dia__gte=desde, dia__lte=hasta).order_by().values("dia")
+                              .annotate(backlog=Sum("total", filter=~Q(estado="Finalizada")),
+                                        vencidas=Sum("vencidas"), finalizadas=Sum("finalizadas_dia")))
+    }
+    dias = [desde + timedelta(days=i) for i in range((hasta - desde).days + 1)]
+    serie = {"dias": [d.isoformat() for d in dias], "backlog": [], "vencidas": [], "finalizadas": []}
+    for d in dias:
+        fila = por_dia.get(d)
+        for k in ("backlog", "vencidas", "finalizadas"):
+            serie[k].append((fila[k] or 0) if fila else None)
+    return serie
@@ -0,0 +1,204 @@
+# core/utils_tiempos_tareas.py
+"""
+Tiempos de ciclo de tareas a partir de los cambios de estado del historial.
+
+Las tareas del alcance y sus transiciones (HistorialTarea más los segmentos archivados por
+manage.py archivar_historial) se cargan de una vez a arreglos NumPy y el cálculo es
+vectorizado, sin bucles por fila:
+
+- días hasta iniciar: creación → primer paso a "En progreso"
+- días hasta finalizar: creación → primer paso a "Finalizada"
+- días en Atrasada: tramos entre entrar a "Atrasada" y el cambio siguiente (o ahora)
+- % a tiempo: finalizadas antes de terminar el día de fecha_limite / finalizadas
+
+Agrupado por departamento, asignado y mes de creación. Las tareas sin cambios de estado
+registrados (p. ej. cambiadas por la API) cuentan en "tareas" pero no en los tiempos.
+Si NumPy no está instalado, calcular_tiempos devuelve None (la vista responde 503).
+"""
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+from django.db.models import DateField, Q
+from django.db.models.functions import TruncMonth
+from django.utils import timezone
+
+from .utils_export import CHUNK_EXPORT
+from .utils_historial import eventos_archivados
+from .utils_tendencias import rango_dia
+
+CODIGOS_ESTADO = {"Pendiente": 0, "En progreso": 1, "Atrasada": 2, "Finalizada": 3}
+SEGUNDOS_DIA = 86400.0
+
+
+def _epoch(fechas):
+    return np.fromiter((f.timestamp() for f in fechas), dtype=np.float64, count=len(fechas))
+
+
+def _cargar_tareas(qs):
+    """Columnas de las tareas ordenadas por id: ids, depto, asignado, creada, fin del día límite, mes."""
+    filas = list(qs.order_by("id")
+                 .annotate(mes=TruncMonth("created_at", output_field=DateField()))
+                 .values_list("id", "departamento_id", "asignado_id", "created_at", "fecha_limite", "mes")
+                 .iterator(chunk_size=CHUNK_EXPORT))
+    if not filas:
+        return None
+    ids, deptos, asignados, creadas, limites, meses = zip(*filas)
+    # Fin del día límite en hora local: se calcula una vez por fecha distinta, no por tarea
+    fechas, cual = np.unique(np.array(limites, dtype="datetime64[D]"), return_inverse=True)
+    fin_fechas = np.array([rango_dia(d)[1].timestamp() for d in fechas.astype(object)])
+    return {
+        "id": np.array(ids, dtype=np.int64),
+        "departamento": np.array(deptos, dtype=np.int64),
+        "asignado": np.array(asignados, dtype=np.int64),
+        "creada": _epoch(creadas),
+        "vence": fin_fechas[cual],
+        "mes": np.array(meses, dtype="datetime64[M]"),
+    }
+
+
+def _es_estado(accion, campo):
+    return accion == "ESTADO" or campo == "estado"
+
+
+def _cargar_transiciones(qs, ids):
+    """(posición de la tarea en 'ids', momento, código de estado), ordenadas por tarea y fecha."""
+    from .models import HistorialTarea
+    tareas_qs = qs.order_by().values("id")
+    filas = list(HistorialTarea.objects
+                 .filter(tarea_id__in=tareas_qs)
+                 .filter(Q(accion="ESTADO") | Q(campo="estado"))
+                 .values_list("tarea_id", "created_at", "valor_nuevo")
+                 .iterator(chunk_size=CHUNK_EXPORT))
+    # Los eventos más antiguos pueden estar ya en el archivo frío
+    filas.extend((tarea_id, ev["created_at"], ev["valor_nuevo"])
+                 for tarea_id, ev in eventos_archivados("tareas", tareas_qs)
+                 if _es_estado(ev["accion"], ev["campo"]))
+    if not filas:
+        vacio = np.empty(0)
+        return vacio.astype(np.int64), vacio, vacio.astype(np.int8)
+    tareas, momentos, estados = zip(*filas)
+    pos = np.searchsorted(ids, np.array(tareas, dtype=np.int64))
+    t = _epoch(momentos)
+    cod = np.fromiter((CODIGOS_ESTADO.get(e, -1) for e in estados), dtype=np.int8, count=len(estados))
+    orden = np.lexsort((t, pos))  # por tarea y, dentro de cada una, cronológico
+    return pos[orden], t[orden], cod[orden]
+
+
+def _primera(pos, t, mascara, n):
+    """Momento de la primera transición que cumple 'mascara' por tarea (NaN si no hay)."""
+    res = np.full(n, np.nan)
+    tareas, primera = np.unique(pos[mascara], return_index=True)  # ya vienen en orden cronológico
+    res[tareas] = t[mascara][primera]
+    return res
+
+
+def _tramos_atrasada(pos, t, cod, n, ahora):
+    """Segundos en Atrasada por tarea: desde cada entrada hasta el cambio siguiente de esa tarea."""
+    if not len(pos):
+        return np.zeros(n)
+    misma_tarea = np.zeros(len(pos), dtype=bool)
+    misma_tarea[:-1] = pos[1:] == pos[:-1]
+    siguiente = np.append(t[1:], ahora)
+    fin_tramo = np.where(misma_tarea, siguiente, ahora)
+    m = cod == CODIGOS_ESTADO["Atrasada"]
+    return np.bincount(pos[m], weights=(fin_tramo - t)[m], minlength=n)
+
+
+def _media(g, v, k):
+    ok = ~np.isnan(v)
+    cant = np.bincount(g[ok], minlength=k)
+    suma = np.bincount(g[ok], weights=v[ok], minlength=k)
+    return cant, np.divide(suma, cant, out=np.full(k, np.nan), where=cant > 0)
+
+
+def _mediana(g, v, k):
+    """Mediana por grupo: un lexsort por (grupo, valor) y los índices centrales de cada tramo."""
+    ok = ~np.isnan(v)
+    g, v = g[ok], v[ok]
+    orden = np.lexsort((v, g))
+    v = v[orden]
+    cant = np.bincount(g, minlength=k)
+    inicio = np.cumsum(cant) - cant
+    res = np.full(k, np.nan)
+    hay = cant > 0
+    bajo, alto = inicio + (cant - 1) // 2, inicio + cant // 2
+    res[hay] = (v[bajo[hay]] + v[alto[hay]]) / 2
+    return res
+
+
+def _dias(x):
+    return None if np.isnan(x) else round(float(x), 1)
+
+
+def _por_grupo(claves, m):
+    """Filas (dict) por valor distinto de 'claves' con las métricas de 'm'."""
+    unicas, g = np.unique(claves, return_inverse=True)
+    k = len(unicas)
+    tareas = np.bincount(g, minlength=k)
+    iniciadas, inicio_prom = _media(g, m["inicio"], k)
+    finalizadas, fin_prom = _media(g, m["fin"], k)
+    inicio_p50, fin_p50 = _mediana(g, m["inicio"], k), _mediana(g, m["fin"], k)
+    a_tiempo = np.bincount(g, weights=m["a_tiempo"], minlength=k)
+    atrasada_prom = np.bincount(g, weights=m["atrasada"], minlength=k) / tareas
+    return [{
+        "clave": unicas[i].item(),
+        "tareas": int(tareas[i]),
+        "iniciadas": int(iniciadas[i]),
+        "dias_inicio_prom": _dias(inicio_prom[i]),
+        "dias_inicio_p50": _dias(inicio_p50[i]),
+        "finalizadas": int(finalizadas[i]),
+        "dias_fin_prom": _dias(fin_prom[i]),
+        "dias_fin_p50": _dias(fin_p50[i]),
+        "dias_atrasada_prom": _dias(atrasada_prom[i]),
+        "a_tiempo_pct": round(float(a_tiempo[i]) * 100.0 / int(finalizadas[i]), 1) if finalizadas[i] else None,
+    } for i in range(k)]
+
+
+def calcular_tiempos(qs):
+    """
+    Tiempos de ciclo de las tareas de 'qs' (ya filtrado por alcance). Devuelve un dict
+    serializable {"total", "departamentos", "asignados", "meses"} ("total" None si no hay
+    tareas) o None si no hay NumPy.
+    """
+    if np is None:
+        return None
+    from .models import Departamento, User
+    tareas = _cargar_tareas(qs)
+    if tareas is None:
+        return {"total": None, "departamentos": [], "asignados": [], "meses": []}
+    n = len(tareas["id"])
+    pos, t, cod = _cargar_transiciones(qs, tareas["id"])
+    ahora = timezone.now().timestamp()
+
+    inicio = _primera(pos, t, cod == CODIGOS_ESTADO["En progreso"], n)
+    fin = _primera(pos, t, cod == CODIGOS_ESTADO["Finalizada"], n)
+    metricas = {
+        "inicio": np.maximum(inicio - tareas["creada"], 0) / SEGUNDOS_DIA,
+        "fin": np.maximum(fin - tareas["creada"], 0) / SEGUNDOS_DIA,
+        "atrasada": _tramos_atrasada(pos, t, cod, n, ahora) / SEGUNDOS_DIA,
+        "a_tiempo": (fin <= tareas["vence"]).astype(np.float64),  # NaN <= x es False
+    }
+
+    total = _por_grupo(np.zeros(n, dtype=np.int8), metricas)[0]
+    departamentos = _por_grupo(tareas["departamento"], metricas)
+    asignados = _por_grupo(tareas["asignado"], metricas)
+    meses = _por_grupo(tareas["mes"], metricas)
+
+    nombres_depto = dict(Departamento.objects.filter(pk__in=[f["clave"] for f in departamentos])
+                         .values_list("id", "nombre"))
+    nombres_user = {pk: f"{nom or ''} {ape or ''}".strip() for pk, nom, ape in
+                    User.objects.filter(pk__in=[f["clave"] for f in asignados])
+                    .values_list("id", "primer_nombre", "primer_apellido")}
+    for f in departamentos:
+        f["nombre"] = nombres_depto.get(f["clave"], "—")
+    for f in asignados:
+        f["nombre"] = nombres_user.get(f["clave"], "—")
+    for f in meses:
+        f["nombre"] = f["clave"].strftime("%Y-%m")
+
+    departamentos.sort(key=lambda f: f["nombre"].lower())
+    asignados.sort(key=lambda f: (-f["tareas"], f["nombre"].lower()))
+    meses.reverse()  # más reciente primero
+    return {"total": total, "departamentos": departamentos, "asignados": asignados, "meses": meses}
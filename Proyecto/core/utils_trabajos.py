@@ -0,0 +1,235 @@
+# core/utils_trabajos.py
+"""
+Cola de reportes en segundo plano (TrabajoReporte).
+
+- La vista encola la exportación filtrada (solicitar_reporte) y la UI consulta el estado.
+- manage.py procesar_reportes toma los pendientes (tomar_siguiente), genera el archivo
+  en settings.REPORTES_DIR y lo marca LISTO; la descarga sale de ese directorio.
+- Deduplicación: la clave es un hash de (empresa, tipo, filtros, alcance del usuario,
+  versión de los datos). Si ya hay un trabajo vivo o listo con esa clave, se reutiliza.
+"""
+import hashlib
+import json
+import os
+from datetime import timedelta
+from types import SimpleNamespace
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F, Q
+from django.http import QueryDict
+from django.utils import timezone
+
+from .utils_condicional import validadores_qs
+from .utils_pdf import generar_pdf_por_bloques
+from .utils_export import (CONTENT_TYPE_XLSX, ENCABEZADOS_EVALUACIONES, ENCABEZADOS_TAREAS, escribir_xlsx,
+                           filas_evaluaciones, filas_tareas)
+
+# Parámetros GET que entienden los filtros de cada reporte (el resto se ignora)
+FILTROS_TAREAS = ("estado", "depto", "asignado", "f_ini", "f_fin")
+FILTROS_EVALUACIONES = ("q", "tipo", "evaluador", "evaluado", "desde", "hasta", "puntaje_min")
+
+# Trabajos PROCESANDO por más que esto se consideran abandonados (worker caído) y se reintentan
+MINUTOS_ABANDONO = 30
+MAX_INTENTOS = 3
+
+
+# Mismo alcance por rol que las exportaciones directas (views.*_exportables)
+def _qs_tareas(peticion):
+    from .views import tareas_exportables
+    return tareas_exportables(peticion)
+
+
+def _qs_evals_pdf(peticion):
+    from .views import evaluaciones_exportables
+    return evaluaciones_exportables(peticion)
+
+
+def _qs_evals_xlsx(peticion):
+    from .views import evaluaciones_exportables, filtrar_evals
+    return evaluaciones_exportables(peticion, filtrar_evals)
+
+
+def _pdf(plantilla, filas, titulo):
+    def construir(qs, peticion, destino):
+        contexto = {"filtros": peticion.GET, "titulo": titulo, "now": timezone.now()}
+        generar_pdf_por_bloques(plantilla, contexto, filas(qs), destino,
+                                procesos=getattr(settings, "REPORTES_PDF_PROCESOS", 1))
+    return construir
+
+
+def _filas_evals_pdf(qs):
+    return filas_evaluaciones(qs, comentarios_en_una_linea=False)
+
+
+def _xlsx_tareas(qs, peticion, destino):
+    escribir_xlsx(destino, "Tareas", ENCABEZADOS_TAREAS, filas_tareas(qs))
+
+
+def _xlsx_evals(qs, peticion, destino):
+    escribir_xlsx(destino, "Evaluaciones", ENCABEZADOS_EVALUACIONES,
+                  filas_evaluaciones(qs, comentarios_en_una_linea=False))
+
+
+# tipo -> (filtros válidos, queryset, generador, extensión, nombre de descarga)
+TIPOS_REPORTE = {
+    "tareas_pdf": (FILTROS_TAREAS, _qs_tareas,
+                   _pdf("core/reportes/pdf_tareas.html", filas_tareas, "Tareas"), "pdf", "reporte_tareas"),
+    "tareas_xlsx": (FILTROS_TAREAS, _qs_tareas, _xlsx_tareas, "xlsx", "reporte_tareas"),
+    "evals_pdf": (FILTROS_EVALUACIONES, _qs_evals_pdf,
+                  _pdf("core/reportes/pdf_evaluaciones.html", _filas_evals_pdf, "Evaluaciones"), "pdf",
+                  "reporte_evaluaciones"),
+    "evals_xlsx": (FILTROS_EVALUACIONES, _qs_evals_xlsx, _xlsx_evals, "xlsx", "reporte_evaluaciones"),
+}
+
+CONTENT_TYPES = {
+    "pdf": "application/pdf",
+    "xlsx": CONTENT_TYPE_XLSX,
+}
+
+
+def directorio_reportes():
+    return str(getattr(settings, "REPORTES_DIR", os.path.join(settings.BASE_DIR, "reportes_generados")))
+
+
+def horas_retencion():
+    return getattr(settings, "REPORTES_RETENCION_HORAS", 24)
+
+
+def ruta_archivo(trabajo):
+    return os.path.join(directorio_reportes(), trabajo.archivo) if trabajo.archivo else None
+
+
+def nombre_descarga(trabajo):
+    _, _, _, ext, base = TIPOS_REPORTE[trabajo.tipo]
+    return f"{base}_{timezone.localtime(trabajo.created_at):%Y%m%d_%H%M}.{ext}"
+
+
+def alcance_de(user):
+    """
+    Lo que, además de los filtros, decide qué filas ve el usuario en los reportes.
+    Dos usuarios con el mismo alcance pueden compartir el archivo generado.
+    """
+    if user.is_superuser:
+        return "SU"
+    alcance = f"{user.rol_codigo or '-'}:{user.departamento_id or '-'}"
+    if user.rol_codigo == "SUPERVISOR":
+        alcance += f":{user.pk}"  # filtrar_evaluaciones limita al Supervisor a sus evaluaciones
+    return alcance
+
+
+def normalizar_filtros(tipo, params):
+    validos = TIPOS_REPORTE[tipo][0]
+    return {k: params.get(k, "").strip() for k in sorted(validos) if params.get(k, "").strip()}
+
+
+def peticion_para(user, filtros):
+    """Objeto con .user y .GET, lo único que leen las funciones filtrar_* de las vistas."""
+    get = QueryDict(mutable=True)
+    get.update(filtros)
+    return SimpleNamespace(user=user, GET=get)
+
+
+def _clave(user, tipo, filtros, version):
+    crudo = json.dumps([user.empresa_id, tipo, filtros, alcance_de(user), version], sort_keys=True)
+    return hashlib.sha256(crudo.encode("utf-8")).hexdigest()
+
+
+def solicitar_reporte(user, tipo, params):
+    """
+    Encola el reporte (o reutiliza uno idéntico vivo/listo). Devuelve (trabajo, creado).
+    La versión de datos sale del mismo aggregate barato que usa el ETag (max fecha + conteo).
+    """
+    from .models import TrabajoReporte
+    filtros = normalizar_filtros(tipo, params)
+    qs = TIPOS_REPORTE[tipo][1](peticion_para(user, filtros))
+    version, _ = validadores_qs(qs)
+    clave = _clave(user, tipo, filtros, version)
+
+    vigente_desde = timezone.now() - timedelta(hours=horas_retencion())
+    existente = (TrabajoReporte.objects
+                 .filter(clave=clave, estado__in=["PENDIENTE", "PROCESANDO", "LISTO"], created_at__gte=vigente_desde)
+                 .order_by("-created_at").first())
+    if existente and (existente.estado != "LISTO" or os.path.isfile(ruta_archivo(existente) or "")):
+        return existente, False
+    trabajo = TrabajoReporte.objects.create(
+        empresa_id=user.empresa_id, solicitado_por=user, tipo=tipo, filtros=filtros,
+        alcance=alcance_de(user), clave=clave,
+    )
+    return trabajo, True
+
+
+def marcar_agotados():
+    """
+    Pasa a ERROR los trabajos abandonados que ya usaron MAX_INTENTOS: tomar_siguiente
+    no los vuelve a reclamar y limpiar_vencidos no borra los PROCESANDO, así que sin
+    esto quedarían "procesando" para siempre. Devuelve cuántos marcó.
+    """
+    from .models import TrabajoReporte
+    abandono = timezone.now() - timedelta(minutes=MINUTOS_ABANDONO)
+    return (TrabajoReporte.objects
+            .filter(estado="PROCESANDO", iniciado_at__lt=abandono, intentos__gte=MAX_INTENTOS)
+            .update(estado="ERROR", error=f"Abandonado tras {MAX_INTENTOS} intentos.", terminado_at=timezone.now()))
+
+
+def tomar_siguiente():
+    """
+    Reclama el pendiente más antiguo (o uno abandonado por un worker caído) con un
+    UPDATE condicional: con varios workers solo uno lo obtiene, en cualquier motor.
+    Devuelve el trabajo o None.
+    """
+    from .models import TrabajoReporte
+    marcar_agotados()
+    abandono = timezone.now() - timedelta(minutes=MINUTOS_ABANDONO)
+    disponibles = Q(estado="PENDIENTE") | Q(estado="PROCESANDO", iniciado_at__lt=abandono,
+                                            intentos__lt=MAX_INTENTOS)
+    for pk in TrabajoReporte.objects.filter(disponibles).order_by("created_at").values_list("pk", flat=True)[:10]:
+        tomado = (TrabajoReporte.objects.filter(disponibles, pk=pk)
+                  .update(estado="PROCESANDO", iniciado_at=timezone.now(), intentos=F("intentos") + 1))
+        if tomado:
+            return TrabajoReporte.objects.select_related("solicitado_por").get(pk=pk)
+    return None
+
+
+def procesar(trabajo):
+    """
+    Genera el archivo del trabajo. Devuelve True si quedó LISTO.
+
+    Si el intento tarda más que MINUTOS_ABANDONO otro worker puede reclamar el trabajo
+    mientras este sigue corriendo: cada intento escribe su propio parcial y el resultado
+    solo se publica si el trabajo sigue siendo de este intento (mismo 'intentos').
+    """
+    _, armar_qs, construir, ext, _ = TIPOS_REPORTE[trabajo.tipo]
+    os.makedirs(directorio_reportes(), exist_ok=True)
+    nombre = f"{trabajo.pk}_{trabajo.tipo}.{ext}"
+    destino = os.path.join(directorio_reportes(), nombre)
+    parcial = f"{destino}.{trabajo.intentos}.parcial"
+    propio = type(trabajo).objects.filter(pk=trabajo.pk, intentos=trabajo.intentos)
+    try:
+        peticion = peticion_para(trabajo.solicitado_por, trabajo.filtros)
+        construir(armar_qs(peticion), peticion, parcial)
+        if not propio.exists():  # otro intento lo reclamó: su resultado es el que vale
+            os.remove(parcial)
+            return False
+        os.replace(parcial, destino)  # atómico: nunca se descarga un archivo a medias
+    except Exception as exc:
+        if os.path.exists(parcial):
+            os.remove(parcial)
+        propio.update(estado="ERROR", error=f"{type(exc).__name__}: {exc}"[:2000], terminado_at=timezone.now())
+        return False
+    return bool(propio.update(estado="LISTO", archivo=nombre, error="", terminado_at=timezone.now()))
+
+
+def limpiar_vencidos():
+    """Borra archivos y trabajos más antiguos que REPORTES_RETENCION_HORAS. Devuelve cuántos."""
+    from .models import TrabajoReporte
+    marcar_agotados()
+    limite = timezone.now() - timedelta(hours=horas_retencion())
+    viejos = list(TrabajoReporte.objects.filter(created_at__lt=limite).exclude(estado="PROCESANDO"))
+    for t in viejos:
+        ruta = ruta_archivo(t)
+        if ruta and os.path.isfile(ruta):
+            os.remove(ruta)
+    with transaction.atomic():
+        TrabajoReporte.objects.filter(pk__in=[t.pk for t in viejos]).delete()
+    return len(viejos)
@@ -8,15 +8,16 @@ from django.contrib import messages
 from django.contrib.auth.decorators import login_required
 from django.utils.decorators import method_decorator
 from .forms import *
-from django.views.generic import ListView, CreateView, UpdateView, DeleteView, DetailView, TemplateView
+from django.views.generic import ListView, CreateView, UpdateView, DeleteView, DetailView, TemplateView, View
 from django.urls import reverse_lazy, reverse
 from .models import *
 from .utils import *
 from django.db.models import Q, Count, Avg, Case, When, IntegerField, Sum
 from .mixins import *
+from django.core.paginator import Paginator
 from django.http import HttpResponse
 from django.utils.timezone import now, make_naive, localtime
-from datetime import datetime
+from datetime import datetime, timedelta
 import csv
 try:
     import openpyxl
@@ -33,19 +34,36 @@ from .utils_sms import *
 from django.template.loader import render_to_string
 from django.http import HttpResponse
 from django.db.models.functions import Coalesce
-from django.http import JsonResponse
+from django.http import JsonResponse, FileResponse, Http404
 from django.views.decorators.http import require_POST
 from .utils_reports import *
+from .utils_contadores import ESTADOS_TAREA, contadores_por_estado, total_estado
+from .utils_resumen_eval import (grupos_evaluaciones, grupos_resumen, kpis_resumen, resumen_con_totales,
+                                 resumen_por_evaluado, resumen_reporte_cacheado)
+from .utils_busqueda import buscar_tareas, filtrar_personas
+from .utils_historial import eventos_historial
+from .utils_suscripcion import suscripcion_activa
+from .utils_notif import reiniciar_no_leidas
+from .utils_dashboard import cacheado_por_version, contexto_dashboard
+from .utils_tendencias import dias_pedidos, fotos_visibles, serie_tendencias
+from .utils_tiempos_tareas import calcular_tiempos
+from .utils_analitica_eval import calcular_analitica, ventana_pedida
+from .utils_referencia import departamentos_empresa, miembros
+from .utils_condicional import get_condicional, validadores_qs
+from .utils_paginacion import paginar_keyset
+from .utils_export import (ENCABEZADOS_EVALUACIONES, ENCABEZADOS_TAREAS, filas_evaluaciones, filas_tareas,
+                           respuesta_csv, respuesta_xlsx)
+from .utils_trabajos import (CONTENT_TYPES, TIPOS_REPORTE, alcance_de, nombre_descarga, normalizar_filtros,
+                             ruta_archivo, solicitar_reporte)
 from .utils_messages import clear_messages
 from .decorators import require_gs_and_sub
 
-import logging, json
+import logging, json, os
 logger = logging.getLogger(__name__)
 User = get_user_model()
 
 def _empresa_tiene_sub_activa(user) -> bool:
-    sub = getattr(getattr(user, "empresa", None), "suscripcion", None)
-    return bool(sub and sub.is_active())
+    return suscripcion_activa(getattr(user, "empresa_id", None))
 
 # Create your views here.
 def index(request):
@@ -131,25 +149,19 @@ def baseprueba(request):
 
 #CRUD USUARIOS(RRHH):
 # Listar usuarios
-class UserListView(SuscripcionActivaRequiredMixin, SoloRRHHMixin, EmpresaQuerysetMixin, ListView):
+class UserListView(SuscripcionActivaRequiredMixin, SoloRRHHMixin, EmpresaQuerysetMixin, KeysetPaginationMixin, ListView):
     model = User
     template_name = "core/usuarios/user_list.html"
     context_object_name = "usuarios"
     paginate_by = 20
     ordering = ['primer_apellido','primer_nombre']
+    keyset_sin_cursor_si = ()  # la búsqueda de personas no cambia el orden
 
     def get_queryset(self):
         qs = super().get_queryset().select_related('rol')
         q = self.request.GET.get("q", "").strip()
         if q:
-            qs = qs.filter(
-                Q(username__icontains=q) |
-                Q(email__icontains=q) |
-                Q(primer_nombre__icontains=q) |
-                Q(primer_apellido__icontains=q) |
-                Q(rut__icontains=q) |
-                Q(rol__nombre__icontains=q)
-            )
+            qs = filtrar_personas(qs, q)
         return qs
     
 # Crear usuario
@@ -288,7 +300,7 @@ class DepartamentoDeleteView(SuscripcionActivaRequiredMixin, SoloRRHHMixin, Empr
 
 #CRUD TAREAS:
 # LISTAR (Gerente/Supervisor)
-class TareaListGSView(SuscripcionActivaRequiredMixin, SoloGerenteSupervisorMixin, EmpresaQuerysetMixin, ListView):
+class TareaListGSView(SuscripcionActivaRequiredMixin, SoloGerenteSupervisorMixin, EmpresaQuerysetMixin, KeysetPaginationMixin, ListView):
     model = Tarea
     template_name = "core/tareas/tarea_list_gs.html"
     context_object_name = "tareas"
@@ -305,27 +317,21 @@ class TareaListGSView(SuscripcionActivaRequiredMixin, SoloGerenteSupervisorMixin
         estado = (self.request.GET.get("estado") or "").strip()
 
         if q:
-            qs = qs.filter(
-                Q(titulo__icontains=q) |
-                Q(descripcion__icontains=q) |
-                Q(asignado__primer_nombre__icontains=q) |
-                Q(asignado__primer_apellido__icontains=q) |
-                Q(departamento__nombre__icontains=q)
-            )
+            qs = buscar_tareas(qs, q)  # índice de texto completo, ordenado por relevancia
         if estado:
             qs = qs.filter(estado=estado)
 
         user = self.request.user
-        rol = getattr(getattr(user, "rol", None), "nombre", None)
+        rol = user.rol_codigo
 
         # Gerente: solo su departamento
-        if rol == "Gerente" and getattr(user, "departamento_id", None):
+        if rol == "GERENTE" and getattr(user, "departamento_id", None):
             qs = qs.filter(departamento_id=user.departamento_id)
 
         # Supervisor: (si permites esta vista) mostrar equipo de su depto (trabajadores)
-        if rol == "Supervisor" and getattr(user, "departamento_id", None):
+        if rol == "SUPERVISOR" and getattr(user, "departamento_id", None):
             qs = qs.filter(
-                asignado__rol__nombre="Trabajador",
+                asignado__rol_codigo="TRABAJADOR",
                 asignado__departamento_id=user.departamento_id
             )
 
@@ -384,8 +390,8 @@ class TareaCreateView(SuscripcionActivaRequiredMixin, SoloGerenteSupervisorMixin
         return redirect(self.get_success_url())
 
     def get_success_url(self):
-        rol = getattr(getattr(self.request.user, "rol", None), "nombre", None)
-        if rol == "Supervisor":
+        rol = self.request.user.rol_codigo
+        if rol == "SUPERVISOR":
             return reverse("tarea_list_supervisor_equipo")
         return reverse("tarea_list_gs")
 
@@ -407,7 +413,7 @@ class TareaUpdateView(SuscripcionActivaRequiredMixin, SoloGerenteSupervisorMixin
         original = Tarea.objects.get(pk=self.object.pk)
         # Mantener estado
         u = self.request.user
-        if getattr(u, "rol", None) and u.rol.nombre in ['Gerente','Supervisor']:
+        if u.rol_codigo in ["GERENTE", "SUPERVISOR"]:
             form.instance.estado = original.estado
 
         resp = super().form_valid(form)
@@ -447,8 +453,7 @@ class TareaDetailView(SuscripcionActivaRequiredMixin, LoginRequiredMixin, Empres
     context_object_name = "tarea"
 
     def _rol(self):
-        r = getattr(self.request.user, "rol", None)
-        return getattr(r, "nombre", None)
+        return self.request.user.rol_codigo
 
     def get_queryset(self):
         # 1) Filtra por empresa (mixin) y trae relaciones útiles
@@ -464,22 +469,22 @@ class TareaDetailView(SuscripcionActivaRequiredMixin, LoginRequiredMixin, Empres
         src = self.request.GET.get("src", "")
 
         # 2) Limita visibilidad por rol
-        if rol == "Gerente" and dept_id:
+        if rol == "GERENTE" and dept_id:
             # Gerente: tareas del propio departamento
             return qs.filter(departamento_id=dept_id)
 
-        if rol == "Supervisor" and dept_id:
+        if rol == "SUPERVISOR" and dept_id:
             # Supervisor:
             # - si viene desde "mis tareas": solo las suyas
             # - si no, solo equipo (trabajadores) de su dpto
             if src == "mias":
                 return qs.filter(asignado=u)
             return qs.filter(
-                asignado__rol__nombre="Trabajador",
+                asignado__rol_codigo="TRABAJADOR",
                 asignado__departamento_id=dept_id
             )
 
-        if rol == "Trabajador":
+        if rol == "TRABAJADOR":
             # Trabajador: solo sus tareas
             return qs.filter(asignado=u)
 
@@ -490,10 +495,10 @@ class TareaDetailView(SuscripcionActivaRequiredMixin, LoginRequiredMixin, Empres
         user = self.request.user
         rol = self._rol()
 
-        if user.is_superuser or rol == "Gerente":
+        if user.is_superuser or rol == "GERENTE":
             return ["core/tareas/tarea_detail_gs.html"]
 
-        if rol == "Supervisor":
+        if rol == "SUPERVISOR":
             src = self.request.GET.get("src", "")
             if src == "mias":
                 return ["core/tareas/tarea_detail_supervisor_mias.html"]
@@ -509,19 +514,19 @@ class TareaDetailView(SuscripcionActivaRequiredMixin, LoginRequiredMixin, Empres
         obj = ctx["tarea"]
 
         # Solo el asignado puede cambiar estado (y nunca el Gerente)
-        can_change = (obj.asignado_id == u.id) and (rol in ("Supervisor", "Trabajador"))
+        can_change = (obj.asignado_id == u.id) and (rol in ("SUPERVISOR", "TRABAJADOR"))
         ctx["can_change_state"] = can_change
 
         # back_url según rol/origen
         src = self.request.GET.get("src", "")
-        if rol == "Supervisor":
+        if rol == "SUPERVISOR":
             if src == "mias":
                 back = reverse("tarea_list_supervisor_mias")
             else:
                 back = reverse("tarea_list_supervisor_equipo")
-        elif rol == "Trabajador":
+        elif rol == "TRABAJADOR":
             back = reverse("tarea_list_trab")
-        elif rol == "Gerente" or u.is_superuser:
+        elif rol == "GERENTE" or u.is_superuser:
             back = reverse("tarea_list_gs")
         else:
             back = reverse("tarea_list_gs")  # fallback seguro
@@ -541,14 +546,14 @@ class TareaEstadoUpdateView(LoginRequiredMixin, SuscripcionActivaRequiredMixin,
 
         u = request.user
         # Gerente no cambia estados (como ya tenías)
-        if getattr(u, "rol", None) and u.rol.nombre == "Gerente" and not u.is_superuser:
+        if u.rol_codigo == "GERENTE" and not u.is_superuser:
             messages.error(request, "El gerente no puede cambiar estados de tareas.")
             return redirect("tarea_list_gs")
 
         # Solo el asignado puede cambiar
         if obj.asignado_id != u.id:
             messages.error(request, "Solo el asignado puede cambiar el estado.")
-            if getattr(u, "rol", None) and u.rol.nombre == "Supervisor":
+            if u.rol_codigo == "SUPERVISOR":
                 return redirect("tarea_list_supervisor_mias")
             return redirect("tarea_list_trab")
 
@@ -587,19 +592,20 @@ class TareaEstadoUpdateView(LoginRequiredMixin, SuscripcionActivaRequiredMixin,
 
     def get_success_url(self):
         u = self.request.user
-        if getattr(u, "rol", None) and u.rol.nombre == "Supervisor":
+        if u.rol_codigo == "SUPERVISOR":
             return reverse_lazy("tarea_list_supervisor_mias")
         return reverse_lazy("tarea_list_trab")
 
 
 # EVALUACIONES:
 # Listado global (Gerente ve todas; Supervisor también puede usar este con filtros si quieres)
-class EvalListGSView(SuscripcionActivaRequiredMixin, SoloGerenteSupervisorMixin, EmpresaQuerysetMixin, ListView):
+class EvalListGSView(SuscripcionActivaRequiredMixin, SoloGerenteSupervisorMixin, EmpresaQuerysetMixin, KeysetPaginationMixin, ListView):
     model = Evaluacion
     template_name = "core/evaluaciones/eval_list_gs.html"
     context_object_name = "evaluaciones"
     paginate_by = 20
     ordering = ['-created_at']
+    keyset_sin_cursor_si = ()
 
     def get_queryset(self):
         u = self.request.user
@@ -614,7 +620,7 @@ class EvalListGSView(SuscripcionActivaRequiredMixin, SoloGerenteSupervisorMixin,
         # Visibilidad por rol
         if u.is_superuser:
             pass
-        elif u.rol and u.rol.nombre == "Gerente":
+        elif u.rol_codigo == "GERENTE":
             if dept_id:
                 qs = qs.filter(
                     Q(tipo="SUPERVISOR", evaluado__departamento_id=dept_id) |
@@ -622,7 +628,7 @@ class EvalListGSView(SuscripcionActivaRequiredMixin, SoloGerenteSupervisorMixin,
                 )
             else:
                 qs = qs.none()
-        elif u.rol and u.rol.nombre == "Supervisor":
+        elif u.rol_codigo == "SUPERVISOR":
             qs = qs.filter(evaluador=u)  # solo las que él realizó
         else:
             qs = qs.none()
@@ -637,12 +643,7 @@ class EvalListGSView(SuscripcionActivaRequiredMixin, SoloGerenteSupervisorMixin,
         f_hasta = self.request.GET.get("hasta", "").strip()
 
         if q:
-            qs = qs.filter(
-                Q(evaluado__primer_nombre__icontains=q) |
-                Q(evaluado__primer_apellido__icontains=q) |
-                Q(evaluador__primer_nombre__icontains=q) |
-                Q(evaluador__primer_apellido__icontains=q)
-            )
+            qs = filtrar_personas(qs, q, "evaluado", "evaluador")
         if tipo in ("SUPERVISOR", "TRABAJADOR"):
             qs = qs.filter(tipo=tipo)
         if puntaje_min.isdigit():
@@ -661,30 +662,22 @@ class EvalListGSView(SuscripcionActivaRequiredMixin, SoloGerenteSupervisorMixin,
     def get_context_data(self, **kwargs):
         ctx = super().get_context_data(**kwargs)
         u = self.request.user
-        dept_id = getattr(u.departamento, "id", None)
-
-        # Selects limitados por empresa/depto
-        base_users = User.objects.filter(empresa=u.empresa).select_related("rol", "departamento")
-
-        if u.is_superuser:
-            evaluadores = base_users.filter(rol__nombre__in=["Gerente", "Supervisor"]).order_by("primer_apellido","primer_nombre")
-            evaluados_supervisores = base_users.filter(rol__nombre="Supervisor").order_by("primer_apellido","primer_nombre")
-            evaluados_trabajadores = base_users.filter(rol__nombre="Trabajador").order_by("primer_apellido","primer_nombre")
-        elif u.rol and u.rol.nombre == "Gerente":
-            evaluadores = base_users.filter(rol__nombre="Gerente", departamento_id=dept_id)
-            evaluadores = evaluadores.union(base_users.filter(rol__nombre="Supervisor", departamento_id=dept_id)).order_by("primer_apellido","primer_nombre")
-            evaluados_supervisores = base_users.filter(rol__nombre="Supervisor", departamento_id=dept_id).order_by("primer_apellido","primer_nombre")
-            evaluados_trabajadores = base_users.filter(rol__nombre="Trabajador", departamento_id=dept_id).order_by("primer_apellido","primer_nombre")
-        else:  # Supervisor
-            evaluadores = base_users.filter(id=u.id)
-            evaluados_supervisores = base_users.none()
-            evaluados_trabajadores = base_users.filter(rol__nombre="Trabajador", departamento_id=dept_id).order_by("primer_apellido","primer_nombre")
 
+        # Selects limitados por empresa/depto (caché de referencia)
+        evaluadores, evaluados_supervisores, evaluados_trabajadores = _listas_filtro_evaluaciones(u)
         ctx["evaluadores"] = evaluadores
         ctx["evaluados_supervisores"] = evaluados_supervisores
         ctx["evaluados_trabajadores"] = evaluados_trabajadores
 
-        agg = ctx["evaluaciones"].aggregate(promedio=Avg("puntaje"), total=Count("id"))
+        # KPIs: sin filtros, el superusuario (alcance = toda la empresa) lee el resumen materializado.
+        # El alcance del Gerente depende del depto del evaluador (TRABAJADOR), que el resumen
+        # no guarda: ahí se agrega sobre la misma lista para que KPIs y tabla coincidan.
+        filtros = ("q", "tipo", "puntaje_min", "evaluador", "evaluado", "desde", "hasta")
+        sin_filtros = not any(self.request.GET.get(k, "").strip() for k in filtros)
+        if sin_filtros and u.is_superuser:
+            agg = kpis_resumen(ResumenEvaluacion.objects.filter(empresa=u.empresa))
+        else:
+            agg = self.object_list.aggregate(promedio=Avg("puntaje"), total=Count("id"))
         ctx["kpi_promedio"] = agg["promedio"]
         ctx["kpi_total"] = agg["total"]
         return ctx
@@ -708,16 +701,21 @@ class EvalMisEvaluacionesView(LoginRequiredMixin, SuscripcionActivaRequiredMixin
               .get_queryset()  # <--- usa el mixin
               .select_related('evaluado', 'evaluador')
               .filter(evaluado=u))
-        if u.rol and u.rol.nombre == "Trabajador":
+        if u.rol_codigo == "TRABAJADOR":
             qs = qs.filter(tipo="TRABAJADOR")
-        elif u.rol and u.rol.nombre == "Supervisor":
+        elif u.rol_codigo == "SUPERVISOR":
             qs = qs.filter(tipo="SUPERVISOR")
         return qs.order_by(*self.ordering)
 
     def get_context_data(self, **kwargs):
         ctx = super().get_context_data(**kwargs)
-        qs_all = self.get_queryset()
-        agg = qs_all.aggregate(promedio=Avg("puntaje"), total=Count("id"))
+        u = self.request.user
+        res = ResumenEvaluacion.objects.filter(evaluado=u)
+        if u.rol_codigo == "TRABAJADOR":
+            res = res.filter(tipo="TRABAJADOR")
+        elif u.rol_codigo == "SUPERVISOR":
+            res = res.filter(tipo="SUPERVISOR")
+        agg = kpis_resumen(res)
         ctx["kpi_promedio"] = agg["promedio"]
         ctx["kpi_total"] = agg["total"]
         return ctx
@@ -739,9 +737,7 @@ class EvalListTrabajadorView(SuscripcionActivaRequiredMixin, SoloTrabajadorMixin
 
     def get_context_data(self, **kwargs):
         ctx = super().get_context_data(**kwargs)
-        qs_all = (super().get_queryset()
-                  .filter(evaluado=self.request.user, tipo="TRABAJADOR"))
-        agg = qs_all.aggregate(promedio=Avg("puntaje"), total=Count("id"))
+        agg = kpis_resumen(ResumenEvaluacion.objects.filter(evaluado=self.request.user, tipo="TRABAJADOR"))
         ctx["kpi_promedio"] = agg["promedio"]
         ctx["kpi_total"] = agg["total"]
         return ctx
@@ -762,8 +758,7 @@ class EvalListMiasView(LoginRequiredMixin, SuscripcionActivaRequiredMixin, Empre
 
     def get_context_data(self, **kwargs):
         ctx = super().get_context_data(**kwargs)
-        qs_all = Evaluacion.objects.filter(evaluado=self.request.user)
-        agg = qs_all.aggregate(promedio=Avg("puntaje"), total=Count("id"))
+        agg = kpis_resumen(ResumenEvaluacion.objects.filter(evaluado=self.request.user))
         ctx["kpi_promedio"] = agg["promedio"]
         ctx["kpi_total"] = agg["total"]
         return ctx
@@ -822,11 +817,11 @@ class EvalGeneralUpdateView(SuscripcionActivaRequiredMixin, SoloGerenteSuperviso
         obj = self.get_object()
         u = request.user
 
-        if u.rol and u.rol.nombre == "Supervisor" and obj.evaluador != u and not u.is_superuser:
+        if u.rol_codigo == "SUPERVISOR" and obj.evaluador != u and not u.is_superuser:
             messages.error(request, "Solo puedes editar evaluaciones creadas por ti.")
             return redirect("eval_list_gs")
 
-        if u.rol and u.rol.nombre == "Gerente" and not u.is_superuser:
+        if u.rol_codigo == "GERENTE" and not u.is_superuser:
             same = (getattr(u, "departamento_id", None) ==
                     getattr(obj.evaluador, "departamento_id", None) ==
                     getattr(obj.evaluado, "departamento_id", None))
@@ -858,11 +853,11 @@ class EvalGeneralDeleteView(SuscripcionActivaRequiredMixin, SoloGerenteSuperviso
         obj = self.get_object()
         u = request.user
 
-        if u.rol and u.rol.nombre == "Supervisor" and obj.evaluador != u and not u.is_superuser:
+        if u.rol_codigo == "SUPERVISOR" and obj.evaluador != u and not u.is_superuser:
             messages.error(request, "Solo puedes eliminar evaluaciones creadas por ti.")
             return redirect("eval_list_gs")
 
-        if u.rol and u.rol.nombre == "Gerente" and not u.is_superuser:
+        if u.rol_codigo == "GERENTE" and not u.is_superuser:
             same = (getattr(u, "departamento_id", None) ==
                     getattr(obj.evaluador, "departamento_id", None) ==
                     getattr(obj.evaluado, "departamento_id", None))
@@ -879,8 +874,14 @@ class DashboardView(SuscripcionActivaRequiredMixin, SoloGerenteSupervisorMixin,
 
     def get_context_data(self, **kwargs):
         ctx = super().get_context_data(**kwargs)
+        ctx["role_name"] = self.request.user.rol_codigo
+        # Cacheado por (empresa, depto, rol); se invalida con escrituras de Tarea/Evaluacion/User
+        ctx.update(contexto_dashboard(self.request.user, self.calcular_dashboard))
+        return ctx
+
+    def calcular_dashboard(self):
         u = self.request.user
-        rn = getattr(getattr(u, "rol", None), "nombre", "")
+        rn = u.rol_codigo
         depto = getattr(u, "departamento", None)
 
         # Bases por empresa
@@ -888,52 +889,45 @@ class DashboardView(SuscripcionActivaRequiredMixin, SoloGerenteSupervisorMixin,
         qs_tareas = (Tarea.objects
                      .select_related("departamento", "asignado", "asignado__rol")
                      .filter(empresa=u.empresa))
-        qs_eval   = (Evaluacion.objects
-                     .select_related("evaluado", "evaluador",
-                                     "evaluado__rol", "evaluado__departamento",
-                                     "evaluador__rol", "evaluador__departamento")
-                     .filter(empresa=u.empresa))
+        qs_eval   = ResumenEvaluacion.objects.filter(empresa=u.empresa)  # resumen materializado
 
         # Alcance por rol
         if u.is_superuser:
             pass
-        elif rn == "Gerente" and depto:
+        elif rn == "GERENTE" and depto:
             qs_users  = qs_users.filter(departamento=depto)
             qs_tareas = qs_tareas.filter(departamento=depto)  # Gerente ve tareas de Supervisores + Trabajadores de su depto
-            qs_eval   = qs_eval.filter(evaluado__departamento=depto)
-        elif rn == "Supervisor" and depto:
-            qs_users  = qs_users.filter(departamento=depto, rol__nombre="Trabajador")
-            qs_tareas = qs_tareas.filter(departamento=depto, asignado__rol__nombre="Trabajador")  # solo trabajadores
-            qs_eval   = qs_eval.filter(tipo="TRABAJADOR", evaluado__departamento=depto, evaluado__rol__nombre="Trabajador")
+            qs_eval   = qs_eval.filter(departamento=depto)
+        elif rn == "SUPERVISOR" and depto:
+            qs_users  = qs_users.filter(departamento=depto, rol_codigo="TRABAJADOR")
+            qs_tareas = qs_tareas.filter(departamento=depto, asignado__rol_codigo="TRABAJADOR")  # solo trabajadores
+            qs_eval   = qs_eval.filter(tipo="TRABAJADOR", departamento=depto, evaluado__rol_codigo="TRABAJADOR")
 
         # ===== Gráfico principal: Tareas por estado (barras múltiples por rol asignado)
-        ESTADOS = ["Pendiente", "En progreso", "Atrasada", "Finalizada"]
-        agg_estado_rol = qs_tareas.values("estado", "asignado__rol__nombre").annotate(total=Count("id"))
-        por_estado = {e: {"Trabajador": 0, "Supervisor": 0} for e in ESTADOS}
-        for row in agg_estado_rol:
-            est = row["estado"]
-            rol_asig = row["asignado__rol__nombre"] or ""
-            if est in por_estado and rol_asig in por_estado[est]:
-                por_estado[est][rol_asig] = row["total"]
+        # Se lee de ContadorTareas (mantenido por signals) en vez de agrupar Tarea.
+        ESTADOS = ESTADOS_TAREA
+        if u.is_superuser:
+            contadores = contadores_por_estado(empresa=u.empresa)
+        elif rn == "GERENTE" and depto:
+            contadores = contadores_por_estado(empresa=u.empresa, departamento=depto)
+        elif rn == "SUPERVISOR" and depto:
+            contadores = contadores_por_estado(empresa=u.empresa, departamento=depto, roles=["TRABAJADOR"])
+        else:
+            contadores = contadores_por_estado(empresa=u.empresa)
+        por_estado = {e: {"Trabajador": contadores[e].get("TRABAJADOR", 0),
+                          "Supervisor": contadores[e].get("SUPERVISOR", 0)} for e in ESTADOS}
 
         data_trab = [por_estado[e]["Trabajador"] for e in ESTADOS]
         data_supv = [por_estado[e]["Supervisor"] for e in ESTADOS]  # para Supervisor quedará en 0 (OK)
 
-        # KPIs y tablas
-        usuarios_por_rol = qs_users.values("rol__nombre").annotate(total=Count("id")).order_by("rol__nombre")
-        atrasadas = qs_tareas.filter(estado="Atrasada").count()
+        # KPIs y tablas (listas, no querysets: el resultado va a la caché)
+        usuarios_por_rol = list(qs_users.values("rol__nombre").annotate(total=Count("id")).order_by("rol__nombre"))
+        atrasadas = total_estado(contadores, "Atrasada")
 
         # Top 5
         top_n = 5
-        top_trabajadores = (qs_eval.filter(evaluado__rol__nombre="Trabajador")
-                            .values("evaluado__primer_nombre","evaluado__primer_apellido")
-                            .annotate(prom=Avg("puntaje"), total=Count("id"))
-                            .order_by("-prom","-total")[:top_n])
-
-        top_supervisores = (qs_eval.filter(evaluado__rol__nombre="Supervisor")
-                            .values("evaluado__primer_nombre","evaluado__primer_apellido")
-                            .annotate(prom=Avg("puntaje"), total=Count("id"))
-                            .order_by("-prom","-total")[:top_n])
+        top_trabajadores = list(resumen_por_evaluado(qs_eval.filter(evaluado__rol_codigo="TRABAJADOR"))[:top_n])
+        top_supervisores = list(resumen_por_evaluado(qs_eval.filter(evaluado__rol_codigo="SUPERVISOR"))[:top_n])
 
         # Tabla por estado (desglose por rol si aplica)
         tabla_estado = []
@@ -946,8 +940,7 @@ class DashboardView(SuscripcionActivaRequiredMixin, SoloGerenteSupervisorMixin,
             fila["total"] = fila["trab"] + fila["sup"]
             tabla_estado.append(fila)
 
-        ctx.update({
-            "role_name": rn,
+        return {
             "estados_labels": ESTADOS,
             "tareas_estado_trab": data_trab,
             "tareas_estado_sup": data_supv,
@@ -958,8 +951,22 @@ class DashboardView(SuscripcionActivaRequiredMixin, SoloGerenteSupervisorMixin,
 
             "top_trabajadores": top_trabajadores,   # top 5
             "top_supervisores": top_supervisores,   # top 5 (solo Gerente/SU)
-        })
-        return ctx
+        }
+
+
+class DashboardTendenciasView(SuscripcionActivaRequiredMixin, SoloGerenteSupervisorMixin, View):
+    """
+    JSON con backlog, vencidas y finalizadas por día (?dias=30, máx. 365) para los gráficos
+    de tendencia del dashboard. Solo lee FotoDiariaTareas (manage.py foto_diaria_tareas).
+    """
+    def get(self, request, *args, **kwargs):
+        hasta = timezone.localdate()
+        desde = hasta - timedelta(days=dias_pedidos(request.GET.get("dias")) - 1)
+        qs = fotos_visibles(request.user)
+        # Las fotos cambian una vez al día: el navegador revalida y casi siempre recibe 304
+        etag, modificado = validadores_qs(qs.filter(dia__gte=desde, dia__lte=hasta))
+        return get_condicional(request, etag, modificado,
+                               lambda: JsonResponse(serie_tendencias(qs, desde, hasta)))
     
 
 # -----------------------
@@ -1011,12 +1018,7 @@ def filtrar_evaluaciones(request):
     puntaje_min = request.GET.get("puntaje_min") or ""
 
     if q:
-        qs = qs.filter(
-            Q(evaluado__primer_nombre__icontains=q) |
-            Q(evaluado__primer_apellido__icontains=q) |
-            Q(evaluador__primer_nombre__icontains=q) |
-            Q(evaluador__primer_apellido__icontains=q)
-        )
+        qs = filtrar_personas(qs, q, "evaluado", "evaluador")
     if tipo in ("SUPERVISOR", "TRABAJADOR"):
         qs = qs.filter(tipo=tipo)
     if evaluador_id.isdigit():
@@ -1035,11 +1037,11 @@ def filtrar_evaluaciones(request):
 
     # Visibilidad adicional por rol (opcional)
     u = request.user
-    rol = getattr(getattr(u, "rol", None), "nombre", "")
-    if rol == "Supervisor" and not u.is_superuser:
+    rol = u.rol_codigo
+    if rol == "SUPERVISOR" and not u.is_superuser:
         qs = qs.filter(evaluador=u)
     # Si quieres restringir Gerente a su depto:
-    # if rol == "Gerente" and u.departamento_id:
+    # if rol == "GERENTE" and u.departamento_id:
     #     qs = qs.filter(evaluado__departamento_id=u.departamento_id)
 
     return qs
@@ -1047,16 +1049,37 @@ def filtrar_evaluaciones(request):
 # REPORTES TAREAS (lista + filtros)
 # -----------------------
 def _rol(user):
-    return getattr(getattr(user, "rol", None), "nombre", "")
+    return user.rol_codigo
 
 def _dept(user):
     return getattr(user, "departamento", None)
 
-def _users_en_depto(role_name, dept):
-    return User.objects.filter(rol__nombre=role_name, departamento=dept, empresa=dept.empresa)
+def _users_en_depto(rol_codigo, dept):
+    return User.objects.filter(rol_codigo=rol_codigo, departamento=dept, empresa=dept.empresa)
+
+def _miembros_depto(u, roles):
+    """Miembros del depto del usuario con esos roles (sin depto: los que tampoco tienen)."""
+    return [p for p in miembros(u.empresa_id, u.departamento_id, roles=roles)
+            if p["departamento_id"] == u.departamento_id]
+
+def _listas_filtro_evaluaciones(u):
+    """(evaluadores, evaluados_supervisores, evaluados_trabajadores) para los filtros de evaluaciones."""
+    if u.is_superuser:
+        return (miembros(u.empresa_id, roles=["GERENTE", "SUPERVISOR"]),
+                miembros(u.empresa_id, roles=["SUPERVISOR"]),
+                miembros(u.empresa_id, roles=["TRABAJADOR"]))
+    if u.rol_codigo == "GERENTE":
+        return (_miembros_depto(u, ["GERENTE", "SUPERVISOR"]),
+                _miembros_depto(u, ["SUPERVISOR"]),
+                _miembros_depto(u, ["TRABAJADOR"]))
+    # Supervisor: solo él como evaluador
+    yo = [p for p in miembros(u.empresa_id, u.departamento_id) if p["id"] == u.pk]
+    return yo, [], _miembros_depto(u, ["TRABAJADOR"])
 
 class ReporteTareasView(SuscripcionActivaRequiredMixin, SoloGerenteSupervisorMixin, TemplateView):
     template_name = "core/reportes/reporte_tareas.html"
+    paginate_by = 50
+    orden_tabla = ["fecha_limite", "id"]  # keyset; cubierto por tarea_emp_dep_est_fl_idx
 
     def get_queryset(self):
         u = self.request.user
@@ -1070,8 +1093,8 @@ class ReporteTareasView(SuscripcionActivaRequiredMixin, SoloGerenteSupervisorMix
 
         if not su:
             qs = qs.filter(departamento=dept)
-            if rol == "Supervisor":
-                qs = qs.filter(asignado__rol__nombre="Trabajador", asignado__departamento=dept)
+            if rol == "SUPERVISOR":
+                qs = qs.filter(asignado__rol_codigo="TRABAJADOR", asignado__departamento=dept)
 
         # Filtros GET
         estado = self.request.GET.get("estado", "").strip()
@@ -1096,6 +1119,18 @@ class ReporteTareasView(SuscripcionActivaRequiredMixin, SoloGerenteSupervisorMix
 
         return qs.order_by("fecha_limite")
 
+    def contexto_tabla(self, qs):
+        """Una página de la tabla por cursor (sin OFFSET ni COUNT): la comparten la página y el endpoint AJAX."""
+        page = paginar_keyset(qs, self.orden_tabla, self.paginate_by, token=self.request.GET.get("cursor"))
+        params = self.request.GET.copy()
+        params.pop("cursor", None)
+        return {
+            "tareas": page.object_list,
+            "page_obj": page,
+            "is_paginated": page.has_other_pages(),
+            "paginacion_qs": f"{params.urlencode()}&" if params else "",
+        }
+
     def get_context_data(self, **kwargs):
         ctx = super().get_context_data(**kwargs)
         u = self.request.user
@@ -1105,27 +1140,50 @@ class ReporteTareasView(SuscripcionActivaRequiredMixin, SoloGerenteSupervisorMix
 
         qs = self.get_queryset()
 
-        # Listas de filtro (limitadas por empresa)
+        # Listas de filtro (limitadas por empresa, desde la caché de referencia)
         if su:
-            departamentos = Departamento.objects.filter(empresa=u.empresa).order_by("nombre")
-            asignables = User.objects.filter(empresa=u.empresa).exclude(rol__nombre="Recursos humanos").order_by("primer_apellido")
-        elif rol == "Gerente":
-            departamentos = Departamento.objects.filter(empresa=u.empresa, pk=getattr(dept, "pk", None))
-            asignables = User.objects.filter(empresa=u.empresa, departamento=dept, rol__nombre__in=["Supervisor","Trabajador"]).order_by("primer_apellido")
+            departamentos = departamentos_empresa(u.empresa_id)
+            asignables = miembros(u.empresa_id, excluir_roles=["RRHH"])
+        elif rol == "GERENTE":
+            departamentos = departamentos_empresa(u.empresa_id, ids=[u.departamento_id])
+            asignables = _miembros_depto(u, ["SUPERVISOR", "TRABAJADOR"])
         else:  # Supervisor
-            departamentos = Departamento.objects.filter(empresa=u.empresa, pk=getattr(dept, "pk", None))
-            asignables = User.objects.filter(empresa=u.empresa, departamento=dept, rol__nombre="Trabajador").order_by("primer_apellido")
+            departamentos = departamentos_empresa(u.empresa_id, ids=[u.departamento_id])
+            asignables = _miembros_depto(u, ["TRABAJADOR"])
 
-        total = qs.count()
-        pend = qs.filter(estado="Pendiente").count()
-        prog = qs.filter(estado="En progreso").count()
-        atras = qs.filter(estado="Atrasada").count()
-        fin = qs.filter(estado="Finalizada").count()
+        g = self.request.GET
+        estado = g.get("estado", "").strip()
+        con_filtros = any(g.get(k, "").strip() for k in ("asignado", "f_ini", "f_fin")) or (
+            g.get("depto", "").strip() and su
+        )
+        # El Supervisor también exige asignado__departamento=dept (get_queryset), algo que los
+        # contadores, agrupados por el depto de la tarea, no distinguen: sus KPIs salen de la tabla
+        if con_filtros or (not su and (dept is None or rol == "SUPERVISOR")):
+            # Un solo recorrido con agregación condicional (antes, un COUNT por estado)
+            kpis = qs.order_by().aggregate(
+                pend=Count("id", filter=Q(estado="Pendiente")),
+                prog=Count("id", filter=Q(estado="En progreso")),
+                atras=Count("id", filter=Q(estado="Atrasada")),
+                fin=Count("id", filter=Q(estado="Finalizada")),
+            )
+            pend, prog, atras, fin = kpis["pend"], kpis["prog"], kpis["atras"], kpis["fin"]
+        else:
+            # Sin filtros finos: KPIs desde los contadores denormalizados
+            contadores = contadores_por_estado(empresa=u.empresa, departamento=None if su else dept)
+            if estado in ESTADOS_TAREA:
+                contadores = {e: (v if e == estado else {}) for e, v in contadores.items()}
+            pend = total_estado(contadores, "Pendiente")
+            prog = total_estado(contadores, "En progreso")
+            atras = total_estado(contadores, "Atrasada")
+            fin = total_estado(contadores, "Finalizada")
+        total = pend + prog + atras + fin
 
         def pct(n, d): return (n * 100.0 / d) if d else 0.0
 
+        ctx.update(self.contexto_tabla(qs))
         ctx.update({
-            "tareas": qs,
+            "tabla_url": reverse("reporte_tareas_tabla"),
+            "tiempos_url": reverse("reporte_tareas_tiempos"),
             "departamentos": departamentos,
             "trabajadores": asignables,
             "kpi_total": total,
@@ -1136,66 +1194,64 @@ class ReporteTareasView(SuscripcionActivaRequiredMixin, SoloGerenteSupervisorMix
         })
         return ctx
 
+
+class ReporteTareasTablaView(ReporteTareasView):
+    """Fragmento HTML (filas + paginación) para cambiar de página sin recargar KPIs ni filtros."""
+    template_name = "core/reportes/_tabla_tareas.html"
+
+    def get_context_data(self, **kwargs):
+        ctx = TemplateView.get_context_data(self, **kwargs)
+        ctx.update(self.contexto_tabla(self.get_queryset()))
+        return ctx
+
+class ReporteTareasTiemposView(ReporteTareasView):
+    """
+    JSON con los tiempos de ciclo (mismos filtros y alcance), pedido por la página después de
+    renderizarla: recorrer el historial del alcance no demora el HTML del reporte.
+    """
+    def get(self, request, *args, **kwargs):
+        data = cacheado_por_version(request.user, "rep_tiempos", normalizar_filtros("tareas_pdf", request.GET),
+                                    lambda: calcular_tiempos(self.get_queryset()))
+        if data is None:
+            return JsonResponse({"detail": "Tiempos de ciclo no disponibles (falta NumPy)."}, status=503)
+        return JsonResponse(data)
+
+def tareas_exportables(request):
+    """Tareas filtradas y limitadas al alcance del rol: exportaciones CSV/XLSX/PDF y reportes en cola."""
+    qs = filtrar_tareas(request).order_by("fecha_limite","estado")  # ya filtra por empresa
+    qs = scope_tareas_por_rol(qs, request.user)
+    if _rol(request.user) == "SUPERVISOR":
+        qs = qs.filter(asignado__rol_codigo="TRABAJADOR")
+    return qs
+
 @login_required
 @require_gs_and_sub
 def exportar_tareas_csv(request):
-    qs = filtrar_tareas(request).filter(empresa=request.user.empresa).order_by("fecha_limite","estado")
-    response = HttpResponse(content_type="text/csv; charset=utf-8")
-    response["Content-Disposition"] = f'attachment; filename="reporte_tareas.csv"'
-    writer = csv.writer(response)
-    writer.writerow(["Título","Departamento","Asignado","Estado","Vence"])
-    for t in qs:
-        writer.writerow([
-            t.titulo,
-            t.departamento.nombre if t.departamento else "",
-            f"{t.asignado.primer_nombre} {t.asignado.primer_apellido}" if t.asignado else "",
-            t.estado,
-            t.fecha_limite.strftime("%Y-%m-%d") if t.fecha_limite else ""
-        ])
-    return response
+    # Streaming: tuplas en trozos y escritas al vuelo (memoria constante con 1M filas)
+    qs = tareas_exportables(request)
+    return respuesta_csv("reporte_tareas.csv", ENCABEZADOS_TAREAS, filas_tareas(qs))
 
 @login_required
 @require_gs_and_sub
 def exportar_tareas_xlsx(request):
-    qs = filtrar_tareas(request).filter(empresa=request.user.empresa).order_by("fecha_limite","estado")
+    qs = tareas_exportables(request)
     if openpyxl is None:
         return HttpResponse("openpyxl no está instalado. Instala con: pip install openpyxl", status=500)
-    from openpyxl import Workbook
-    wb = Workbook()
-    ws = wb.active
-    ws.title = "Tareas"
-    ws.append(["Título","Departamento","Asignado","Estado","Vence"])
-    for t in qs:
-        ws.append([
-            t.titulo,
-            t.departamento.nombre if t.departamento else "",
-            f"{t.asignado.primer_nombre} {t.asignado.primer_apellido}" if t.asignado else "",
-            t.estado,
-            t.fecha_limite.strftime("%Y-%m-%d") if t.fecha_limite else ""
-        ])
-    from io import BytesIO
-    bio = BytesIO()
-    wb.save(bio)
-    bio.seek(0)
-    resp = HttpResponse(
-        bio.getvalue(),
-        content_type="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
-    )
-    resp["Content-Disposition"] = 'attachment; filename="reporte_tareas.xlsx"'
-    return resp
+    # Libro write-only a un archivo temporal: memoria constante aunque sean 1M filas
+    return respuesta_xlsx("reporte_tareas.xlsx", "Tareas", ENCABEZADOS_TAREAS, filas_tareas(qs))
 # Exportar TAREAS a PDF
 
 @login_required
 @require_gs_and_sub
 def exportar_tareas_pdf(request):
-    qs = filtrar_tareas(request).filter(empresa=request.user.empresa).order_by("fecha_limite","estado")
+    qs = tareas_exportables(request)
     context = {
-        "tareas": qs,
         "filtros": request.GET,  # por si quieres mostrar filtros aplicados
         "titulo": "Tareas",
         "now": now(),
     }
-    return render_to_pdf("core/reportes/pdf_tareas.html", context, filename="reporte_tareas.pdf")
+    # Por bloques: la memoria de xhtml2pdf no crece con la cantidad de tareas
+    return respuesta_pdf("reporte_tareas.pdf", "core/reportes/pdf_tareas.html", context, filas_tareas(qs))
 
 # -----------------------
 # REPORTES EVALUACIONES
@@ -1203,6 +1259,9 @@ def exportar_tareas_pdf(request):
 
 class ReporteEvaluacionesView(SuscripcionActivaRequiredMixin, SoloGerenteSupervisorMixin, TemplateView):
     template_name = "core/reportes/reporte_evaluaciones.html"
+    paginate_by = 25
+    resumen_por_pagina = 25
+    orden_detalle = ["-created_at", "-id"]
 
     def get_queryset(self):
         u = self.request.user
@@ -1216,7 +1275,7 @@ class ReporteEvaluacionesView(SuscripcionActivaRequiredMixin, SoloGerenteSupervi
 
         if not su:
             qs = qs.filter(evaluado__departamento=dept, evaluador__departamento=dept)
-            if rol == "Supervisor":
+            if rol == "SUPERVISOR":
                 qs = qs.filter(tipo="TRABAJADOR", evaluador=u)
 
         # Filtros GET (igual que antes)
@@ -1229,12 +1288,7 @@ class ReporteEvaluacionesView(SuscripcionActivaRequiredMixin, SoloGerenteSupervi
         f_hasta = self.request.GET.get("hasta", "").strip()
 
         if q:
-            qs = qs.filter(
-                Q(evaluado__primer_nombre__icontains=q) |
-                Q(evaluado__primer_apellido__icontains=q) |
-                Q(evaluador__primer_nombre__icontains=q) |
-                Q(evaluador__primer_apellido__icontains=q)
-            )
+            qs = filtrar_personas(qs, q, "evaluado", "evaluador")
         if tipo in ("SUPERVISOR", "TRABAJADOR"):
             qs = qs.filter(tipo=tipo)
         if puntaje_min.isdigit():
@@ -1254,44 +1308,72 @@ class ReporteEvaluacionesView(SuscripcionActivaRequiredMixin, SoloGerenteSupervi
         ctx = super().get_context_data(**kwargs)
         u = self.request.user
         su = u.is_superuser
-        rol = _rol(u)
-        dept = _dept(u)
-        base_users = User.objects.filter(empresa=u.empresa)
 
         qs = self.get_queryset()
 
-        if su:
-            evaluadores = base_users.filter(rol__nombre__in=["Gerente","Supervisor"]).order_by("primer_apellido")
-            evaluados_supervisores = base_users.filter(rol__nombre="Supervisor").order_by("primer_apellido")
-            evaluados_trabajadores = base_users.filter(rol__nombre="Trabajador").order_by("primer_apellido")
-        elif rol == "Gerente":
-            evaluadores = base_users.filter(
-                Q(rol__nombre="Gerente", departamento=dept) |
-                Q(rol__nombre="Supervisor", departamento=dept)
-            ).order_by("primer_apellido")
-            evaluados_supervisores = base_users.filter(rol__nombre="Supervisor", departamento=dept).order_by("primer_apellido")
-            evaluados_trabajadores = base_users.filter(rol__nombre="Trabajador", departamento=dept).order_by("primer_apellido")
-        else:
-            evaluadores = base_users.filter(pk=u.pk)
-            evaluados_supervisores = base_users.none()
-            evaluados_trabajadores = base_users.filter(rol__nombre="Trabajador", departamento=dept).order_by("primer_apellido")
-
-        agg = qs.aggregate(promedio=Avg("puntaje"), total=Count("id"))
-        resumen = (qs.values("evaluado__primer_nombre", "evaluado__primer_apellido", "evaluado__rol__nombre")
-                     .annotate(prom=Avg("puntaje"), total=Count("id"))
-                     .order_by("-prom","-total"))
+        evaluadores, evaluados_supervisores, evaluados_trabajadores = _listas_filtro_evaluaciones(u)
+
+        g = self.request.GET
+
+        def calcular():
+            # Sin filtros finos, el superusuario (alcance = toda la empresa) lee KPIs y resumen del
+            # resumen materializado en vez de agrupar Evaluacion. Gerente y Supervisor se limitan
+            # también por el depto del evaluador, que el resumen no guarda: se agrupa 'qs'.
+            # En ambos casos es un solo GROUP BY evaluado; la fila total se acumula al recorrerlo.
+            filtros = ("q", "puntaje_min", "evaluador", "desde", "hasta")
+            if not any(g.get(k, "").strip() for k in filtros) and su:
+                res = ResumenEvaluacion.objects.filter(empresa=u.empresa)
+                tipo = g.get("tipo", "").strip()
+                if tipo in ("SUPERVISOR", "TRABAJADOR"):
+                    res = res.filter(tipo=tipo)
+                evaluado_id = g.get("evaluado", "").strip()
+                if evaluado_id.isdigit():
+                    res = res.filter(evaluado_id=int(evaluado_id))
+                return resumen_con_totales(grupos_resumen(res))
+            return resumen_con_totales(grupos_evaluaciones(qs))
+
+        resumen, agg = resumen_reporte_cacheado(u, normalizar_filtros("evals_xlsx", g), calcular)
+        resumen_page = Paginator(resumen, self.resumen_por_pagina).get_page(g.get("page"))
+
+        # Detalle por cursor: sin OFFSET ni COUNT(*) sobre Evaluacion
+        detalle = paginar_keyset(qs, self.orden_detalle, self.paginate_by, token=g.get("cursor"))
+
+        def qs_sin(param):
+            params = g.copy()
+            params.pop(param, None)
+            return f"{params.urlencode()}&" if params else ""
 
         ctx.update({
-            "evaluaciones": qs,
+            "evaluaciones": detalle.object_list,
+            "page_obj": detalle,
+            "is_paginated": detalle.has_other_pages(),
+            "paginacion_qs": qs_sin("cursor"),
             "kpi_promedio": agg["promedio"],
             "kpi_total": agg["total"],
             "evaluadores": evaluadores,
             "evaluados_supervisores": evaluados_supervisores,
             "evaluados_trabajadores": evaluados_trabajadores,
-            "resumen_evaluados": resumen,
+            "resumen_evaluados": resumen_page.object_list,
+            "resumen_page": resumen_page,
+            "resumen_paginacion_qs": qs_sin("page"),
         })
         return ctx
 
+
+class ReporteEvaluacionesAnaliticaView(ReporteEvaluacionesView):
+    """
+    JSON para los gráficos del reporte de evaluaciones (mismos filtros y alcance):
+    histograma, promedio móvil (?ventana=30), variación mensual y benevolencia por evaluador.
+    """
+    def get(self, request, *args, **kwargs):
+        ventana = ventana_pedida(request.GET.get("ventana"))
+        filtros = {**normalizar_filtros("evals_xlsx", request.GET), "ventana": ventana}
+        data = cacheado_por_version(request.user, "rep_evals_analitica", filtros,
+                                    lambda: calcular_analitica(self.get_queryset(), ventana))
+        if data is None:
+            return JsonResponse({"detail": "Analítica no disponible (falta NumPy)."}, status=503)
+        return JsonResponse(data)
+
 def filtrar_evals(request):
     qs = (Evaluacion.objects
           .select_related('evaluado__rol', 'evaluador__rol')
@@ -1306,12 +1388,7 @@ def filtrar_evals(request):
     f_hasta = request.GET.get("hasta") or ""
 
     if q:
-        qs = qs.filter(
-            Q(evaluado__primer_nombre__icontains=q) |
-            Q(evaluado__primer_apellido__icontains=q) |
-            Q(evaluador__primer_nombre__icontains=q) |
-            Q(evaluador__primer_apellido__icontains=q)
-        )
+        qs = filtrar_personas(qs, q, "evaluado", "evaluador")
     if tipo in ("SUPERVISOR", "TRABAJADOR"):
         qs = qs.filter(tipo=tipo)
     if puntaje_min:
@@ -1330,87 +1407,81 @@ def filtrar_evals(request):
 
     return qs
 
+def evaluaciones_exportables(request, filtrar=filtrar_evaluaciones):
+    """Evaluaciones filtradas ('filtrar' ya limita a la empresa) y limitadas al alcance del rol."""
+    return scope_evaluaciones_por_rol(filtrar(request).order_by("-created_at"), request.user)
+
 @login_required
 @require_gs_and_sub
 def exportar_evals_csv(request):
-    qs = filtrar_evaluaciones(request).order_by("-created_at")  # ya filtra por empresa
-    response = HttpResponse(content_type="text/csv; charset=utf-8")
-    response["Content-Disposition"] = 'attachment; filename="reporte_evaluaciones.csv"'
-    writer = csv.writer(response)
-    writer.writerow(["Evaluado","Tipo","Evaluador","Puntaje","Fecha","Comentarios"])
-    for e in qs:
-        evaluado = f"{getattr(e.evaluado,'primer_nombre','')} {getattr(e.evaluado,'primer_apellido','')}".strip()
-        evaluador = f"{getattr(e.evaluador,'primer_nombre','')} {getattr(e.evaluador,'primer_apellido','')}".strip()
-        tipo = "Supervisor" if e.tipo == "SUPERVISOR" else "Trabajador"
-        writer.writerow([
-            evaluado,
-            tipo,
-            evaluador,
-            e.puntaje,
-            localtime(e.created_at).strftime("%Y-%m-%d %H:%M"),
-            (e.comentarios or "").replace("\n"," ").strip()
-        ])
-    return response
+    qs = evaluaciones_exportables(request)
+    return respuesta_csv("reporte_evaluaciones.csv", ENCABEZADOS_EVALUACIONES, filas_evaluaciones(qs))
 
 @login_required
 @require_gs_and_sub
 def exportar_evals_xlsx(request):
-    qs = filtrar_evals(request).filter(empresa=request.user.empresa).order_by("-created_at")
-
-    try:
-        from openpyxl import Workbook
-    except ImportError:
+    qs = evaluaciones_exportables(request, filtrar_evals)
+    if openpyxl is None:
         return HttpResponse("openpyxl no está instalado. Instala con: pip install openpyxl", status=500)
-
-    wb = Workbook()
-    ws = wb.active
-    ws.title = "Evaluaciones"
-
-    # Encabezados
-    ws.append(["Evaluado", "Tipo", "Evaluador", "Puntaje", "Fecha", "Comentarios"])
-
-    # Filas
-    for e in qs:
-        evaluado = f"{getattr(e.evaluado, 'primer_nombre', '')} {getattr(e.evaluado, 'primer_apellido', '')}".strip()
-        evaluador = f"{getattr(e.evaluador, 'primer_nombre', '')} {getattr(e.evaluador, 'primer_apellido', '')}".strip()
-        tipo = "Supervisor" if e.tipo == "SUPERVISOR" else "Trabajador"
-        fecha = localtime(e.created_at).strftime("%Y-%m-%d %H:%M")
-        ws.append([
-            evaluado,
-            tipo,
-            evaluador,
-            e.puntaje,
-            fecha,
-            e.comentarios or ""
-        ])
-
-    from io import BytesIO
-    bio = BytesIO()
-    wb.save(bio)
-    bio.seek(0)
-
-    resp = HttpResponse(
-        bio.getvalue(),
-        content_type="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
-    )
-    resp["Content-Disposition"] = f'attachment; filename="reporte_evaluaciones_{now().strftime("%Y%m%d_%H%M")}.xlsx"'
-    return resp
+    return respuesta_xlsx(f'reporte_evaluaciones_{now().strftime("%Y%m%d_%H%M")}.xlsx', "Evaluaciones",
+                          ENCABEZADOS_EVALUACIONES, filas_evaluaciones(qs, comentarios_en_una_linea=False))
 
 # Exportar EVALUACIONES a PDF
 @login_required
 @require_gs_and_sub
 def exportar_evals_pdf(request):
-    qs = filtrar_evaluaciones(request).filter(empresa=request.user.empresa).order_by("-created_at")
+    qs = evaluaciones_exportables(request)
     context = {
-        "evaluaciones": qs,
         "filtros": request.GET,
         "titulo": "Evaluaciones",
         "now": now(),
     }
-    return render_to_pdf("core/reportes/pdf_evaluaciones.html", context, filename="reporte_evaluaciones.pdf")
+    return respuesta_pdf("reporte_evaluaciones.pdf", "core/reportes/pdf_evaluaciones.html", context,
+                         filas_evaluaciones(qs, comentarios_en_una_linea=False))
+
+# Reportes en segundo plano (TrabajoReporte + manage.py procesar_reportes)
+def _trabajo_del_usuario(request, pk):
+    # Un trabajo deduplicado lo comparten usuarios de la misma empresa y el mismo alcance
+    return get_object_or_404(TrabajoReporte, pk=pk, empresa=request.user.empresa,
+                             alcance=alcance_de(request.user))
+
+def _estado_trabajo(trabajo):
+    data = {"id": trabajo.pk, "estado": trabajo.estado,
+            "estado_url": reverse("reporte_trabajo_estado", args=[trabajo.pk])}
+    if trabajo.estado == "LISTO":
+        data["descarga_url"] = reverse("reporte_trabajo_descargar", args=[trabajo.pk])
+    elif trabajo.estado == "ERROR":
+        data["error"] = "No se pudo generar el reporte. Intenta nuevamente."
+    return data
+
+@login_required
+@require_gs_and_sub
+@require_POST
+def reporte_trabajo_crear(request, tipo):
+    """Encola el reporte con los filtros del querystring (o reutiliza uno idéntico)."""
+    if tipo not in TIPOS_REPORTE:
+        return JsonResponse({"detail": "Tipo de reporte desconocido."}, status=404)
+    trabajo, creado = solicitar_reporte(request.user, tipo, request.GET)
+    return JsonResponse(_estado_trabajo(trabajo), status=202 if creado else 200)
+
+@login_required
+@require_gs_and_sub
+def reporte_trabajo_estado(request, pk):
+    return JsonResponse(_estado_trabajo(_trabajo_del_usuario(request, pk)))
+
+@login_required
+@require_gs_and_sub
+def reporte_trabajo_descargar(request, pk):
+    trabajo = _trabajo_del_usuario(request, pk)
+    ruta = ruta_archivo(trabajo)
+    if trabajo.estado != "LISTO" or not ruta or not os.path.isfile(ruta):
+        raise Http404("El reporte no está disponible.")
+    ext = TIPOS_REPORTE[trabajo.tipo][3]
+    return FileResponse(open(ruta, "rb"), as_attachment=True, filename=nombre_descarga(trabajo),
+                        content_type=CONTENT_TYPES[ext])
 
 def pdfbase(request):
-    return render(request, 'core/reportes/pdf_base.html')
+    return render(request, 'core/reportes/pdf_base.html', {"estilos_pdf": estilos_pdf()})
 
 # HISTORIAL DE CAMBIOS (solo Gerente/Supervisor):
 class TareaHistorialView(SuscripcionActivaRequiredMixin, SoloGerenteSupervisorMixin, EmpresaQuerysetMixin, DetailView):
@@ -1420,7 +1491,7 @@ class TareaHistorialView(SuscripcionActivaRequiredMixin, SoloGerenteSupervisorMi
 
     def get_context_data(self, **kwargs):
         ctx = super().get_context_data(**kwargs)
-        ctx["eventos"] = self.object.historial.select_related("realizado_por")
+        ctx["eventos"] = eventos_historial(self.object)  # incluye el historial archivado
         return ctx
 
 class EvalHistorialView(SuscripcionActivaRequiredMixin, SoloGerenteSupervisorMixin, EmpresaQuerysetMixin, DetailView):
@@ -1430,7 +1501,7 @@ class EvalHistorialView(SuscripcionActivaRequiredMixin, SoloGerenteSupervisorMix
 
     def get_context_data(self, **kwargs):
         ctx = super().get_context_data(**kwargs)
-        ctx["eventos"] = self.object.historial.select_related("realizado_por")
+        ctx["eventos"] = eventos_historial(self.object)  # incluye el historial archivado
         return ctx
 
 # PERFIL Y CAMBIO DE PASSWORD:
@@ -1477,13 +1548,13 @@ class MiPasswordChangeView(LoginRequiredMixin, PasswordChangeView):
 @login_required
 def home(request):
     u = request.user
-    rol = getattr(getattr(u, "rol", None), "nombre", "")
+    rol = u.rol_codigo
     # Superuser: ignora suscripción; resto: evalúa
     suscripcion_activa = True if u.is_superuser else _empresa_tiene_sub_activa(u)
 
     # Si la suscripción NO está activa:
     if not u.is_superuser and not suscripcion_activa:
-        if rol in ("Recursos humanos", "Gerente"):
+        if rol in ("RRHH", "GERENTE"):
             # Solo RRHH / Gerente deben ir a pagar
             messages.info(request, "Tu empresa necesita una suscripción activa para usar la app. Completa el pago aquí.")
             return redirect("billing_checkout")
@@ -1502,24 +1573,30 @@ def home(request):
     tareas_qs = Tarea.objects.all() if u.is_superuser else Tarea.objects.filter(empresa=u.empresa)
 
     # --- RRHH: contadores y últimos usuarios ---
-    if u.is_superuser or rol == "Recursos humanos":
+    if u.is_superuser or rol == "RRHH":
         ctx["usuarios_count"] = users_qs.count()
         ctx["departamentos_count"] = depto_qs.count()
         ctx["ultimos_usuarios"] = users_qs.select_related("rol").order_by("-created_at")[:8]
 
     # --- Gerente / Supervisor: métricas del DEPARTAMENTO del usuario ---
-    if u.is_superuser or rol in ("Gerente", "Supervisor"):
+    if u.is_superuser or rol in ("GERENTE", "SUPERVISOR"):
         base_qs = tareas_qs.select_related("departamento", "asignado")
-        if rol in ("Gerente", "Supervisor") and u.departamento_id:
-            base_qs = base_qs.filter(departamento_id=u.departamento_id)
-
-        ctx["tareas_total_count"] = base_qs.count()
-        ctx["tareas_atrasadas_count"] = base_qs.filter(estado="Atrasada").count()
-        ctx["tareas_en_progreso_count"] = base_qs.filter(estado="En progreso").count()
+        depto_id = None
+        if rol in ("GERENTE", "SUPERVISOR") and u.departamento_id:
+            depto_id = u.departamento_id
+            base_qs = base_qs.filter(departamento_id=depto_id)
+
+        contadores = contadores_por_estado(
+            empresa=None if u.is_superuser else u.empresa,
+            departamento=depto_id,
+        )
+        ctx["tareas_total_count"] = sum(total_estado(contadores, e) for e in ESTADOS_TAREA)
+        ctx["tareas_atrasadas_count"] = total_estado(contadores, "Atrasada")
+        ctx["tareas_en_progreso_count"] = total_estado(contadores, "En progreso")
         ctx["tareas_recent"] = base_qs.order_by("-created_at")[:8]
 
     # --- Trabajador: sus propias tareas ---
-    if u.is_superuser or rol == "Trabajador":
+    if u.is_superuser or rol == "TRABAJADOR":
         mis_qs = tareas_qs.filter(asignado=u).select_related("departamento")
         ctx["mis_tareas_pendientes_count"] = mis_qs.filter(estado="Pendiente").count()
         ctx["mis_tareas"] = mis_qs.order_by("fecha_limite")[:10]
@@ -1683,22 +1760,25 @@ def notif_list_api(request):
     """
     Devuelve las notificaciones del usuario logueado.
     """
-    qs = (Notificacion.objects
-          .filter(usuario=request.user)
-          .order_by('-created_at')[:100])
-
-    data = []
-    unread = 0
-    for n in qs:
-        if not n.is_read:
-            unread += 1
-        data.append({
-            "id": n.id,
-            "mensaje": n.mensaje,
-            "is_read": n.is_read,
-            "created_at": localtime(n.created_at).strftime("%d/%m/%Y %H:%M"),
-        })
-    return JsonResponse({"items": data, "unread_count": unread})
+    base = Notificacion.objects.filter(usuario=request.user)
+    # Marcar como leídas no cambia created_at ni el total: el conteo de no leídas va en el ETag
+    etag, modificado = validadores_qs(base, "created_at", no_leidas=Count("pk", filter=Q(is_read=False)))
+
+    def construir():
+        data = []
+        unread = 0
+        for n in base.order_by('-created_at')[:100]:
+            if not n.is_read:
+                unread += 1
+            data.append({
+                "id": n.id,
+                "mensaje": n.mensaje,
+                "is_read": n.is_read,
+                "created_at": localtime(n.created_at).strftime("%d/%m/%Y %H:%M"),
+            })
+        return JsonResponse({"items": data, "unread_count": unread})
+
+    return get_condicional(request, etag, modificado, construir)
 
 @login_required
 @require_POST
@@ -1707,6 +1787,7 @@ def notif_clear_api(request):
     Marca como leídas todas las notificaciones del usuario.
     """
     Notificacion.objects.filter(usuario=request.user, is_read=False).update(is_read=True)
+    reiniciar_no_leidas(request.user.pk)
     return JsonResponse({"ok": True})
 
 
@@ -1717,6 +1798,7 @@ def notif_delete_all_api(request):
     Elimina todas las notificaciones del usuario.
     """
     Notificacion.objects.filter(usuario=request.user).delete()
+    reiniciar_no_leidas(request.user.pk)
     return JsonResponse({"ok": True})
 
 @login_required
@@ -1725,19 +1807,14 @@ def api_usuarios_por_rol_y_depto(request):
     rol = request.GET.get('rol')  # "Supervisor" o "Trabajador"
     depto_id = request.GET.get('depto')
 
-    qs = User.objects.filter(empresa=request.user.empresa)
+    depto_id = int(depto_id) if (depto_id or "").isdigit() else None
+    gente = miembros(request.user.empresa_id, depto_id)
     if rol:
-        qs = qs.filter(rol__nombre=rol)
-    if depto_id:
-        qs = qs.filter(departamento_id=depto_id)
-
-    items = [
-        {"id": u.id, "text": f"{u.primer_nombre} {u.primer_apellido}"}
-        for u in qs.order_by('primer_apellido','primer_nombre')
-    ]
+        gente = [p for p in gente if p["rol_nombre"] == rol]
+    items = [{"id": p["id"], "text": f"{p['primer_nombre']} {p['primer_apellido']}"} for p in gente]
     return JsonResponse({"items": items})
 
-class TareaListSupervisorMiasView(SuscripcionActivaRequiredMixin, SoloSupervisorMixin, EmpresaQuerysetMixin, ListView):
+class TareaListSupervisorMiasView(SuscripcionActivaRequiredMixin, SoloSupervisorMixin, EmpresaQuerysetMixin, KeysetPaginationMixin, ListView):
     model = Tarea
     template_name = "core/tareas/tarea_list_supervisor_mias.html"
     context_object_name = "tareas"
@@ -1753,15 +1830,12 @@ class TareaListSupervisorMiasView(SuscripcionActivaRequiredMixin, SoloSupervisor
         q = (self.request.GET.get("q") or "").strip()
         estado = (self.request.GET.get("estado") or "").strip()
 
-        if q:
-            qs = qs.filter(
-                Q(titulo__icontains=q) |
-                Q(descripcion__icontains=q)
-            )
-
         if estado:
             qs = qs.filter(estado=estado)
 
+        if q:
+            qs = buscar_tareas(qs.order_by(*self.ordering), q)
+
         return qs
 
     def get_context_data(self, **kwargs):
@@ -1769,7 +1843,7 @@ class TareaListSupervisorMiasView(SuscripcionActivaRequiredMixin, SoloSupervisor
         ctx["ESTADOS"] = ["Pendiente", "En progreso", "Atrasada", "Finalizada"]
         return ctx
     
-class TareaListSupervisorEquipoView(SuscripcionActivaRequiredMixin, SoloSupervisorMixin, EmpresaQuerysetMixin, ListView):
+class TareaListSupervisorEquipoView(SuscripcionActivaRequiredMixin, SoloSupervisorMixin, EmpresaQuerysetMixin, KeysetPaginationMixin, ListView):
     model = Tarea
     template_name = "core/tareas/tarea_list_supervisor_equipo.html"
     context_object_name = "tareas"
@@ -1782,20 +1856,21 @@ class TareaListSupervisorEquipoView(SuscripcionActivaRequiredMixin, SoloSupervis
               .get_queryset()  # <--- usa el mixin
               .select_related("departamento", "asignado")
               .filter(
-                  asignado__rol__nombre="Trabajador",
-                  asignado__departamento=user.departamento
+                  asignado__rol_codigo="TRABAJADOR",
+                  asignado__departamento_id=user.departamento_id
               ))
 
         # Filtros opcionales
         q = (self.request.GET.get("q") or "").strip()
         estado = (self.request.GET.get("estado") or "").strip()
 
-        if q:
-            qs = qs.filter(Q(titulo__icontains=q) | Q(descripcion__icontains=q))
         if estado:
             qs = qs.filter(estado=estado)
+        qs = qs.order_by(*self.ordering)
+        if q:
+            qs = buscar_tareas(qs, q)
 
-        return qs.order_by(*self.ordering)
+        return qs
 
     def get_context_data(self, **kwargs):
         ctx = super().get_context_data(**kwargs)
@@ -157,6 +157,35 @@ STATIC_URL = "static/"
 DEFAULT_AUTO_FIELD = "django.db.models.BigAutoField"
 AUTH_USER_MODEL = 'core.User'
 
+# request.user se carga con rol/depto/empresa/suscripción en una consulta y se cachea
+# (core/auth_backends.py). ModelBackend queda para sesiones iniciadas antes del cambio.
+AUTHENTICATION_BACKENDS = [
+    "core.auth_backends.CachedModelBackend",
+    "django.contrib.auth.backends.ModelBackend",
+]
+USUARIO_CACHE_TTL = 15 * 60
+SUSCRIPCION_CACHE_TTL = 5 * 60  # estado de suscripción por empresa (core/utils_suscripcion.py)
+# Dashboard cacheado por (empresa, depto, rol) (core/utils_dashboard.py); con SWR se sirve
+# la foto anterior mientras un solo request recalcula
+DASHBOARD_CACHE_TTL = 10 * 60
+DASHBOARD_CACHE_SWR = True
+REFERENCIA_CACHE_TTL = 60 * 60  # roles/deptos/miembros para selects y filtros (core/utils_referencia.py)
+REPORTES_CACHE_TTL = 10 * 60  # resumen/KPIs del reporte de evaluaciones (core/utils_resumen_eval.py)
+# Reportes PDF/XLSX en segundo plano (core/utils_trabajos.py, manage.py procesar_reportes)
+REPORTES_DIR = os.getenv("REPORTES_DIR", str(BASE_DIR / "reportes_generados"))
+REPORTES_RETENCION_HORAS = 24
+REPORTES_PDF_PROCESOS = int(os.getenv("REPORTES_PDF_PROCESOS", "2"))  # pool para los bloques del PDF
+PDF_FILAS_POR_BLOQUE = 300
+# Feed de cambios (api/cambios/): no entrega filas más nuevas que esto (commits tardíos)
+FEED_RETRASO_SEGUNDOS = 5
+
+# Caché compartida entre procesos si hay Redis; si no, memoria local (desarrollo)
+REDIS_URL = os.getenv("REDIS_URL", "")
+if REDIS_URL:
+    CACHES = {"default": {"BACKEND": "django.core.cache.backends.redis.RedisCache", "LOCATION": REDIS_URL}}
+else:
+    CACHES = {"default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"}}
+
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': (
         'rest_framework_simplejwt.authentication.JWTAuthentication',
@@ -201,4 +230,6 @@ MERCADOPAGO_WEBHOOK_URL = os.getenv(
 MERCADOPAGO_BACK_URL = os.getenv("MERCADOPAGO_BACK_URL", "http://127.0.0.1:8000/")
 
 # === Webhook Secret ===
-WEBHOOK_SHARED_SECRET = os.getenv("WEBHOOK_SHARED_SECRET", "")
\ No newline at end of file
+WEBHOOK_SHARED_SECRET = os.getenv("WEBHOOK_SHARED_SECRET", "")
+# === Historial: archivado en frío (manage.py archivar_historial) ===
+HISTORIAL_ARCHIVAR_DIAS = int(os.getenv("HISTORIAL_ARCHIVAR_DIAS", "180"))